@@ -172,6 +172,8 @@ DOWNLOAD_INVIDIOUS_PREFERRED_INSTANCE = get_config("download.invidious.preferred
 # Whisper Settings
 WHISPER_MODEL = get_config("audio.whisper_model", "base")
 WHISPER_DEVICE = get_config("audio.whisper_device", "cuda")
+# CTranslate2 compute type on GPU: int8 weights with float16 activations
+WHISPER_COMPUTE_TYPE = get_config("audio.whisper_compute_type", "int8_float16")
 SEGMENT_DURATION = get_config("audio.segment_duration", 180)
 DEFAULT_LANGUAGE = get_config("audio.default_language", "en-US")
 
@@ -274,6 +276,7 @@ def print_config_summary():
     print(f"\n[Audio Processing]")
     print(f"  Whisper Model: {WHISPER_MODEL}")
     print(f"  Whisper Device: {WHISPER_DEVICE}")
+    print(f"  Whisper Compute Type: {WHISPER_COMPUTE_TYPE}")
     print(f"  Storage Path: {AUDIO_STORAGE_PATH}")
 
     print(f"\n[API Server]")
@@ -0,0 +1,110 @@
+"""
+AI Batch Job Module
+
+This module runs chat completion requests through an OpenAI-compatible Batch API
+(Moonshot, Zhipu, ...). Batch jobs are asynchronous and cheaper than real-time
+requests, so they suit offline or CI runs.
+
+Design Principles:
+    - All request lines go into one JSONL upload and one job
+    - Exponential backoff polling, interval capped at 60 seconds
+    - Failures raise: an unfinished job must not look like an empty result
+"""
+import json
+import time
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+# Terminal states of an OpenAI-compatible Batch job
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def batch_endpoint(base_url: str) -> str:
+    """
+    Derive the request line url from the versioned path of base_url.
+
+    Examples:
+        >>> batch_endpoint("https://api.moonshot.cn/v1")
+        '/v1/chat/completions'
+    """
+    version = urlparse(base_url).path.rstrip("/").rsplit("/", 1)[-1]
+    return f"/{version}/chat/completions"
+
+
+def run_batch_job(
+    client: Any,
+    lines: List[Tuple[str, Dict[str, Any]]],
+    endpoint: str,
+    poll_interval: float,
+    timeout: float
+) -> Dict[str, str]:
+    """
+    Submit one Batch job for all request lines and wait for its output.
+
+    Args:
+        client: OpenAI-compatible client (openai.OpenAI)
+        lines: (custom_id, chat completion request body) per JSONL line
+        endpoint: Request url, see batch_endpoint()
+        poll_interval: Initial seconds between status polls (doubles, capped at 60s)
+        timeout: Maximum seconds to wait for the job
+
+    Returns:
+        Dict[str, str]: custom_id -> response message content; lines whose
+        request failed inside the job are missing
+
+    Raises:
+        TimeoutError: The job did not finish within timeout seconds
+        RuntimeError: The job finished without completing, or an output line
+            could not be parsed
+    """
+    payload = "\n".join(
+        json.dumps(
+            {"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body},
+            ensure_ascii=False
+        )
+        for custom_id, body in lines
+    )
+    input_file = client.files.create(
+        file=("batch_requests.jsonl", payload.encode("utf-8")),
+        purpose="batch"
+    )
+    job = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=endpoint,
+        completion_window="24h"
+    )
+    logger.info(f"[AI Batch] 已提交 Batch {job.id}，共 {len(lines)} 条请求")
+
+    delay = poll_interval
+    deadline = time.monotonic() + timeout
+    while job.status not in BATCH_TERMINAL_STATUSES:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Batch {job.id} not finished after {timeout:.0f}s (status={job.status})")
+        time.sleep(delay)
+        delay = min(delay * 2, 60.0)
+        job = client.batches.retrieve(job.id)
+
+    if job.status != "completed" or not job.output_file_id:
+        raise RuntimeError(f"Batch {job.id} did not complete: status={job.status}")
+
+    contents = {}
+    for raw in client.files.content(job.output_file_id).text.splitlines():
+        if not raw.strip():
+            continue
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"Batch {job.id} output line is not valid JSON ({e}): {raw}") from e
+        body = (item.get("response") or {}).get("body") or {}
+        if body.get("choices"):
+            contents[item["custom_id"]] = body["choices"][0]["message"]["content"]
+    return contents
+
+
+__all__ = [
+    "BATCH_TERMINAL_STATUSES",
+    "batch_endpoint",
+    "run_batch_job",
+]
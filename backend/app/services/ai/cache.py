@@ -0,0 +1,99 @@
+"""
+AI Response Cache Module
+
+This module provides an on-disk LLM response cache backed by SQLite.
+Re-running a workflow on the same audio sends identical prompts, so cached
+responses let proofreading, segmentation and marketing skip the API call.
+
+Design Principles:
+    - Plugs into LangChain's global LLM cache, so every chat model call
+      (StructuredLLM adapters included) is covered without code changes
+    - Key: sha256 of the serialized model parameters + prompt
+    - Stored in an ai_cache table next to the app tables in the same database
+    - Opt-in: nothing is cached until enable_llm_cache() is called
+"""
+import hashlib
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from loguru import logger
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, delete, insert, select
+from sqlalchemy.engine import Engine
+
+_metadata = MetaData()
+
+ai_cache_table = Table(
+    "ai_cache",
+    _metadata,
+    Column("key", String(64), primary_key=True),
+    Column("value", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.now),
+)
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache that persists LLM generations in the ai_cache table.
+
+    Examples:
+        >>> cache = SQLiteLLMCache(engine)
+        >>> set_llm_cache(cache)
+        >>> # Subsequent identical chat model calls are served from SQLite
+    """
+
+    def __init__(self, engine: Engine):
+        """
+        Args:
+            engine: SQLAlchemy engine of the database to store the cache in
+        """
+        self.engine = engine
+        _metadata.create_all(engine)
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """Hash the model parameters and prompt into a fixed-length key."""
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the raw cached value for key, or None on a miss."""
+        with self.engine.connect() as conn:
+            return conn.scalar(select(ai_cache_table.c.value).where(ai_cache_table.c.key == key))
+
+    def put(self, key: str, value: str) -> None:
+        """Store value under key, replacing any previous entry."""
+        with self.engine.begin() as conn:
+            conn.execute(delete(ai_cache_table).where(ai_cache_table.c.key == key))
+            conn.execute(insert(ai_cache_table).values(key=key, value=value, created_at=datetime.now()))
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        value = self.get(self.make_key(prompt, llm_string))
+        if value is None:
+            return None
+        logger.debug("[AI Cache] 命中缓存")
+        return loads(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        self.put(self.make_key(prompt, llm_string), dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(ai_cache_table))
+
+
+def enable_llm_cache(engine: Engine) -> SQLiteLLMCache:
+    """
+    Cache all LangChain chat model responses in the given database.
+
+    Args:
+        engine: SQLAlchemy engine of the database to store the cache in
+
+    Returns:
+        SQLiteLLMCache: The installed cache
+    """
+    cache = SQLiteLLMCache(engine)
+    set_llm_cache(cache)
+    logger.info(f"[AI Cache] 已启用 LLM 响应缓存: {engine.url}")
+    return cache
@@ -427,7 +427,8 @@ class MarketingService:
     def generate_xiaohongshu_copy(
         self,
         episode_id: int,
-        language: str = "zh"
+        language: str = "zh",
+        angle: Optional[str] = None
     ) -> MarketingCopy:
         """
         生成小红书风格文案（单版本，已废弃，请使用 generate_xiaohongshu_copy_multi_angle）
@@ -435,6 +436,7 @@ class MarketingService:
         Args:
             episode_id: Episode ID
             language: 语言代码
+            angle: 文案角度（如 "干货硬核向"），传入时正文按该角度撰写
 
         Returns:
             MarketingCopy: 生成的文案对象
@@ -460,18 +462,22 @@ class MarketingService:
         hashtags = self.generate_hashtags(episode_id, max_tags=5)
 
         # 4. 生成正文内容
-        content = self._call_llm_for_xiaohongshu_content(episode, key_quotes)
+        content = self._call_llm_for_xiaohongshu_content(episode, key_quotes, angle=angle)
+
+        metadata = {
+            "episode_id": episode_id,
+            "language": language,
+            "platform": "xiaohongshu"
+        }
+        if angle:
+            metadata["angle_tag"] = angle
 
         return MarketingCopy(
             title=title,
             content=content,
             hashtags=hashtags,
             key_quotes=key_quotes,
-            metadata={
-                "episode_id": episode_id,
-                "language": language,
-                "platform": "xiaohongshu"
-            }
+            metadata=metadata
         )
 
     def generate_xiaohongshu_copy_multi_angle(
@@ -729,7 +735,8 @@ class MarketingService:
     def _call_llm_for_xiaohongshu_content(
         self,
         episode: Episode,
-        key_quotes: List[str]
+        key_quotes: List[str],
+        angle: Optional[str] = None
     ) -> str:
         """
         调用 LLM 生成小红书风格正文
@@ -737,6 +744,7 @@ class MarketingService:
         Args:
             episode: Episode 对象
             key_quotes: 金句列表
+            angle: 文案角度，为 None 时不限定角度
 
         Returns:
             str: 小红书风格正文
@@ -793,6 +801,8 @@ class MarketingService:
 {transcripts_text}
 
 请根据以上完整字幕内容生成小红书风格的文章正文："""
+                if angle:
+                    user_prompt += f"\n\n文案角度：{angle}（正文的切入点、语气和重点都要围绕这个角度）"
 
                 executor = ThreadPoolExecutor(max_workers=1)
 
@@ -865,7 +875,7 @@ class MarketingService:
         logger.info(f"已删除 episode_id={episode_id} 的 {count} 条营销文案")
         return count
 
-    def save_marketing_copy(
+    def build_marketing_post(
         self,
         episode_id: int,
         copy: MarketingCopy,
@@ -873,7 +883,7 @@ class MarketingService:
         angle_tag: str = "default"
     ) -> MarketingPost:
         """
-        保存营销文案到数据库
+        构建营销文案记录（不写入数据库，便于调用方批量保存）
 
         Args:
             episode_id: Episode ID
@@ -882,11 +892,9 @@ class MarketingService:
             angle_tag: 策略标签
 
         Returns:
-            MarketingPost: 创建的数据库记录
+            MarketingPost: 未持久化的数据库记录
         """
-        logger.info(f"保存营销文案: episode_id={episode_id}, platform={platform}")
-
-        post = MarketingPost(
+        return MarketingPost(
             episode_id=episode_id,
             platform=platform,
             angle_tag=angle_tag,
@@ -895,6 +903,29 @@ class MarketingService:
             status="pending"
         )
 
+    def save_marketing_copy(
+        self,
+        episode_id: int,
+        copy: MarketingCopy,
+        platform: str = "xhs",
+        angle_tag: str = "default"
+    ) -> MarketingPost:
+        """
+        保存营销文案到数据库
+
+        Args:
+            episode_id: Episode ID
+            copy: 营销文案对象
+            platform: 平台标识
+            angle_tag: 策略标签
+
+        Returns:
+            MarketingPost: 创建的数据库记录
+        """
+        logger.info(f"保存营销文案: episode_id={episode_id}, platform={platform}")
+
+        post = self.build_marketing_post(episode_id, copy, platform, angle_tag)
+
         self.db.add(post)
         self.db.flush()
 
@@ -6,6 +6,7 @@ Obsidian Service - Obsidian 文档生成和解析服务
 渲染方向 (Database → Obsidian):
 - render_episode(): 从数据库生成 Obsidian Markdown 文档
 - save_episode(): 保存 Markdown 文件到 Obsidian Vault
+- save_episode_bundle(): 一次查询同时保存 Episode 文档和营销文案文档
 
 解析方向 (Obsidian → Database):
 - parse_episode_from_markdown(): 解析 Markdown 并检测翻译修改
@@ -15,7 +16,7 @@ import logging
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -64,13 +65,20 @@ class ObsidianService:
     # 渲染方法 (Database → Markdown)
     # ========================================================================
 
-    def render_episode(self, episode_id: int, language_code: str = "zh") -> str:
+    def render_episode(
+        self,
+        episode_id: int,
+        language_code: str = "zh",
+        record_offsets: Optional[Dict[int, Tuple[int, int]]] = None
+    ) -> str:
         """
         渲染 Episode 为 Obsidian Markdown
 
         Args:
             episode_id: Episode ID
             language_code: 翻译语言代码
+            record_offsets: 可选字典，传入时写入 {cue_id: (start, end)}，
+                即每条翻译文本在返回 Markdown 中的字符区间
 
         Returns:
             str: Markdown 内容
@@ -85,11 +93,18 @@ class ObsidianService:
         if not episode:
             raise ValueError(f"Episode not found: id={episode_id}")
 
-        # 获取 Chapters（按时间排序）
-        chapters = self.db.query(Chapter).filter(
-            Chapter.episode_id == episode_id
-        ).order_by(Chapter.start_time).all()
+        return self._render_episode_markdown(
+            episode, self._get_chapters(episode_id), language_code, record_offsets
+        )
 
+    def _render_episode_markdown(
+        self,
+        episode: Episode,
+        chapters: List[Chapter],
+        language_code: str,
+        record_offsets: Optional[Dict[int, Tuple[int, int]]] = None
+    ) -> str:
+        """用已加载的 Episode 和 Chapters 渲染 Markdown（参数含义同 render_episode）"""
         # 生成 YAML Frontmatter
         frontmatter = self._render_frontmatter(episode)
 
@@ -99,19 +114,23 @@ class ObsidianService:
         # 生成章节导航
         navigation = self._render_chapter_navigation(chapters, episode)
 
-        # 生成章节内容
-        content = self._render_chapters_content(chapters, episode, language_code)
-
-        # 如果没有章节，生成所有 Cue 的表格
-        if not chapters:
-            content = self._render_all_cues_content(episode_id, language_code)
+        # 生成章节内容；如果没有章节，生成所有 Cue 的表格
+        content_offsets = {} if record_offsets is not None else None
+        if chapters:
+            content = self._render_chapters_content(chapters, episode, language_code, content_offsets)
+        else:
+            content = self._render_all_cues_content(episode.id, language_code, content_offsets)
 
         # 拼接 Markdown，处理 header 为空的情况
         parts = [frontmatter]
         if header:
             parts.append(header)
-        parts.extend([navigation, "---", content])
-        markdown = "\n\n".join(parts)
+        parts.extend([navigation, "---"])
+        prefix = "\n\n".join(parts) + "\n\n"
+        markdown = prefix + content
+
+        if record_offsets is not None:
+            self._shift_offsets(content_offsets, len(prefix), record_offsets)
 
         return markdown
 
@@ -128,12 +147,74 @@ class ObsidianService:
         """
         logger.info(f"保存 Obsidian 文档: episode_id={episode_id}")
 
+        # 获取 Episode
+        episode = self.db.query(Episode).filter(Episode.id == episode_id).first()
+        if not episode:
+            raise ValueError(f"Episode not found: id={episode_id}")
+
         # 渲染 Markdown
-        markdown = self.render_episode(episode_id, language_code)
+        markdown = self._render_episode_markdown(
+            episode, self._get_chapters(episode_id), language_code
+        )
+        return self._write_episode_markdown(episode, markdown)
+
+    def save_episode_bundle(
+        self,
+        episode_id: int,
+        language_code: str = "zh"
+    ) -> Tuple[Path, Optional[Path]]:
+        """
+        一次性生成并保存 Episode 文档和营销文案文档
+
+        Episode 和 Chapters 只查询一次，由两份文档共用；
+        营销文案中的章节信息直接从已加载的 Chapters 中取，不再逐条查询。
+
+        Args:
+            episode_id: Episode ID
+            language_code: 翻译语言代码
+
+        Returns:
+            Tuple[Path, Optional[Path]]: (Episode 文档路径, 营销文案文档路径；没有营销文案时为 None)
+
+        Raises:
+            ValueError: Episode 不存在
+        """
+        logger.info(f"保存 Obsidian 文档和营销文案: episode_id={episode_id}")
 
-        # 获取 Episode
         episode = self.db.query(Episode).filter(Episode.id == episode_id).first()
+        if not episode:
+            raise ValueError(f"Episode not found: id={episode_id}")
+
+        chapters = self._get_chapters(episode_id)
+
+        episode_markdown = self._render_episode_markdown(episode, chapters, language_code)
+        episode_path = self._write_episode_markdown(episode, episode_markdown)
+
+        marketing_markdown = self._render_marketing_markdown(
+            episode,
+            self._get_marketing_posts(episode_id),
+            {chapter.id: chapter for chapter in chapters}
+        )
+        if not marketing_markdown:
+            logger.warning(f"没有营销文案可保存: episode_id={episode_id}")
+            return episode_path, None
+
+        return episode_path, self._write_marketing_markdown(episode, marketing_markdown)
+
+    def _get_chapters(self, episode_id: int) -> List[Chapter]:
+        """获取 Episode 的所有 Chapters（按时间排序）"""
+        return self.db.query(Chapter).filter(
+            Chapter.episode_id == episode_id
+        ).order_by(Chapter.start_time).all()
+
+    def _get_marketing_posts(self, episode_id: int) -> List[MarketingPost]:
+        """获取 Episode 的所有营销文案（按创建时间排序）"""
+        return self.db.query(MarketingPost).filter(
+            MarketingPost.episode_id == episode_id
+        ).order_by(MarketingPost.created_at).all()
 
+    def _write_episode_markdown(self, episode: Episode, markdown: str) -> Path:
+        """把 Episode Markdown 写入 Vault 的笔记目录"""
         # 生成安全的文件名（使用 display_title）
         safe_title = self._sanitize_filename(episode.display_title)
         filename = f"{episode.id}-{safe_title}.md"
@@ -190,11 +271,15 @@ class ObsidianService:
         if not episode:
             raise ValueError(f"Episode not found: id={episode_id}")
 
-        # 获取所有营销文案，按角度标签分组
-        posts = self.db.query(MarketingPost).filter(
-            MarketingPost.episode_id == episode_id
-        ).order_by(MarketingPost.created_at).all()
+        return self._render_marketing_markdown(episode, self._get_marketing_posts(episode_id))
 
+    def _render_marketing_markdown(
+        self,
+        episode: Episode,
+        posts: List[MarketingPost],
+        chapters_by_id: Optional[Dict[int, Chapter]] = None
+    ) -> str:
+        """用已加载的 Episode 和营销文案渲染 Markdown，没有文案时返回空字符串"""
         if not posts:
             return ""
 
@@ -205,7 +290,7 @@ class ObsidianService:
         header = f"# 营销文案 - {episode.display_title}\n\n"
 
         # 生成内容（按角度分组）
-        content = self._render_marketing_content(posts, episode)
+        content = self._render_marketing_content(posts, episode, chapters_by_id)
 
         markdown = (
             f"{frontmatter}\n\n"
@@ -227,17 +312,23 @@ class ObsidianService:
         """
         logger.info(f"保存营销文案: episode_id={episode_id}")
 
+        # 获取 Episode
+        episode = self.db.query(Episode).filter(Episode.id == episode_id).first()
+        if not episode:
+            raise ValueError(f"Episode not found: id={episode_id}")
+
         # 渲染 Markdown
-        markdown = self.render_marketing_posts(episode_id)
+        markdown = self._render_marketing_markdown(episode, self._get_marketing_posts(episode_id))
 
         if not markdown:
             logger.warning(f"没有营销文案可保存: episode_id={episode_id}")
             # 返回 None 或空路径
             return None
 
-        # 获取 Episode
-        episode = self.db.query(Episode).filter(Episode.id == episode_id).first()
+        return self._write_marketing_markdown(episode, markdown)
 
+    def _write_marketing_markdown(self, episode: Episode, markdown: str) -> Path:
+        """把营销文案 Markdown 写入 Vault 的 marketing 目录"""
         # 生成安全的文件名（使用 display_title）
         safe_title = self._sanitize_filename(episode.display_title)
         filename = f"{episode.id}-marketing-{safe_title}.md"
@@ -417,8 +508,13 @@ class ObsidianService:
             "---"
         )
 
-    def _render_marketing_content(self, posts: List[MarketingPost], episode: Episode) -> str:
-        """生成营销文案内容（按角度分组，使用 display_title）"""
+    def _render_marketing_content(
+        self,
+        posts: List[MarketingPost],
+        episode: Episode,
+        chapters_by_id: Optional[Dict[int, Chapter]] = None
+    ) -> str:
+        """生成营销文案内容（按角度分组，使用 display_title；传入 chapters_by_id 时不再逐条查询章节）"""
         # 按角度标签分组
         from collections import defaultdict
         posts_by_angle = defaultdict(list)
@@ -440,7 +536,10 @@ class ObsidianService:
                 # 章节标识（使用 display_title）
                 chapter_info = ""
                 if post.chapter_id:
-                    chapter = self.db.query(Chapter).filter(Chapter.id == post.chapter_id).first()
+                    if chapters_by_id is not None:
+                        chapter = chapters_by_id.get(post.chapter_id)
+                    else:
+                        chapter = self.db.query(Chapter).filter(Chapter.id == post.chapter_id).first()
                     if chapter:
                         chapter_display_title = chapter.display_title(episode)
                         chapter_info = f"\n\n> **章节**: {chapter_display_title} ({chapter.start_time:.0f}s - {chapter.end_time:.0f}s)\n"
@@ -523,9 +622,17 @@ class ObsidianService:
             + "\n".join(rows)
         )
 
-    def _render_chapters_content(self, chapters: List[Chapter], episode: Episode, language_code: str) -> str:
+    def _render_chapters_content(
+        self,
+        chapters: List[Chapter],
+        episode: Episode,
+        language_code: str,
+        record_offsets: Optional[Dict[int, Tuple[int, int]]] = None
+    ) -> str:
         """生成章节内容（使用 display_title）"""
         sections = []
+        # 当前 section 在 "\n".join(sections) 结果中的起始位置
+        position = 0
 
         for chapter in chapters:
             # 使用 display_title（不包含序号前缀）
@@ -548,16 +655,27 @@ class ObsidianService:
                 TranscriptCue.start_time < chapter.end_time
             ).order_by(TranscriptCue.start_time).all()
 
-            section_table = self._render_bilingual_table(cues, language_code)
+            table_offsets = {} if record_offsets is not None else None
+            section_table = self._render_bilingual_table(cues, language_code, table_offsets)
+
+            section_head = section_title + section_summary
+            if record_offsets is not None:
+                self._shift_offsets(table_offsets, position + len(section_head), record_offsets)
 
-            sections.append(section_title + section_summary + section_table)
+            sections.append(section_head + section_table)
 
             # 章节分隔符
             sections.append("\n---\n")
+            position += len(sections[-2]) + len(sections[-1]) + 2
 
         return "\n".join(sections)
 
-    def _render_all_cues_content(self, episode_id: int, language_code: str) -> str:
+    def _render_all_cues_content(
+        self,
+        episode_id: int,
+        language_code: str,
+        record_offsets: Optional[Dict[int, Tuple[int, int]]] = None
+    ) -> str:
         """生成所有 Cue 的表格（无章节时）"""
         # 获取所有 TranscriptCue
         cues = self.db.query(TranscriptCue).join(
@@ -566,9 +684,19 @@ class ObsidianService:
             AudioSegment.episode_id == episode_id
         ).order_by(TranscriptCue.start_time).all()
 
-        return "## 字幕内容\n\n" + self._render_bilingual_table(cues, language_code)
+        heading = "## 字幕内容\n\n"
+        table_offsets = {} if record_offsets is not None else None
+        table = self._render_bilingual_table(cues, language_code, table_offsets)
+        if record_offsets is not None:
+            self._shift_offsets(table_offsets, len(heading), record_offsets)
+        return heading + table
 
-    def _render_bilingual_table(self, cues: List[TranscriptCue], language_code: str) -> str:
+    def _render_bilingual_table(
+        self,
+        cues: List[TranscriptCue],
+        language_code: str,
+        record_offsets: Optional[Dict[int, Tuple[int, int]]] = None
+    ) -> str:
         """
         生成双语字幕区块（按说话人分组）
 
@@ -588,12 +716,16 @@ class ObsidianService:
         [00:12](cue://1456) Hello，everyone！
 
         大家好！
+
+        传入 record_offsets 时，写入每条翻译文本在返回字符串中的字符区间。
         """
         if not cues:
             return "暂无字幕内容"
 
         lines = []
         current_speaker = None
+        position = 0  # lines[line_count] 在 "\n".join(lines) 结果中的起始位置
+        line_count = 0
 
         for i, cue in enumerate(cues):
             translation = cue.get_translation(language_code)
@@ -623,11 +755,26 @@ class ObsidianService:
             lines.append(f"{cue.obsidian_anchor} {text_content}")
             # 英文后空一行（中英分隔）
             lines.append("")
-            # 添加中文翻译
+            # 添加中文翻译；只有调用方需要字符区间时才累计位置
+            if record_offsets is not None:
+                position += sum(len(line) + 1 for line in lines[line_count:])
+                record_offsets[cue.id] = (position, position + len(translation_text))
+                position += len(translation_text) + 1
             lines.append(translation_text)
+            line_count = len(lines)
 
         return "\n".join(lines)
 
+    @staticmethod
+    def _shift_offsets(
+        offsets: Dict[int, Tuple[int, int]],
+        delta: int,
+        target: Dict[int, Tuple[int, int]]
+    ) -> None:
+        """把局部片段内的字符区间平移 delta 后写入 target"""
+        for cue_id, (start, end) in offsets.items():
+            target[cue_id] = (start + delta, end + delta)
+
     # ========================================================================
     # 私有辅助方法 - 解析
     # ========================================================================
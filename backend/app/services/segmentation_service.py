@@ -28,20 +28,23 @@ logger = logging.getLogger(__name__)
 # 兜底策略常量（折中：优先完整，仅在 API 失败时重试采样，且采样粒度温和）
 FALLBACK_MAX_CUES = 2000  # 采样兜底时 2000 条（75 分钟约 2.25 秒/条，保留更多语义与转折点）
 
+SEGMENTATION_SYSTEM_PROMPT = "你是一个专业的音频内容分析师。你擅长识别内容的语义结构，拒绝机械式时间切分，始终保持章节的语义完整性。对于短内容，你会减少切分；对于长内容，你会适当增加切分点，但绝不碎片化。"
+
 # Prompt 模板 - Chain-of-Thought 两步骤 + Few-shot
+# 变量（时长、transcript）只出现在模板末尾，使不同 Episode 的请求共享相同前缀，可命中 provider 的前缀缓存
 SEGMENTATION_PROMPT_FULL = """
 你是一个专业的音频内容分析师。请分析以下英文转录文本，进行**自适应语义章节划分**。
 
 **输入：**
 - 英文 Transcript（完整内容，含时间戳 [MM:SS]）
-- 总时长：{duration} 分钟（{duration_seconds} 秒）
+- 总时长（见文末，与 Transcript 一起给出）
 
 **时间戳格式：** [MM:SS] 表示 分:秒，如 [25:00]=1500秒，[37:30]=2250秒
 
 **核心原则：**
 1. 章节划分依据语义转折点，拒绝机械切分
 2. 章节数量上限：短内容最多2章，中等最多4章，长内容最多6章
-3. 时间范围必须覆盖 [0, {duration_seconds}秒] 完整区间
+3. 时间范围必须覆盖 [0, 总时长秒数] 完整区间
 
 **Chain-of-Thought 两步骤思路：**
 
@@ -102,6 +105,8 @@ SEGMENTATION_PROMPT_FULL = """
 
 **请仿照上述格式，对下方 Transcript 进行分析并输出 JSON：**
 
+**总时长：** {duration} 分钟（{duration_seconds} 秒），时间范围必须覆盖 [0, {duration_seconds}秒]
+
 **Transcript:**
 {transcript}
 """
@@ -109,7 +114,7 @@ SEGMENTATION_PROMPT_FULL = """
 SEGMENTATION_PROMPT_SAMPLED = """
 你是一个专业的音频内容分析师。以下是从完整内容均匀采样的 transcript 片段，请推断完整内容的章节划分。
 
-**输入：** 采样 Transcript（含时间戳 [MM:SS]），总时长 {duration} 分钟（{duration_seconds} 秒）
+**输入：** 采样 Transcript（含时间戳 [MM:SS]），总时长见文末
 
 **时间戳格式：** [MM:SS] = 分:秒，如 [25:00]=1500秒
 
@@ -128,6 +133,8 @@ SEGMENTATION_PROMPT_SAMPLED = """
 {{"step1_reasoning": "第一步：...", "chapters": [{{"start_time": 0.0, "end_time": 750.0, "reasoning": "第二步：1) 锁定... 2) 该段讨论... 3) 故标题「...」", "title": "...", "summary": "..."}}]}}
 ```
 
+**总时长：** {duration} 分钟（{duration_seconds} 秒）
+
 **Transcript (采样):**
 {transcript}
 """
@@ -594,7 +601,7 @@ class SegmentationService:
 
             # Invoke with retry logic
             messages = [
-                SystemMessage(content="你是一个专业的音频内容分析师。你擅长识别内容的语义结构，拒绝机械式时间切分，始终保持章节的语义完整性。对于短内容，你会减少切分；对于长内容，你会适当增加切分点，但绝不碎片化。"),
+                SystemMessage(content=SEGMENTATION_SYSTEM_PROMPT),
                 HumanMessage(content=prompt)
             ]
 
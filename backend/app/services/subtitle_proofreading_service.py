@@ -6,10 +6,12 @@ Scans for errors in proper nouns, linking, and punctuation, and provides correct
 
 Migrated to use StructuredLLM with Pydantic validation and retry logic.
 """
+import json
 import logging
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 from sqlalchemy.orm import Session
@@ -21,6 +23,7 @@ from app.config import (
     AI_QUERY_TIMEOUT,
     AI_TEMPERATURE_PROOFREADING
 )
+from app.services.ai.batch import batch_endpoint, run_batch_job
 from app.services.ai.structured_llm import StructuredLLM
 from app.services.ai.schemas.proofreading_schema import ProofreadingResponse
 from app.services.ai.validators.proofreading_validator import ProofreadingValidator
@@ -30,6 +33,9 @@ logger = logging.getLogger(__name__)
 # Default AI provider
 DEFAULT_AI_PROVIDER = "moonshot"
 
+# Default seconds scan_and_correct_batch waits for a Batch job before giving up
+BATCH_DEFAULT_TIMEOUT = 30 * 60
+
 # Type alias for backward compatibility
 if TYPE_CHECKING:
     from app.services.ai.schemas.proofreading_schema import CorrectionSuggestion as CorrectionSuggestionType
@@ -106,6 +112,11 @@ class SubtitleProofreadingService:
             else:
                 raise ValueError(f"Unsupported provider: {provider}")
 
+        # Kept for the OpenAI-compatible Batch API (scan_and_correct_batch)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+
         try:
             self.structured_llm = StructuredLLM(
                 provider=provider,
@@ -123,15 +134,22 @@ class SubtitleProofreadingService:
         self,
         episode_id: int,
         batch_size: int = 50,
-        apply: bool = True
+        apply: bool = True,
+        max_concurrency: int = 1
     ) -> CorrectionResult:
         """
         Scan and correct subtitles for an episode.
 
+        By default all cues are sent to the LLM in a single call, so the model
+        sees the whole episode as context. With max_concurrency > 1 the cues are
+        split into batches of batch_size and the batches are scanned in
+        parallel threads.
+
         Args:
             episode_id: Episode ID
-            batch_size: Number of cues to process per batch
+            batch_size: Number of cues per LLM call when max_concurrency > 1
             apply: Whether to automatically apply corrections to database
+            max_concurrency: Maximum number of LLM calls in flight at once
 
         Returns:
             CorrectionResult: Summary of corrections made
@@ -139,7 +157,134 @@ class SubtitleProofreadingService:
         Raises:
             ValueError: Episode not found or has no cues
         """
-        # Get episode
+        episode, cues = self._get_episode_cues(episode_id)
+        start_time = datetime.now()
+
+        # Filter out already corrected cues (for checkpoint recovery)
+        uncorrected_cues = [c for c in cues if not c.is_corrected]
+
+        all_corrections = []
+        if uncorrected_cues and max_concurrency > 1:
+            # Scan batches concurrently; map() keeps corrections in cue order
+            batches = [
+                uncorrected_cues[i:i + batch_size]
+                for i in range(0, len(uncorrected_cues), batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+                for batch_corrections in executor.map(self._scan_batch, batches):
+                    all_corrections.extend(batch_corrections)
+        elif uncorrected_cues:
+            # Process all cues at once (no batching)
+            all_corrections = self._scan_batch(uncorrected_cues)
+
+        return self._finish_scan(episode, cues, uncorrected_cues, all_corrections, apply, start_time)
+
+    def scan_and_correct_batch(
+        self,
+        episode_id: int,
+        batch_size: int = 50,
+        apply: bool = True,
+        poll_interval: float = 5.0,
+        timeout: float = BATCH_DEFAULT_TIMEOUT
+    ) -> CorrectionResult:
+        """
+        Scan and correct subtitles through the provider's Batch API.
+
+        All batches of cues are written to one JSONL file and submitted as a
+        single OpenAI-compatible Batch job instead of one request per batch.
+        The job is polled until it finishes, then the results are joined back
+        to their batches by custom_id. Batch jobs are asynchronous and cheaper
+        but not real-time, so this suits offline or CI runs.
+
+        Args:
+            episode_id: Episode ID
+            batch_size: Number of cues per request line in the batch file
+            apply: Whether to automatically apply corrections to database
+            poll_interval: Initial seconds between status polls (doubles, capped at 60s)
+            timeout: Maximum seconds to wait for the batch job
+
+        Returns:
+            CorrectionResult: Summary of corrections made
+
+        Raises:
+            ValueError: Episode not found, has no cues, or provider has no Batch API
+            TimeoutError: The batch job did not finish within timeout seconds
+            RuntimeError: The batch job finished without completing
+        """
+        if self.provider == "gemini":
+            raise ValueError("Batch proofreading requires an OpenAI-compatible provider")
+        if not self.base_url:
+            raise ValueError("Batch proofreading requires base_url")
+
+        episode, cues = self._get_episode_cues(episode_id)
+        start_time = datetime.now()
+
+        uncorrected_cues = [c for c in cues if not c.is_corrected]
+        batches = [
+            uncorrected_cues[i:i + batch_size]
+            for i in range(0, len(uncorrected_cues), batch_size)
+        ]
+
+        all_corrections = []
+        if batches:
+            # Job failures propagate: an unfinished batch must not look like "no corrections"
+            contents = self._run_batch_job(batches, poll_interval, timeout)
+
+            for i, batch in enumerate(batches):
+                content = contents.get(f"batch-{i}")
+                if content is None:
+                    logger.warning(f"No batch result for cues {batch[0].id}-{batch[-1].id}, skipping")
+                    continue
+                try:
+                    result = ProofreadingResponse.model_validate_json(content)
+                    all_corrections.extend(self._to_suggestions(result, batch))
+                except Exception as e:
+                    logger.error(f"Invalid batch result for cues {batch[0].id}-{batch[-1].id}: {e}")
+
+        return self._finish_scan(episode, cues, uncorrected_cues, all_corrections, apply, start_time)
+
+    def _run_batch_job(
+        self,
+        batches: List[List[TranscriptCue]],
+        poll_interval: float,
+        timeout: float
+    ) -> Dict[str, str]:
+        """
+        Submit one Batch job for all cue batches and wait for its output.
+
+        Returns:
+            Dict[str, str]: custom_id -> response message content
+
+        Raises:
+            TimeoutError: The job did not finish within timeout seconds
+            RuntimeError: The job finished without completing
+        """
+        from openai import OpenAI
+
+        client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+
+        lines = []
+        for i, batch in enumerate(batches):
+            system_prompt, user_prompt = self._build_prompts(batch)
+            lines.append((f"batch-{i}", {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "temperature": AI_TEMPERATURE_PROOFREADING,
+                "response_format": {"type": "json_object"}
+            }))
+
+        return run_batch_job(client, lines, batch_endpoint(self.base_url), poll_interval, timeout)
+
+    def _get_episode_cues(self, episode_id: int) -> Tuple[Episode, List[TranscriptCue]]:
+        """
+        Load an episode and all of its cues ordered by start time.
+
+        Raises:
+            ValueError: Episode not found or has no cues
+        """
         episode = self.db.get(Episode, episode_id)
         if not episode:
             raise ValueError(f"Episode not found: id={episode_id}")
@@ -154,17 +299,18 @@ class SubtitleProofreadingService:
         if not cues:
             raise ValueError(f"No cues found for episode {episode_id}")
 
-        start_time = datetime.now()
-
-        # Filter out already corrected cues (for checkpoint recovery)
-        uncorrected_cues = [c for c in cues if not c.is_corrected]
-        skipped_count = len(cues) - len(uncorrected_cues)
-
-        # Process all cues at once (no batching)
-        all_corrections = []
-        if uncorrected_cues:
-            all_corrections = self._scan_batch(uncorrected_cues)
+        return episode, cues
 
+    def _finish_scan(
+        self,
+        episode: Episode,
+        cues: List[TranscriptCue],
+        uncorrected_cues: List[TranscriptCue],
+        all_corrections: List[CorrectionSuggestionType],
+        apply: bool,
+        start_time: datetime
+    ) -> CorrectionResult:
+        """Apply corrections if requested and build the CorrectionResult."""
         # Apply corrections if requested
         if apply and all_corrections:
             corrected_count = self.apply_corrections(all_corrections, cues=uncorrected_cues)
@@ -182,7 +328,7 @@ class SubtitleProofreadingService:
         return CorrectionResult(
             total_cues=len(cues),
             corrected_count=corrected_count,
-            skipped_count=skipped_count,
+            skipped_count=len(cues) - len(uncorrected_cues),
             corrections=all_corrections,
             duration_seconds=duration
         )
@@ -201,6 +347,67 @@ class SubtitleProofreadingService:
             logger.warning("No StructuredLLM available, returning empty corrections")
             return []
 
+        system_prompt, user_prompt = self._build_prompts(cues)
+
+        try:
+            # Get structured output LLM
+            structured_llm = self.structured_llm.with_structured_output(
+                schema=ProofreadingResponse
+            )
+
+            # Invoke with retry logic
+            messages = [
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=user_prompt)
+            ]
+
+            from app.services.ai.retry import ai_retry
+
+            @ai_retry(max_retries=2, initial_delay=1.0)
+            def call_llm_with_retry():
+                return structured_llm.invoke(messages)
+
+            result: ProofreadingResponse = call_llm_with_retry()
+            suggestions = self._to_suggestions(result, cues)
+
+            logger.info(f"LLM found {len(suggestions)} corrections in batch of {len(cues)} cues")
+            return suggestions
+
+        except FutureTimeoutError:
+            logger.error("AI proofreading timeout, returning empty corrections")
+            return []
+        except Exception as e:
+            logger.error(f"AI proofreading failed: {e}, returning empty corrections")
+            return []
+
+    def _to_suggestions(
+        self,
+        result: ProofreadingResponse,
+        cues: List[TranscriptCue]
+    ) -> List[CorrectionSuggestionType]:
+        """Validate an LLM response against its cues and convert it to dicts."""
+        # Business validation
+        valid_cue_ids = {c.id for c in cues}
+        result = ProofreadingValidator.validate(
+            result,
+            valid_cue_ids=valid_cue_ids,
+            total_cues=len(cues)
+        )
+
+        # Convert to dict format for backward compatibility
+        return [
+            {
+                "cue_id": corr.cue_id,
+                "original_text": corr.original_text,
+                "corrected_text": corr.corrected_text,
+                "reason": corr.reason,
+                "confidence": corr.confidence
+            }
+            for corr in result.corrections
+        ]
+
+    def _build_prompts(self, cues: List[TranscriptCue]) -> Tuple[str, str]:
+        """Build the (system, user) proofreading prompts for a batch of cues."""
         # Prepare subtitle list for LLM
         subtitle_list = []
         for cue in cues:
@@ -242,58 +449,11 @@ class SubtitleProofreadingService:
 - 只返回确实需要修正的内容"""
 
         user_prompt = f"""**字幕列表**：
-{__import__('json').dumps(subtitle_list, ensure_ascii=False)}
+{json.dumps(subtitle_list, ensure_ascii=False)}
 
 请检查以上字幕，返回需要修正的内容（JSON格式）："""
 
-        try:
-            # Get structured output LLM
-            structured_llm = self.structured_llm.with_structured_output(
-                schema=ProofreadingResponse
-            )
-
-            # Invoke with retry logic
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-
-            from app.services.ai.retry import ai_retry
-
-            @ai_retry(max_retries=2, initial_delay=1.0)
-            def call_llm_with_retry():
-                return structured_llm.invoke(messages)
-
-            result: ProofreadingResponse = call_llm_with_retry()
-
-            # Business validation
-            valid_cue_ids = {c.id for c in cues}
-            result = ProofreadingValidator.validate(
-                result,
-                valid_cue_ids=valid_cue_ids,
-                total_cues=len(cues)
-            )
-
-            # Convert to dict format for backward compatibility
-            suggestions = []
-            for corr in result.corrections:
-                suggestions.append({
-                    "cue_id": corr.cue_id,
-                    "original_text": corr.original_text,
-                    "corrected_text": corr.corrected_text,
-                    "reason": corr.reason,
-                    "confidence": corr.confidence
-                })
-
-            logger.info(f"LLM found {len(suggestions)} corrections in batch of {len(cues)} cues")
-            return suggestions
-
-        except FutureTimeoutError:
-            logger.error("AI proofreading timeout, returning empty corrections")
-            return []
-        except Exception as e:
-            logger.error(f"AI proofreading failed: {e}, returning empty corrections")
-            return []
+        return system_prompt, user_prompt
 
     def apply_corrections(
         self,
@@ -438,21 +598,19 @@ class SubtitleProofreadingService:
         if not cues:
             raise ValueError(f"No cues found for episode {episode_id}")
 
-        # Write SRT file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for i, cue in enumerate(cues, 1):
-                # Format timestamps as HH:MM:SS,mmm
-                start_time = self._format_srt_time(cue.start_time)
-                end_time = self._format_srt_time(cue.end_time)
-
-                # Use effective text (corrected if available, otherwise original)
-                text = cue.effective_text
-
-                # Write subtitle entry
-                f.write(f"{i}\n")
-                f.write(f"{start_time} --> {end_time}\n")
-                f.write(f"[{cue.speaker}] {text}\n")
-                f.write("\n")
+        # Build SRT content and write it in a single call
+        entries = []
+        for i, cue in enumerate(cues, 1):
+            # Format timestamps as HH:MM:SS,mmm
+            start_time = self._format_srt_time(cue.start_time)
+            end_time = self._format_srt_time(cue.end_time)
+
+            # Use effective text (corrected if available, otherwise original)
+            text = cue.effective_text
+
+            entries.append(f"{i}\n{start_time} --> {end_time}\n[{cue.speaker}] {text}\n\n")
+
+        Path(output_path).write_text("".join(entries), encoding='utf-8')
 
         logger.info(f"Exported {len(cues)} cues to {output_path}")
         return len(cues)
@@ -31,10 +31,13 @@ import whisperx
 from whisperx.diarize import DiarizationPipeline
 import torch
 
-from app.config import HF_TOKEN, WHISPER_MODEL, AUDIO_TEMP_DIR
+from app.config import HF_TOKEN, WHISPER_MODEL, WHISPER_COMPUTE_TYPE, AUDIO_TEMP_DIR
 
 logger = logging.getLogger(__name__)
 
+# GPU 上 Pyannote 分割模型的批大小（默认 1，逐窗口推理，GPU 利用率很低）
+DIARIZATION_SEGMENTATION_BATCH_SIZE = 32
+
 try:
     import psutil
     PSUTIL_AVAILABLE = True
@@ -102,7 +105,7 @@ class WhisperService:
         # 1. 设备检测
         if torch.cuda.is_available():
             cls._device = "cuda"
-            cls._compute_type = "float16"
+            cls._compute_type = WHISPER_COMPUTE_TYPE
             device_name = torch.cuda.get_device_name(0)
             logger.info(f"[WhisperService] 硬件就绪: {device_name} (CUDA)")
         else:
@@ -183,6 +186,11 @@ class WhisperService:
                     device=self._device
                 )
 
+                # GPU 上批量推理分割窗口
+                pipeline = self._diarize_model.model
+                if self._device == "cuda" and hasattr(pipeline, "segmentation_batch_size"):
+                    pipeline.segmentation_batch_size = DIARIZATION_SEGMENTATION_BATCH_SIZE
+
                 # 记录加载后内存状态
                 post_memory_info = self.get_memory_info()
                 logger.info(f"[WhisperService] Pyannote 模型加载成功 | 加载后内存状态: {post_memory_info}")
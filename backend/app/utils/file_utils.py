@@ -5,7 +5,8 @@
 提供文件处理相关的工具函数：
 1. 异步 MD5 计算（不阻塞主线程）
 2. 音频时长获取
-3. 文件格式验证
+3. 一次性探测音频文件（MD5 + 时长 + 大小）
+4. 文件格式验证
 """
 import asyncio
 import hashlib
@@ -49,19 +50,33 @@ def calculate_md5_sync(file_path: str) -> str:
     注意:
         - 使用分块读取（1MB chunks），节省内存
         - 适用于大文件（不会一次性加载到内存）
+        - Python 3.11+ 使用 hashlib.file_digest，读取与哈希都在 C 层完成
     """
-    hash_md5 = hashlib.md5()
     try:
         with open(file_path, "rb") as f:
-            # 分块读取，每次 1MB
-            for chunk in iter(lambda: f.read(1024 * 1024), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            return _md5_of_file(f)
     except Exception as e:
         logger.error(f"计算 MD5 失败: {file_path}, 错误: {e}", exc_info=True)
         raise
 
 
+def _md5_of_file(f) -> str:
+    """从已打开的二进制文件当前位置读到末尾，返回 MD5 十六进制字符串"""
+    if hasattr(hashlib, "file_digest"):
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+    # 旧版本：复用同一个 1MB 缓冲区分块读取，避免每块分配新的 bytes
+    hash_md5 = hashlib.md5()
+    buf = bytearray(1024 * 1024)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        hash_md5.update(view[:n])
+    return hash_md5.hexdigest()
+
+
 async def calculate_md5_async(file_path: str) -> str:
     """
     异步计算文件 MD5（不阻塞主线程）
@@ -182,6 +197,46 @@ def get_audio_duration(file_path: str) -> float:
         raise RuntimeError(f"无法获取音频时长: {str(e)}") from e
 
 
+# ==================== 一次性探测音频文件 ====================
+
+def probe_audio_file(file_path: str) -> Tuple[str, float, int]:
+    """
+    一次性获取音频文件的 MD5、时长和大小
+
+    参数:
+        file_path: 音频文件路径
+
+    返回:
+        Tuple[str, float, int]: (MD5 十六进制字符串, 时长秒数, 文件字节数)
+
+    异常:
+        FileNotFoundError: 文件不存在
+        RuntimeError: 无法获取时长（同 get_audio_duration）
+
+    注意:
+        - 文件只打开、顺序读取一次：大小取自同一个文件句柄（fstat），
+          读取前提示内核顺序预读（仅支持 posix_fadvise 的平台）
+        - ffprobe 只读文件头，放在线程池中与 MD5 计算并行执行
+    """
+    duration_future = _executor.submit(get_audio_duration, file_path)
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            file_hash = _md5_of_file(f)
+    except Exception as e:
+        logger.error(f"计算 MD5 失败: {file_path}, 错误: {e}", exc_info=True)
+        raise
+    finally:
+        # 等 ffprobe 结束，避免失败时遗留后台任务
+        duration_error = duration_future.exception()
+
+    if duration_error is not None:
+        raise duration_error
+    return file_hash, duration_future.result(), size
+
+
 # ==================== 文件内容真伪验证 ====================
 
 def is_valid_audio_header(file_path: str) -> bool:
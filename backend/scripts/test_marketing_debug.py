@@ -20,12 +20,33 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 # 设置日志级别
 logging.basicConfig(level=logging.DEBUG, format='%(levelname)s - %(message)s')
 
-from app.database import get_session
+# VERBOSE=0 时跳过逐角度的详细输出（如 CI 中重定向输出）
+VERBOSE = os.environ.get("VERBOSE", "1") == "1"
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.config import DATABASE_PATH
 from app.services.marketing_service import MarketingService
 from app.models import Episode
 
+
+def _set_readonly_pragma(dbapi_conn, connection_record):
+    """调试脚本只读：禁止写入，临时表放内存，启用 mmap 读取"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA query_only=1")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
 def main():
-    with get_session() as db:
+    # 独立的只读引擎，不影响应用全局引擎
+    engine = create_engine(f"sqlite:///{DATABASE_PATH}")
+    event.listen(engine, "connect", _set_readonly_pragma)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    with session_factory() as db:
         episode = db.query(Episode).filter(Episode.id == 18).first()
         if episode:
             print(f"\n测试 Episode: {episode.title} (ID: {episode.id})")
@@ -36,13 +57,17 @@ def main():
 
             print(f"\n生成 {len(copies)} 个角度")
             print("=" * 60)
-            for i, copy in enumerate(copies, 1):
-                angle_tag = copy.metadata.get("angle_tag", "未知")
-                print(f"\n角度{i}: {angle_tag}")
-                print(f"  标题: {copy.title}")
-                print(f"  内容长度: {len(copy.content)} 字符")
-                print(f"  标签: {' '.join(copy.hashtags)}")
-                print(f"  内容预览: {copy.content[:100]}...")
+            if VERBOSE:
+                for i, copy in enumerate(copies, 1):
+                    angle_tag = copy.metadata.get("angle_tag", "未知")
+                    print(f"\n角度{i}: {angle_tag}")
+                    print(f"  标题: {copy.title}")
+                    print(f"  内容长度: {len(copy.content)} 字符")
+                    print(f"  标签: {' '.join(copy.hashtags)}")
+                    print(f"  内容预览: {copy.content[:100]}...")
+
+    engine.dispose()
+
 
 if __name__ == "__main__":
     main()
@@ -21,18 +21,19 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 # 设置必需的环境变量（用于测试）
-os.environ.setdefault("HF_TOKEN", "dummy_token")
-os.environ.setdefault("MOONSHOT_API_KEY", os.environ.get("MOONSHOT_API_KEY", "dummy_key"))
-os.environ.setdefault("GEMINI_API_KEY", "dummy_key")
-os.environ.setdefault("ZHIPU_API_KEY", "dummy_key")
+_ENV_DEFAULTS = {
+    "HF_TOKEN": "dummy_token",
+    "MOONSHOT_API_KEY": "dummy_key",
+    "GEMINI_API_KEY": "dummy_key",
+    "ZHIPU_API_KEY": "dummy_key",
+}
+os.environ.update({k: v for k, v in _ENV_DEFAULTS.items() if k not in os.environ})
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.database import get_session
-from app.services.marketing_service import MarketingService
-from app.models import Episode
-from sqlalchemy import desc
+# 作为 Episode 摘要的最大字符数
+SUMMARY_MAX_CHARS = 2000
 
 
 def print_section(title: str):
@@ -49,15 +50,21 @@ def main():
         print("  python scripts/test_marketing_real_ai.py D:\\\\path\\\\to\\\\017_fulltext.txt")
         return
 
+    # 参数校验通过后再加载数据库与服务模块，避免用法提示也要付出导入开销
+    from app.database import get_session
+    from app.services.marketing_service import MarketingService
+    from app.models import Episode
+
     file_path = sys.argv[1]
 
     # 读取文件内容
     print_section("步骤 1: 读取文件内容")
     try:
+        # 只读取摘要所需的前 SUMMARY_MAX_CHARS 个字符，避免整文件载入内存
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            content = f.read(SUMMARY_MAX_CHARS)
         print(f"文件: {file_path}")
-        print(f"内容长度: {len(content)} 字符")
+        print(f"文件大小: {os.path.getsize(file_path)} 字节")
         print(f"预览前 200 字:")
         print("-" * 70)
         print(content[:200])
@@ -89,7 +96,7 @@ def main():
                 file_hash=f"test_{file_name}",
                 duration=300.0,
                 source_url=f"file://{file_path}",
-                ai_summary=content[:2000] if len(content) > 2000 else content,  # 限制摘要长度
+                ai_summary=content,  # 读取时已限制摘要长度
                 workflow_status=5  # TRANSLATED 状态
             )
             db.add(episode)
@@ -98,7 +105,7 @@ def main():
 
         # 创建 MarketingService
         print_section("步骤 3: 初始化 AI 服务")
-        service = MarketingService(db, llm_service=None)
+        service = MarketingService(db)
 
         # 检查 AI 服务配置
         from app.config import MOONSHOT_API_KEY, MOONSHOT_MODEL
@@ -149,22 +156,33 @@ def main():
             traceback.print_exc()
             return
 
-        # 生成多个角度
+        # 生成多个角度（一次 LLM 调用返回全部角度，共享同一份字幕上下文）
         print_section("步骤 6: 生成多角度文案")
 
-        angles = ["干货硬核向", "轻松有趣向", "深度思考向"]
-        for angle in angles:
-            try:
-                copy = service.generate_xiaohongshu_copy(episode.id)
-                post = service.save_marketing_copy(
-                    episode_id=episode.id,
-                    copy=copy,
-                    platform="xhs",
-                    angle_tag=angle
-                )
-                print(f"  ✓ [{angle}] 文案 ID: {post.id}")
-            except Exception as e:
-                print(f"  ✗ [{angle}] 生成失败: {e}")
+        try:
+            copies = service.generate_xiaohongshu_copy_multi_angle(episode.id)
+        except Exception as e:
+            print(f"  ✗ 多角度文案生成失败: {e}")
+            copies = []
+
+        # 所有角度在同一个事务中批量写入
+        posts = [
+            service.build_marketing_post(
+                episode_id=episode.id,
+                copy=copy,
+                platform="xhs",
+                angle_tag=copy.metadata.get("angle_tag", "未知")
+            )
+            for copy in copies
+        ]
+        try:
+            db.add_all(posts)
+            db.commit()
+            for post in posts:
+                print(f"  ✓ [{post.angle_tag}] 文案 ID: {post.id}")
+        except Exception as e:
+            db.rollback()
+            print(f"  ✗ 多角度文案保存失败: {e}")
 
         # 总结
         print_section("测试完成!")
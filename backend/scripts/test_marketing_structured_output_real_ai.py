@@ -18,8 +18,9 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 from loguru import logger
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.models.base import Base
 from app.models import Episode, MarketingPost
@@ -31,23 +32,35 @@ from app.config import (
 )
 
 
-def setup_in_memory_db():
-    """创建内存数据库用于测试"""
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False}
-    )
-    Base.metadata.create_all(engine)
+def _set_sqlite_pragma(dbapi_conn, connection_record):
+    """内存测试库无需持久化：关闭日志落盘和同步"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
 
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+
+# 进程内共享的内存数据库：StaticPool 复用同一连接，建表只执行一次
+_ENGINE = create_engine(
+    "sqlite:///file:testdb?mode=memory&cache=shared&uri=true",
+    poolclass=StaticPool,
+    connect_args={"check_same_thread": False}
+)
+event.listen(_ENGINE, "connect", _set_sqlite_pragma)
+Base.metadata.create_all(_ENGINE)
+_SessionLocal = sessionmaker(bind=_ENGINE)
+
+
+def setup_in_memory_db():
+    """创建内存数据库会话用于测试（共享模块级 engine 与 schema）"""
+    return _SessionLocal()
 
 
 def create_test_episode(db_session, title: str = "测试Episode"):
     """创建测试 Episode"""
     import hashlib
     # 生成唯一文件哈希
-    file_hash = hashlib.md5(title.encode()).hexdigest()
+    file_hash = hashlib.blake2b(title.encode(), digest_size=16).hexdigest()
 
     episode = Episode(
         title=title,
@@ -115,8 +128,8 @@ def test_marketing_service_structured_output():
             logger.info(f"\n[角度 {i}] {angle_tag}")
             logger.info(f"  标题: {copy.title}")
             logger.info(f"  内容长度: {len(copy.content)} 字符")
-            logger.info(f"  标签: {', '.join(copy.hashtags)}")
-            logger.info(f"  内容预览: {copy.content[:100]}...")
+            logger.opt(lazy=True).info("  标签: {}", lambda: ', '.join(copy.hashtags))
+            logger.opt(lazy=True).info("  内容预览: {}...", lambda: copy.content[:100])
 
             # 验证数据
             assert copy.title, "标题不能为空"
@@ -4,6 +4,7 @@ MarketingService 真实数据测试脚本
 使用方法：
 1. 激活虚拟环境: D:\programming_enviroment\EnglishPod-knowledgeBase\backend\venv-kb\Scripts\Activate.ps1
 2. 运行脚本: python scripts/test_marketing_with_real_data.py
+3. 冒烟测试全部已翻译 Episode: python scripts/test_marketing_with_real_data.py --all [--max-workers 4]
 
 功能：
 1. 从数据库获取最新的 Episode
@@ -11,8 +12,11 @@ MarketingService 真实数据测试脚本
 3. 保存到数据库
 4. 演示完整工作流
 """
+import argparse
 import os
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # 设置 UTF-8 编码输出（解决 Windows 终端 emoji 显示问题）
@@ -22,20 +26,17 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 # 设置临时环境变量
-os.environ.setdefault("HF_TOKEN", "dummy_token")
-os.environ.setdefault("MOONSHOT_API_KEY", "dummy_key")
-os.environ.setdefault("GEMINI_API_KEY", "dummy_key")
-os.environ.setdefault("ZHIPU_API_KEY", "dummy_key")
+_ENV_DEFAULTS = {
+    "HF_TOKEN": "dummy_token",
+    "MOONSHOT_API_KEY": "dummy_key",
+    "GEMINI_API_KEY": "dummy_key",
+    "ZHIPU_API_KEY": "dummy_key",
+}
+os.environ.update({k: v for k, v in _ENV_DEFAULTS.items() if k not in os.environ})
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.database import get_session
-from app.services.marketing_service import MarketingService
-from app.models import Episode, MarketingPost
-from app.enums.workflow_status import WorkflowStatus
-from sqlalchemy import desc
-
 
 def print_section(title: str):
     """打印分节标题"""
@@ -44,7 +45,123 @@ def print_section(title: str):
     print("=" * 70)
 
 
+# 已打印过完整堆栈的异常签名（异常类型 + 抛出位置）
+_seen_failures = set()
+
+
+def print_exc_once(e: BaseException) -> None:
+    """同一位置抛出的同类异常只打印一次完整堆栈，重复的只打印摘要"""
+    frames = traceback.extract_tb(e.__traceback__)
+    key = (type(e).__name__, tuple((f.filename, f.lineno) for f in frames))
+    if key in _seen_failures:
+        print(f"      (堆栈同上) {type(e).__name__}: {e}")
+        return
+    _seen_failures.add(key)
+    traceback.print_exception(type(e), e, e.__traceback__)
+
+
+# --all 模式的默认并发数（LLM 调用是 I/O 密集型，但需遵守 Moonshot 限流）
+DEFAULT_MAX_WORKERS = 4
+
+
+def process_one(episode_id: int) -> int:
+    """
+    为单个 Episode 生成并保存多角度文案（在工作线程中运行）
+
+    每个线程使用独立的数据库会话。
+
+    Args:
+        episode_id: Episode ID
+
+    Returns:
+        int: 保存的文案数量
+    """
+    from app.database import get_session
+    from app.services.marketing_service import MarketingService
+
+    with get_session() as db:
+        service = MarketingService(db)
+        copies = service.generate_xiaohongshu_copy_multi_angle(episode_id)
+        posts = [
+            service.build_marketing_post(
+                episode_id=episode_id,
+                copy=copy,
+                platform="xhs",
+                angle_tag=copy.metadata.get("angle_tag", "未知")
+            )
+            for copy in copies
+        ]
+        db.add_all(posts)
+        return len(posts)
+
+
+def run_all_episodes(max_workers: int) -> None:
+    """并发为所有已翻译的 Episode 生成营销文案"""
+    from app.database import get_session
+    from app.models import Episode
+    from app.enums.workflow_status import WorkflowStatus
+
+    print_section("MarketingService 批量冒烟测试 (--all)")
+
+    with get_session() as db:
+        episode_ids = [
+            row.id for row in db.query(Episode.id).filter(
+                Episode.workflow_status == WorkflowStatus.TRANSLATED.value
+            ).order_by(Episode.id).all()
+        ]
+
+    if not episode_ids:
+        print("\n没有找到已翻译的 Episode")
+        return
+
+    print(f"\n共 {len(episode_ids)} 个 Episode，并发数: {max_workers}")
+
+    succeeded = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_one, episode_id): episode_id
+            for episode_id in episode_ids
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            episode_id = futures[future]
+            try:
+                saved = future.result()
+                succeeded += 1
+                print(f"  [{done}/{len(futures)}] ✓ Episode {episode_id}: 保存 {saved} 条文案")
+            except Exception as e:
+                print(f"  [{done}/{len(futures)}] ✗ Episode {episode_id}: {e}")
+                print_exc_once(e)
+
+    print_section("批量测试完成!")
+    print(f"\n成功: {succeeded}/{len(episode_ids)}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="MarketingService 真实数据测试")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="并发处理所有已翻译的 Episode（默认只处理最新的一个）"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"--all 模式下的并发数（默认 {DEFAULT_MAX_WORKERS}）"
+    )
+    args = parser.parse_args()
+
+    if args.all:
+        run_all_episodes(args.max_workers)
+        return
+
+    # 延迟加载数据库与服务模块
+    from sqlalchemy import desc, func, select
+    from app.database import get_session
+    from app.services.marketing_service import MarketingService
+    from app.models import Episode, MarketingPost
+    from app.enums.workflow_status import WorkflowStatus
+
     print_section("MarketingService 真实数据测试")
 
     with get_session() as db:
@@ -66,7 +183,7 @@ def main():
         print()
 
         # 创建 MarketingService
-        service = MarketingService(db, llm_service=None)
+        service = MarketingService(db)
 
         # 步骤 1: 提取金句
         print_section("步骤 1: 提取金句")
@@ -155,26 +272,40 @@ def main():
         # 步骤 6: 演示多角度文案生成
         print_section("步骤 6: 演示多角度文案生成")
 
-        angles = ["轻松有趣向", "深度思考向", "实用干货向"]
-        print(f"\n为同一 Episode 生成 {len(angles)} 个不同角度的文案:")
+        # 一次 LLM 调用返回全部角度，共享同一份字幕上下文
+        try:
+            copies = service.generate_xiaohongshu_copy_multi_angle(episode.id)
+        except Exception as e:
+            print(f"  ✗ 多角度文案生成失败: {e}")
+            copies = []
+
+        print(f"\n为同一 Episode 生成 {len(copies)} 个不同角度的文案:")
 
-        for angle in angles:
-            try:
-                copy = service.generate_xiaohongshu_copy(episode.id)
-                post = service.save_marketing_copy(
-                    episode_id=episode.id,
-                    copy=copy,
-                    platform="xhs",
-                    angle_tag=angle
-                )
-                print(f"  ✓ [{angle}] 文案 ID: {post.id}")
-            except Exception as e:
-                print(f"  ✗ [{angle}] 生成失败: {e}")
+        # 所有角度在同一个事务中批量写入
+        posts = [
+            service.build_marketing_post(
+                episode_id=episode.id,
+                copy=copy,
+                platform="xhs",
+                angle_tag=copy.metadata.get("angle_tag", "未知")
+            )
+            for copy in copies
+        ]
+        try:
+            db.add_all(posts)
+            db.commit()
+            for post in posts:
+                print(f"  ✓ [{post.angle_tag}] 文案 ID: {post.id}")
+        except Exception as e:
+            db.rollback()
+            print(f"  ✗ 多角度文案保存失败: {e}")
 
-        # 验证数据库中的记录数
-        count = db.query(MarketingPost).filter(
-            MarketingPost.episode_id == episode.id
-        ).count()
+        # 验证数据库中的记录数（直接 SELECT count，不经过 ORM 子查询）
+        count = db.execute(
+            select(func.count(MarketingPost.id)).where(
+                MarketingPost.episode_id == episode.id
+            )
+        ).scalar()
         print(f"\n数据库中该 Episode 的营销文案总数: {count}")
 
         # 总结
@@ -30,17 +30,19 @@ sys.path.insert(0, str(project_root))
 env_path = project_root / ".env"
 load_dotenv(dotenv_path=env_path)
 
-try:
-    from notion_client import Client
-except ImportError:
-    print("未安装 notion-client 库")
-    print("请运行: pip install notion-client")
-    sys.exit(1)
-
 # 导入配置系统（NOTION_API_KEY 从环境变量加载）
 from app.config import NOTION_API_KEY, NOTION_PARENT_PAGE_ID, NOTION_API_VERSION
 
 
+def _mask(value) -> str:
+    """遮蔽密钥，只显示前 8 个字符和后 4 个字符；过短的值只提示已设置（长度异常）"""
+    if not value:
+        return "(未设置)"
+    if len(value) < 12:
+        return f"*** (已设置，但只有 {len(value)} 个字符)"
+    return f"{value[:8]}...{value[-4:]}"
+
+
 def diagnose_env_vars():
     """诊断环境变量配置"""
     print("\n" + "="*60)
@@ -57,18 +59,9 @@ def diagnose_env_vars():
 
     print("\n检查环境变量：")
     for name in possible_names:
-        value = os.environ.get(name)
-        if value:
-            masked = f"{value[:8]}...{value[-4:]}"
-            print(f"  {name}: {masked}")
-        else:
-            print(f"  {name}: (未设置)")
-
-    print(f"\nconfig.py 中的 NOTION_API_KEY: ", end="")
-    if NOTION_API_KEY:
-        print(f"{NOTION_API_KEY[:8]}...{NOTION_API_KEY[-4:]}")
-    else:
-        print("(未设置)")
+        print(f"  {name}: {_mask(os.environ.get(name))}")
+
+    print(f"\nconfig.py 中的 NOTION_API_KEY: {_mask(NOTION_API_KEY)}")
 
     return NOTION_API_KEY is not None
 
@@ -80,9 +73,15 @@ def test_api_connection():
     print("="*60)
 
     api_key = NOTION_API_KEY
-    # 只显示前 8 个字符和后 4 个字符
-    masked_key = f"{api_key[:8]}...{api_key[-4:]}"
-    print(f"API Token: {masked_key}")
+    print(f"API Token: {_mask(api_key)}")
+
+    # 环境变量诊断通过后才加载 notion-client
+    try:
+        from notion_client import Client
+    except ImportError:
+        print("未安装 notion-client 库")
+        print("请运行: pip install notion-client")
+        return False, None
 
     try:
         client = Client(auth=api_key)
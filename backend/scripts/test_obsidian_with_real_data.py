@@ -13,6 +13,7 @@ ObsidianService 真实数据测试脚本
 """
 import os
 import sys
+import traceback
 from pathlib import Path
 
 # 设置临时环境变量
@@ -29,7 +30,7 @@ from app.services.obsidian_service import ObsidianService
 from app.models import Episode, Translation, TranscriptCue, AudioSegment, Chapter
 from app.enums.workflow_status import WorkflowStatus
 from app.enums.translation_status import TranslationStatus
-from sqlalchemy import desc
+from sqlalchemy import func, select
 
 
 def main():
@@ -38,10 +39,13 @@ def main():
     print("=" * 70)
 
     with get_session() as db:
-        # 获取最新的已翻译 Episode
-        episode = db.query(Episode).filter(
-            Episode.workflow_status == WorkflowStatus.TRANSLATED.value
-        ).order_by(desc(Episode.id)).first()
+        # 获取最新的已翻译 Episode：先按主键取 ID，再走 identity map 加载实体
+        episode_id = db.scalar(
+            select(Episode.id).where(
+                Episode.workflow_status == WorkflowStatus.TRANSLATED.value
+            ).order_by(Episode.id.desc()).limit(1)
+        )
+        episode = db.get(Episode, episode_id) if episode_id is not None else None
 
         if not episode:
             print("\n没有找到已翻译的 Episode")
@@ -49,22 +53,23 @@ def main():
             return
 
         print(f"\n找到 Episode:")
-        print(f"  ID: {episode.id}")
+        print(f"  ID: {episode_id}")
         print(f"  标题: {episode.title}")
         print(f"  状态: {WorkflowStatus(episode.workflow_status).label}")
         print()
 
         # 检查翻译数量
-        translation_count = db.query(Translation).filter(
-            Translation.language_code == "zh",
-            Translation.translation_status == TranslationStatus.COMPLETED.value
-        ).join(
-            TranscriptCue, Translation.cue_id == TranscriptCue.id
-        ).join(
-            AudioSegment, TranscriptCue.segment_id == AudioSegment.id
-        ).filter(
-            AudioSegment.episode_id == episode.id
-        ).count()
+        translation_count = db.execute(
+            select(func.count(Translation.id)).select_from(Translation).join(
+                TranscriptCue, Translation.cue_id == TranscriptCue.id
+            ).join(
+                AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+            ).where(
+                AudioSegment.episode_id == episode_id,
+                Translation.language_code == "zh",
+                Translation.translation_status == TranslationStatus.COMPLETED.value
+            )
+        ).scalar()
 
         print(f"中文翻译数量: {translation_count}")
 
@@ -80,7 +85,12 @@ def main():
         service = ObsidianService(db, vault_path=None)  # 使用配置中的路径
 
         try:
-            markdown = service.render_episode(episode.id, language_code="zh")
+            translation_offsets = {}
+            markdown = service.render_episode(
+                episode_id,
+                language_code="zh",
+                record_offsets=translation_offsets
+            )
             print(f"Markdown 生成成功!")
             print(f"  总长度: {len(markdown)} 字符")
 
@@ -93,7 +103,6 @@ def main():
 
         except Exception as e:
             print(f"渲染失败: {e}")
-            import traceback
             traceback.print_exc()
             return
 
@@ -103,7 +112,7 @@ def main():
         print("-" * 70)
 
         try:
-            file_path = service.save_episode(episode.id, language_code="zh")
+            file_path = service.save_episode(episode_id, language_code="zh")
             print(f"文件已保存: {file_path}")
             print(f"  文件名: {file_path.name}")
             print(f"  目录: {file_path.parent}")
@@ -117,7 +126,6 @@ def main():
 
         except Exception as e:
             print(f"保存失败: {e}")
-            import traceback
             traceback.print_exc()
             return
 
@@ -129,7 +137,7 @@ def main():
         try:
             # 解析原始 Markdown（应该没有差异）
             diffs = service.parse_episode_from_markdown(
-                episode.id,
+                episode_id,
                 markdown,
                 language_code="zh"
             )
@@ -137,43 +145,43 @@ def main():
 
             # 模拟用户修改
             print("\n模拟用户修改翻译...")
-            # 读取第一个翻译
-            first_cue = db.query(TranscriptCue).join(
-                AudioSegment, TranscriptCue.segment_id == AudioSegment.id
-            ).filter(
-                AudioSegment.episode_id == episode.id
-            ).first()
-
-            if first_cue:
-                first_translation = db.query(Translation).filter(
-                    Translation.cue_id == first_cue.id,
+            # 一次 JOIN 查询读取第一条字幕及其中文翻译
+            row = db.execute(
+                select(TranscriptCue, Translation).join(
+                    AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+                ).join(
+                    Translation, Translation.cue_id == TranscriptCue.id
+                ).where(
+                    AudioSegment.episode_id == episode_id,
                     Translation.language_code == "zh"
-                ).first()
-
-                if first_translation:
-                    original = first_translation.translation
-                    modified = f"[已修改] {original}"
-
-                    print(f"  原始翻译: {original}")
-                    print(f"  修改后: {modified}")
-
-                    # 替换并检测
-                    modified_markdown = markdown.replace(original, modified)
-                    test_diffs = service.parse_episode_from_markdown(
-                        episode.id,
-                        modified_markdown,
-                        language_code="zh"
-                    )
+                ).order_by(TranscriptCue.start_time).limit(1)
+            ).first()
 
-                    print(f"\n修改后差异检测: {len(test_diffs)} 个修改")
-                    if test_diffs:
-                        print(f"  Cue ID: {test_diffs[0].cue_id}")
-                        print(f"  原始: {test_diffs[0].original}")
-                        print(f"  修改: {test_diffs[0].edited}")
+            if row:
+                first_cue, _ = row
+                start, end = translation_offsets[first_cue.id]
+                original = markdown[start:end]
+                modified = f"[已修改] {original}"
+
+                print(f"  原始翻译: {original}")
+                print(f"  修改后: {modified}")
+
+                # 按渲染时记录的区间拼接，只替换这一条翻译
+                modified_markdown = markdown[:start] + modified + markdown[end:]
+                test_diffs = service.parse_episode_from_markdown(
+                    episode_id,
+                    modified_markdown,
+                    language_code="zh"
+                )
+
+                print(f"\n修改后差异检测: {len(test_diffs)} 个修改")
+                if test_diffs:
+                    print(f"  Cue ID: {test_diffs[0].cue_id}")
+                    print(f"  原始: {test_diffs[0].original}")
+                    print(f"  修改: {test_diffs[0].edited}")
 
         except Exception as e:
             print(f"解析演示失败: {e}")
-            import traceback
             traceback.print_exc()
 
         print("\n" + "=" * 70)
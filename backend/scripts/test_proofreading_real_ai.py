@@ -5,6 +5,8 @@ This script tests the SubtitleProofreadingService with real Moonshot API calls.
 It loads an SRT file, creates database records, calls LLM for proofreading,
 and reports the results.
 """
+import difflib
+import io
 import re
 import sys
 import os
@@ -12,7 +14,6 @@ from pathlib import Path
 
 # Fix encoding for Windows console
 if sys.platform == "win32":
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 # Add parent directory to path for imports
@@ -31,54 +32,63 @@ if not os.environ.get("ZHIPU_API_KEY"):
 os.environ["DATABASE_PATH"] = "./data/test_proofreading.db"
 
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, raiseload, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.services.subtitle_proofreading_service import SubtitleProofreadingService
 from app.models import Episode, AudioSegment, TranscriptCue, TranscriptCorrection
 from app.models.base import Base
 
+# SRT parsing patterns, compiled once per process
+_BLOCK_SPLIT_RE = re.compile(r'\n\s*\n')
+_TIMESTAMP_RE = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})')
+_SPEAKER_RE = re.compile(r'\[SPEAKER_(\d+)\]\s*')
+
+
+# In-memory database shared by every session in this process: StaticPool
+# keeps the single connection alive, so the schema is created only once
+_ENGINE = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+Base.metadata.create_all(_ENGINE)
+_SessionFactory = sessionmaker(bind=_ENGINE)
+
 
 def create_test_session() -> Session:
     """
-    Create an in-memory SQLite database session for testing.
+    Create a session on the shared in-memory SQLite test database.
 
     Returns:
         Session: SQLAlchemy session
     """
-    # Create in-memory database
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-    )
-
-    # Create all tables with latest schema
-    Base.metadata.create_all(engine)
-
-    # Create session factory
-    SessionFactory = sessionmaker(bind=engine)
-    return SessionFactory()
+    return _SessionFactory()
 
 
 def parse_srt_time(time_str: str) -> float:
     """
     Convert SRT timestamp to seconds.
 
+    SRT timestamps are fixed-width ("HH:MM:SS,mmm"), so the fields are
+    read by offset instead of through a regex match.
+
     Args:
         time_str: SRT timestamp like "00:00:00,031"
 
     Returns:
         float: Time in seconds
     """
-    # Parse "00:00:00,031" format
-    match = re.match(r'(\d+):(\d+):(\d+),(\d+)', time_str.strip())
-    if match:
-        hours, minutes, seconds, milliseconds = map(int, match.groups())
-        return hours * 3600 + minutes * 60 + seconds + milliseconds / 1000
-    return 0.0
+    return (
+        int(time_str[0:2]) * 3600
+        + int(time_str[3:5]) * 60
+        + int(time_str[6:8])
+        + int(time_str[9:12]) / 1000
+    )
 
 
-def parse_srt_file(srt_path: str) -> list:
+def parse_srt_file(srt_path: str) -> tuple:
     """
     Parse SRT file into list of subtitle entries.
 
@@ -86,36 +96,43 @@ def parse_srt_file(srt_path: str) -> list:
         srt_path: Path to SRT file
 
     Returns:
-        list of dict: Each with index, start_time, end_time, speaker, text
+        tuple: (entries, max_end_time) where entries is a list of dicts with
+            index, start_time, end_time, speaker, text, and max_end_time is
+            the latest end_time seen (0.0 for an empty file)
     """
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # Read the whole file in one call, decode once and normalise CRLF
+    content = Path(srt_path).read_bytes().decode('utf-8').replace('\r\n', '\n')
 
     # Split by double newlines to get individual subtitle blocks
-    blocks = re.split(r'\n\s*\n', content.strip())
+    blocks = _BLOCK_SPLIT_RE.split(content.strip())
 
     entries = []
+    max_end_time = 0.0
     for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) >= 3:
+        # Index line, timestamp line, and the text kept as one string
+        lines = block.strip().split('\n', 2)
+        if len(lines) == 3:
             # First line is subtitle index
             index = int(lines[0].strip())
 
             # Second line is timestamp range
-            time_match = re.match(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})', lines[1])
+            time_match = _TIMESTAMP_RE.match(lines[1])
             if time_match:
                 start_time = parse_srt_time(time_match.group(1))
                 end_time = parse_srt_time(time_match.group(2))
+                if end_time > max_end_time:
+                    max_end_time = end_time
 
                 # Remaining lines are the subtitle text
-                text = '\n'.join(lines[2:])
+                text = lines[2]
 
                 # Extract speaker from [SPEAKER_XX] pattern
-                speaker_match = re.search(r'\[SPEAKER_(\d+)\]', text)
+                speaker_match = _SPEAKER_RE.search(text)
                 if speaker_match:
                     speaker = f"SPEAKER_{speaker_match.group(1)}"
-                    # Remove the speaker tag from text
-                    text = re.sub(r'\[SPEAKER_\d+\]\s*', '', text)
+                    # Remove the speaker tag(s); the text before the first
+                    # tag is already known to be tag-free
+                    text = text[:speaker_match.start()] + _SPEAKER_RE.sub('', text[speaker_match.end():])
                 else:
                     speaker = "SPEAKER_UNKNOWN"
 
@@ -127,109 +144,138 @@ def parse_srt_file(srt_path: str) -> list:
                     'text': text.strip()
                 })
 
-    return entries
+    return entries, max_end_time
 
 
-def setup_test_data(db: Session, srt_entries: list) -> int:
+def setup_test_data(db: Session, srt_entries: list, duration: float) -> int:
     """
     Create test Episode, AudioSegment, and TranscriptCue records.
 
     Args:
         db: Database session
         srt_entries: Parsed SRT entries
+        duration: Episode duration in seconds (latest cue end time)
 
     Returns:
         int: Episode ID
     """
-    # Create episode
-    episode = Episode(
-        title="Figma Products Discussion - Proofreading Test",
-        file_hash="proofread_test_016",
-        duration=max(e['end_time'] for e in srt_entries),
-        workflow_status=2,  # TRANSCRIBED
+
+    # Create episode; RETURNING hands back the primary key without a flush
+    episode_id = db.scalar(
+        insert(Episode).values(
+            title="Figma Products Discussion - Proofreading Test",
+            file_hash="proofread_test_016",
+            duration=duration,
+            workflow_status=2,  # TRANSCRIBED
+        ).returning(Episode.id)
     )
-    db.add(episode)
-    db.flush()
 
     # Create a single audio segment for all cues
-    segment = AudioSegment(
-        episode_id=episode.id,
-        segment_index=0,
-        segment_id="seg_001",
-        start_time=0.0,
-        end_time=episode.duration
+    segment_id = db.scalar(
+        insert(AudioSegment).values(
+            episode_id=episode_id,
+            segment_index=0,
+            segment_id="seg_001",
+            start_time=0.0,
+            end_time=duration
+        ).returning(AudioSegment.id)
     )
-    db.add(segment)
-    db.flush()
-
-    # Create transcript cues from SRT entries
-    for entry in srt_entries:
-        cue = TranscriptCue(
-            segment_id=segment.id,
-            start_time=entry['start_time'],
-            end_time=entry['end_time'],
-            speaker=entry['speaker'],
-            text=entry['text']
-        )
-        db.add(cue)
+
+    # Create transcript cues from SRT entries in one executemany INSERT
+    db.execute(insert(TranscriptCue), [
+        {
+            'segment_id': segment_id,
+            'start_time': entry['start_time'],
+            'end_time': entry['end_time'],
+            'speaker': entry['speaker'],
+            'text': entry['text'],
+        }
+        for entry in srt_entries
+    ])
 
     db.commit()
-    print(f"Created Episode {episode.id} with {len(srt_entries)} transcript cues")
+    print(f"Created Episode {episode_id} with {len(srt_entries)} transcript cues")
 
-    return episode.id
+    return episode_id
+
+
+def format_word_diff(original_words: list, corrected_words: list) -> str:
+    """
+    Format a word-level diff between original and corrected text.
+
+    Args:
+        original_words: Words of the original text
+        corrected_words: Words of the corrected text
+
+    Returns:
+        str: Unchanged words as-is, replacements as "[old→new]",
+            insertions as "+word" and deletions as "-word"
+    """
+    matcher = difflib.SequenceMatcher(None, original_words, corrected_words, autojunk=False)
+    parts = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            parts.extend(original_words[i1:i2])
+        elif tag == 'replace':
+            orig, corr = original_words[i1:i2], corrected_words[j1:j2]
+            parts.extend(f"[{o}→{c}]" for o, c in zip(orig, corr))
+            parts.extend(f"-{o}" for o in orig[len(corr):])
+            parts.extend(f"+{c}" for c in corr[len(orig):])
+        elif tag == 'delete':
+            parts.extend(f"-{o}" for o in original_words[i1:i2])
+        else:  # insert
+            parts.extend(f"+{c}" for c in corrected_words[j1:j2])
+    return " ".join(parts)
 
 
 def print_correction_report(result, original_entries):
     """
     Print a detailed report of the proofreading results.
 
+    The report is assembled in memory and written to stdout in one call.
+
     Args:
         result: CorrectionResult from service
         original_entries: Original SRT entries for reference
     """
-    print("\n" + "="*80)
-    print("SUBTITLE PROOFREADING REPORT")
-    print("="*80)
+    buf = io.StringIO()
+    buf.write("\n" + "="*80 + "\n")
+    buf.write("SUBTITLE PROOFREADING REPORT\n")
+    buf.write("="*80 + "\n")
 
-    print(f"\n📊 SUMMARY:")
-    print(f"  Total cues processed: {result.total_cues}")
-    print(f"  Corrections found: {result.corrected_count}")
-    print(f"  Skipped (already corrected): {result.skipped_count}")
-    print(f"  Duration: {result.duration_seconds:.2f} seconds")
+    buf.write(f"\n📊 SUMMARY:\n")
+    buf.write(f"  Total cues processed: {result.total_cues}\n")
+    buf.write(f"  Corrections found: {result.corrected_count}\n")
+    buf.write(f"  Skipped (already corrected): {result.skipped_count}\n")
+    buf.write(f"  Duration: {result.duration_seconds:.2f} seconds\n")
 
     if result.corrections:
-        print(f"\n🔍 CORRECTIONS FOUND ({len(result.corrections)}):")
-        print("-"*80)
+        buf.write(f"\n🔍 CORRECTIONS FOUND ({len(result.corrections)}):\n")
+        buf.write("-"*80 + "\n")
 
         for i, correction in enumerate(result.corrections, 1):
-            # Find original entry for context
-            original_text = correction.original_text
+            # Corrections come back from the service as plain dicts
+            original_text = correction['original_text']
+            corrected_text = correction['corrected_text']
 
-            print(f"\n{i}. Cue ID {correction.cue_id}")
-            print(f'   Original:  "{original_text}"')
-            print(f'   Corrected: "{correction.corrected_text}"')
-            print(f"   Reason:    {correction.reason}")
-            print(f"   Confidence: {correction.confidence:.2%}")
+            buf.write(f"\n{i}. Cue ID {correction['cue_id']}\n")
+            buf.write(f'   Original:  "{original_text}"\n')
+            buf.write(f'   Corrected: "{corrected_text}"\n')
+            buf.write(f"   Reason:    {correction['reason']}\n")
+            buf.write(f"   Confidence: {correction['confidence']:.2%}\n")
 
             # Show diff
             original_words = original_text.split()
-            corrected_words = correction.corrected_text.split()
+            corrected_words = corrected_text.split()
             if original_words != corrected_words:
-                print(f"   Diff:      ", end="")
-                for j, (orig, corr) in enumerate(zip(original_words, corrected_words)):
-                    if orig != corr:
-                        print(f"[{orig}→{corr}]", end=" ")
-                    elif j < len(original_words) - 1 or len(corrected_words) == len(original_words):
-                        print(orig, end=" ")
-                # Handle trailing words
-                if len(corrected_words) > len(original_words):
-                    for word in corrected_words[len(original_words):]:
-                        print(f"+{word}", end=" ")
-                print()
+                buf.write(f"   Diff:      {format_word_diff(original_words, corrected_words)}\n")
     else:
-        print("\n✅ No corrections found - subtitles look good!")
+        buf.write("\n✅ No corrections found - subtitles look good!\n")
+
+    buf.write("\n" + "="*80 + "\n")
 
-    print("\n" + "="*80)
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
 
 
 def main():
@@ -248,7 +294,7 @@ def main():
     print(f"\n📂 Loading SRT file: {srt_path}")
 
     # Parse SRT file
-    entries = parse_srt_file(srt_path)
+    entries, duration = parse_srt_file(srt_path)
     print(f"✅ Parsed {len(entries)} subtitle entries")
 
     # Show first few entries as preview
@@ -261,7 +307,7 @@ def main():
     db = create_test_session()
 
     try:
-        episode_id = setup_test_data(db, entries)
+        episode_id = setup_test_data(db, entries, duration)
 
         # Initialize service with real LLM
         print("\n🤖 Initializing SubtitleProofreadingService with Moonshot API...")
@@ -271,8 +317,9 @@ def main():
         print("\n🔍 Scanning for corrections (dry run, not applying)...")
         result = service.scan_and_correct(
             episode_id=episode_id,
-            batch_size=20,
-            apply=False  # Don't apply yet
+            batch_size=100,
+            apply=False,  # Don't apply yet
+            max_concurrency=8
         )
 
         # Print report
@@ -284,12 +331,15 @@ def main():
             print("\n💾 Applying corrections to database...")
             applied = service.apply_corrections(result.corrections)
 
-            # Verify corrections were applied
-            cues = db.query(TranscriptCue).join(
-                AudioSegment, TranscriptCue.segment_id == AudioSegment.id
-            ).filter(
-                AudioSegment.episode_id == episode_id,
-                TranscriptCue.is_corrected == True
+            # Verify corrections were applied; raiseload makes any lazy
+            # relationship access in the print loop below fail loudly
+            cues = db.scalars(
+                select(TranscriptCue).join(
+                    AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+                ).where(
+                    AudioSegment.episode_id == episode_id,
+                    TranscriptCue.is_corrected == True
+                ).options(raiseload('*'))
             ).all()
 
             print(f"✅ Applied {applied} corrections")
@@ -6,8 +6,11 @@
 用法:
     python scripts/test_proofreading_structured_output_real_ai.py
 """
+import hashlib
 import sys
 import os
+import traceback
+from itertools import islice
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -18,8 +21,9 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 from loguru import logger
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, insert, select
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.models.base import Base
 from app.models import Episode, TranscriptCue, AudioSegment, TranscriptCorrection
@@ -35,23 +39,34 @@ from app.config import (
 )
 
 
-def setup_in_memory_db():
-    """创建内存数据库用于测试"""
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False}
-    )
-    Base.metadata.create_all(engine)
+def _set_sqlite_pragma(dbapi_conn, connection_record):
+    """内存测试库无需持久化：关闭日志落盘和同步"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+# 进程内共享的内存数据库：StaticPool 复用同一连接，建表只执行一次
+_ENGINE = create_engine(
+    "sqlite:///:memory:",
+    poolclass=StaticPool,
+    connect_args={"check_same_thread": False}
+)
+event.listen(_ENGINE, "connect", _set_sqlite_pragma)
+Base.metadata.create_all(_ENGINE)
+_SessionLocal = sessionmaker(bind=_ENGINE)
 
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+
+def setup_in_memory_db():
+    """创建内存数据库会话用于测试（共享模块级 engine 与 schema）"""
+    return _SessionLocal()
 
 
 def create_test_episode_with_cues(db_session, title: str = "测试Episode"):
     """创建测试 Episode 及其关联的 Cues"""
-    import hashlib
     # 生成唯一文件哈希
-    file_hash = hashlib.md5(title.encode()).hexdigest()
+    file_hash = hashlib.md5(title.encode(), usedforsecurity=False).hexdigest()
 
     # 创建 Episode
     episode = Episode(
@@ -76,15 +91,15 @@ def create_test_episode_with_cues(db_session, title: str = "测试Episode"):
     db_session.add(segment)
     db_session.flush()
 
-    # 创建测试 Cues（包含一些故意错误的拼写）
-    test_cues = [
-        TranscriptCue(
-            segment_id=segment.id,
-            start_time=float(i * 10),
-            end_time=float((i + 1) * 10),
-            speaker="Speaker",
-            text=text
-        )
+    # 创建测试 Cues（包含一些故意错误的拼写），单条 executemany INSERT 写入
+    db_session.execute(insert(TranscriptCue), [
+        {
+            "segment_id": segment.id,
+            "start_time": float(i * 10),
+            "end_time": float((i + 1) * 10),
+            "speaker": "Speaker",
+            "text": text,
+        }
         for i, text in enumerate([
             "Hello warld and welcome to the show",  # warld -> world
             "Today we will discuss lerning methods",  # lerning -> learning
@@ -95,12 +110,7 @@ def create_test_episode_with_cues(db_session, title: str = "测试Episode"):
             "Thank you for listning",  # listning -> listening
             "Have a wonderfull day",  # wonderfull -> wonderful
         ])
-    ]
-
-    for cue in test_cues:
-        db_session.add(cue)
-
-    db_session.flush()
+    ])
     return episode
 
 
@@ -119,19 +129,48 @@ def test_proofreading_service_structured_output():
     db = setup_in_memory_db()
     episode = create_test_episode_with_cues(db, "英语学习方法：从入门到精通")
 
+    # 每个 provider 只创建一次服务，测试1和测试3共享同一个 StructuredLLM 及其 HTTP 连接
+    provider_configs = {
+        "moonshot": (MOONSHOT_API_KEY, MOONSHOT_BASE_URL, MOONSHOT_MODEL),
+        "zhipu": (ZHIPU_API_KEY, ZHIPU_BASE_URL, ZHIPU_MODEL),
+    }
+    services = {}
+
+    def get_service(provider: str) -> SubtitleProofreadingService:
+        if provider not in services:
+            api_key, base_url, model = provider_configs[provider]
+            services[provider] = SubtitleProofreadingService(
+                db,
+                provider=provider,
+                api_key=api_key,
+                base_url=base_url,
+                model=model
+            )
+        return services[provider]
+
     logger.info(f"\n[测试数据]")
     logger.info(f"  Episode ID: {episode.id}")
     logger.info(f"  Title: {episode.title}")
 
-    # 获取 cues 数量
-    cues = db.query(TranscriptCue).join(
+    # 获取 cues 数量：计数走聚合查询，预览只流式读取前 3 条
+    episode_cue_ids = select(TranscriptCue.id).join(
         AudioSegment, TranscriptCue.segment_id == AudioSegment.id
-    ).filter(
+    ).where(
         AudioSegment.episode_id == episode.id
-    ).all()
+    )
+    cue_count = db.scalar(
+        select(func.count()).select_from(episode_cue_ids.subquery())
+    )
+    cue_iter = db.scalars(
+        select(TranscriptCue).where(
+            TranscriptCue.id.in_(episode_cue_ids)
+        ).execution_options(yield_per=200)
+    )
+    cues_head = list(islice(cue_iter, 3))
+    cue_iter.close()
 
-    logger.info(f"  Cues 数量: {len(cues)}")
-    for cue in cues[:3]:
+    logger.info(f"  Cues 数量: {cue_count}")
+    for cue in cues_head:
         logger.info(f"    - Cue {cue.id}: {cue.text[:50]}...")
     logger.info(f"    ...")
 
@@ -141,13 +180,7 @@ def test_proofreading_service_structured_output():
         logger.info("-" * 60)
 
         try:
-            service = SubtitleProofreadingService(
-                db,
-                provider="moonshot",
-                api_key=MOONSHOT_API_KEY,
-                base_url=MOONSHOT_BASE_URL,
-                model=MOONSHOT_MODEL
-            )
+            service = get_service("moonshot")
             logger.info(f"  StructuredLLM: {'已初始化' if service.structured_llm else '未初始化'}")
 
             if service.structured_llm:
@@ -170,7 +203,7 @@ def test_proofreading_service_structured_output():
                     logger.info(f"\n  ... 还有 {len(result.corrections) - 5} 条修正建议")
 
                 # 验证数据
-                assert result.total_cues == len(cues), f"总 cues 数量不匹配"
+                assert result.total_cues == cue_count, f"总 cues 数量不匹配"
                 assert result.corrected_count == 0, "应该未应用修正"
                 assert len(result.corrections) >= 0, "修正建议数量应该 >= 0"
 
@@ -180,7 +213,6 @@ def test_proofreading_service_structured_output():
 
         except Exception as e:
             logger.error(f"测试1失败: {e}")
-            import traceback
             traceback.print_exc()
     else:
         logger.warning("Moonshot API Key 未配置，跳过 Moonshot 测试")
@@ -191,13 +223,7 @@ def test_proofreading_service_structured_output():
         logger.info("-" * 60)
 
         try:
-            service = SubtitleProofreadingService(
-                db,
-                provider="zhipu",
-                api_key=ZHIPU_API_KEY,
-                base_url=ZHIPU_BASE_URL,
-                model=ZHIPU_MODEL
-            )
+            service = get_service("zhipu")
             logger.info(f"  StructuredLLM: {'已初始化' if service.structured_llm else '未初始化'}")
 
             if service.structured_llm:
@@ -221,7 +247,6 @@ def test_proofreading_service_structured_output():
 
         except Exception as e:
             logger.error(f"测试2失败: {e}")
-            import traceback
             traceback.print_exc()
     else:
         logger.warning("Zhipu API Key 未配置，跳过 Zhipu 测试")
@@ -232,13 +257,7 @@ def test_proofreading_service_structured_output():
         logger.info("-" * 60)
 
         try:
-            service = SubtitleProofreadingService(
-                db,
-                provider="moonshot",
-                api_key=MOONSHOT_API_KEY,
-                base_url=MOONSHOT_BASE_URL,
-                model=MOONSHOT_MODEL
-            )
+            service = get_service("moonshot")
 
             result = service.scan_and_correct(
                 episode_id=episode.id,
@@ -249,7 +268,7 @@ def test_proofreading_service_structured_output():
 
             # 验证数据库记录
             corrections = db.query(TranscriptCorrection).filter(
-                TranscriptCorrection.cue_id.in_([c.id for c in cues])
+                TranscriptCorrection.cue_id.in_(episode_cue_ids)
             ).all()
 
             logger.info(f"  数据库中的修正记录: {len(corrections)} 条")
@@ -265,7 +284,6 @@ def test_proofreading_service_structured_output():
 
         except Exception as e:
             logger.error(f"测试3失败: {e}")
-            import traceback
             traceback.print_exc()
 
     logger.info(f"\n{'=' * 60}")
@@ -6,9 +6,15 @@
 2. 验证 Zhipu 的 response_format={"type": "json_object"} 是否工作正常
 3. 验证 Pydantic 验证是否能正确解析和验证AI返回的JSON
 """
+import argparse
+import os
 import sys
 import io
 import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List
 
@@ -22,25 +28,12 @@ if sys.platform == "win32":
 
 # 检查 pydantic 是否已安装
 try:
-    from pydantic import BaseModel, Field, field_validator, ValidationError
+    from pydantic import BaseModel, Field, TypeAdapter, field_validator, ValidationError
     print("Pydantic 已安装")
 except ImportError:
     print("错误: 需要安装 pydantic，请运行: pip install pydantic>=2.0.0")
     sys.exit(1)
 
-# 使用 OpenAI SDK（现有项目使用的）
-try:
-    from openai import OpenAI
-    print("openai SDK 已安装")
-except ImportError:
-    print("错误: 需要安装 openai，请运行: pip install openai>=1.0.0")
-    sys.exit(1)
-
-from app.config import (
-    MOONSHOT_API_KEY, MOONSHOT_BASE_URL, MOONSHOT_MODEL,
-    ZHIPU_API_KEY, ZHIPU_BASE_URL, ZHIPU_MODEL
-)
-
 
 # ==================== 测试用的 Pydantic 模型 ====================
 class CorrectionSuggestion(BaseModel):
@@ -65,39 +58,28 @@ class ProofreadingResponse(BaseModel):
         return v
 
 
-# ==================== 测试函数 ====================
-def test_kimi_json_mode():
-    """测试 Kimi 的 json_mode 结构化输出"""
-    print("\n" + "="*60)
-    print("测试 1: Kimi (Moonshot) JSON Mode")
-    print("="*60)
-
-    # 检查 API Key
-    if not MOONSHOT_API_KEY:
-        print("警告: MOONSHOT_API_KEY 未设置，跳过 Kimi 测试")
-        return None
-
-    print(f"API Key: {'*** ' + MOONSHOT_API_KEY[:10] + ' ...' if MOONSHOT_API_KEY else 'NOT SET'}")
-    print(f"Base URL: {MOONSHOT_BASE_URL}")
-    print(f"Model: {MOONSHOT_MODEL}")
+# 模块级缓存的校验器，所有校验共用同一个 pydantic-core SchemaValidator
+_PROOFREADING_ADAPTER = TypeAdapter(ProofreadingResponse)
 
-    # 创建 Kimi OpenAI 客户端
-    client = OpenAI(
-        api_key=MOONSHOT_API_KEY,
-        base_url=MOONSHOT_BASE_URL
-    )
 
-    # 测试数据
-    test_cues = """请检查以下字幕中的错误：
-
-1. Hello warld, how are you?
-2. I am fine, thank you.
-3. She is a good techer."""
+# ==================== 测试数据 ====================
+# 所有字幕带 id 放进同一个 prompt，一次调用返回全部修正；消息在导入时构造一次，各 provider 共用
+_TEST_CUES = [
+    "Hello warld, how are you?",
+    "I am fine, thank you.",
+    "She is a good techer.",
+]
+_CUE_PAYLOAD = "\n".join(
+    json.dumps({"id": i, "text": text}, ensure_ascii=False)
+    for i, text in enumerate(_TEST_CUES, 1)
+)
 
-    # 构造消息
-    messages = [
-        {"role": "system", "content": "你是字幕校对专家。请检查并返回JSON格式的修正建议。"},
-        {"role": "user", "content": f"""请返回以下JSON格式：
+_SYSTEM_MSG = {"role": "system", "content": (
+    "你是字幕校对专家。请检查并返回JSON格式的修正建议。"
+    "每条输入字幕都带有 id，修正建议的 cue_id 必须使用对应输入的 id，"
+    "每个 id 最多返回一条；没有错误的字幕不要返回。"
+)}
+_USER_MSG = {"role": "user", "content": f"""请返回以下JSON格式：
 {{
   "corrections": [
     {{
@@ -110,201 +92,247 @@ def test_kimi_json_mode():
   ]
 }}
 
-测试字幕：
-{test_cues}"""}
+测试字幕（每行一条，JSON 格式）：
+{_CUE_PAYLOAD}"""}
+_MESSAGES = [_SYSTEM_MSG, _USER_MSG]
+
+
+# ==================== 测试函数 ====================
+# 被测 provider 的 API Key 环境变量；app.config 在必需的 Key 缺失时导入即报错，
+# 因此先检查环境变量，再在 load_providers() 中导入
+PROVIDER_KEY_ENV_VARS = ("MOONSHOT_API_KEY", "ZHIPU_API_KEY")
+
+
+def load_providers():
+    """
+    从 app.config 读取各 provider 的配置
+
+    Returns:
+        list: [(名称, API Key, Base URL, Model)]
+    """
+    from app.config import (
+        MOONSHOT_API_KEY, MOONSHOT_BASE_URL, MOONSHOT_MODEL,
+        ZHIPU_API_KEY, ZHIPU_BASE_URL, ZHIPU_MODEL
+    )
+
+    return [
+        ("Kimi (Moonshot)", MOONSHOT_API_KEY, MOONSHOT_BASE_URL, MOONSHOT_MODEL),
+        ("Zhipu (GLM)", ZHIPU_API_KEY, ZHIPU_BASE_URL, ZHIPU_MODEL),
     ]
 
-    print("\n正在调用 Kimi API...")
-    try:
-        # 使用 response_format 强制 JSON 输出
-        response = client.chat.completions.create(
-            model=MOONSHOT_MODEL,
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-
-        response_content = response.choices[0].message.content
-        print(f"响应内容类型: {type(response_content)}")
-        print(f"响应内容长度: {len(response_content)} 字符")
-        print(f"响应内容预览: {response_content[:200]}...")
-
-        # 解析 JSON
-        response_json = json.loads(response_content)
-        print(f"\nJSON 解析成功:")
-        print(f"  - corrections 数量: {len(response_json.get('corrections', []))}")
-
-        # Pydantic 验证
-        print("\n正在使用 Pydantic 验证...")
-        validated_response = ProofreadingResponse.model_validate_json(response_content)
-        print(f"Pydantic 验证成功!")
-        print(f"  - 验证后的 corrections 数量: {len(validated_response.corrections)}")
-
-        for i, correction in enumerate(validated_response.corrections, 1):
-            print(f"\n  修正建议 {i}:")
-            print(f"    - cue_id: {correction.cue_id}")
-            print(f"    - 原文: {correction.original_text}")
-            print(f"    - 修正: {correction.corrected_text}")
-            print(f"    - 原因: {correction.reason}")
-            print(f"    - 置信度: {correction.confidence}")
-
-        print("\nKimi JSON Mode 测试通过!")
-        return validated_response
 
-    except json.JSONDecodeError as e:
-        print(f"\n错误: JSON 解析失败: {e}")
-        print(f"原始响应: {response_content}")
-        return None
-    except ValidationError as e:
-        print(f"\n错误: Pydantic 验证失败: {e}")
-        return None
-    except Exception as e:
-        print(f"\n错误: API 调用失败: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+# openai SDK 只在真正调用 provider 时才导入，仅使用模型或边界测试时不加载
+@lru_cache(maxsize=None)
+def _get_client(base_url: str, api_key: str, batch: bool = False):
+    """
+    每个 provider（及调用方式）只创建一个客户端，后续请求复用其 HTTP 连接池
 
+    流式调用的重试由 _stream_chat_completion 统一处理，其客户端关闭 SDK 重试以免两层叠加；
+    Batch 模式的上传、提交和轮询没有外层重试，保留 SDK 默认的 429/5xx 重试。
+    """
+    from openai import DEFAULT_MAX_RETRIES, OpenAI
 
-def test_zhipu_json_mode():
-    """测试 Zhipu 的 json_mode 结构化输出"""
-    print("\n" + "="*60)
-    print("测试 2: Zhipu (GLM) JSON Mode")
-    print("="*60)
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=30.0,
+        max_retries=DEFAULT_MAX_RETRIES if batch else 0
+    )
 
-    # 检查 API Key
-    if not ZHIPU_API_KEY:
-        print("警告: ZHIPU_API_KEY 未设置，跳过 Zhipu 测试")
-        return None
 
-    print(f"API Key: {'*** ' + ZHIPU_API_KEY[:10] + ' ...' if ZHIPU_API_KEY else 'NOT SET'}")
-    print(f"Base URL: {ZHIPU_BASE_URL}")
-    print(f"Model: {ZHIPU_MODEL}")
+def _stream_chat_completion(client, request_body: dict):
+    """
+    流式调用 chat.completions.create，把增量内容累积为 UTF-8 bytes
+
+    整个流（含中途断开）遇到 429/连接错误/5xx 时指数退避重试（1s, 2s, 4s, 8s）。
+
+    Returns:
+        tuple: (响应内容 bytes, 首个 token 耗时秒数, 内容分片数)
+    """
+    # 重试的异常类型来自 openai；app.services 包导入时会加载 app.config，
+    # 二者都与 provider 配置一样延迟到真正调用时才导入
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    from app.services.ai.retry import ai_retry
 
-    # 创建 Zhipu OpenAI 客户端
-    client = OpenAI(
-        api_key=ZHIPU_API_KEY,
-        base_url=ZHIPU_BASE_URL
+    @ai_retry(
+        max_retries=5,
+        initial_delay=1.0,
+        retry_on=(RateLimitError, APIConnectionError, InternalServerError)
     )
+    def read_stream():
+        started = time.monotonic()
+        first_token_at = None
+        chunk_count = 0
+        buf = bytearray()
+        for chunk in client.chat.completions.create(**request_body, stream=True):
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if piece:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                buf.extend(piece.encode("utf-8"))
+                chunk_count += 1
+        first_token_latency = (first_token_at or time.monotonic()) - started
+        return bytes(buf), first_token_latency, chunk_count
+
+    return read_stream()
+
+
+def _run_batch_request(client, custom_id: str, base_url: str, body: dict, out, timeout: float) -> str:
+    """
+    通过 Batch API 提交单条请求，轮询到结束后返回响应的 message content
+
+    Raises:
+        TimeoutError: 超过 timeout 秒仍未结束
+        RuntimeError: Batch 未成功完成、输出行无法解析或结果中没有该请求
+    """
+    # 与 ai_retry 一样，app.services 包延迟到真正调用时导入
+    from app.services.ai.batch import batch_endpoint, run_batch_job
+
+    print("正在通过 Batch API 提交并轮询结果...", file=out)
+    contents = run_batch_job(
+        client,
+        [(custom_id, body)],
+        batch_endpoint(base_url),
+        poll_interval=2.0,
+        timeout=timeout
+    )
+    if custom_id not in contents:
+        raise RuntimeError(f"Batch 结果中没有 {custom_id}")
+    return contents[custom_id]
+
+
+def run_provider_test(
+    index: int,
+    name: str,
+    api_key: str,
+    base_url: str,
+    model: str,
+    batch: bool = False,
+    batch_timeout: float = 3600.0
+):
+    """
+    测试单个 provider 的 json_mode 结构化输出
+
+    多个 provider 并发运行，因此输出先写入缓冲区，由调用方按顺序打印。
+
+    Args:
+        batch: 为 True 时通过 Batch API 异步提交并轮询结果（适合 CI/离线运行）
+        batch_timeout: Batch 模式下等待结果的最长秒数
+
+    Returns:
+        tuple: (ProofreadingResponse 或 None, 输出文本)
+    """
+    out = io.StringIO()
+    result = _run_provider_test(index, name, api_key, base_url, model, batch, batch_timeout, out)
+    return result, out.getvalue()
+
+
+def _run_provider_test(index, name, api_key, base_url, model, batch, batch_timeout, out):
+    print("\n" + "="*60, file=out)
+    print(f"测试 {index}: {name} JSON Mode{' (Batch API)' if batch else ''}", file=out)
+    print("="*60, file=out)
 
-    # 测试数据
-    test_cues = """请检查以下字幕中的错误：
+    # 检查 API Key
+    if not api_key:
+        print(f"警告: {name} 的 API Key 未设置，跳过测试", file=out)
+        return None
 
-1. Hello warld, how are you?
-2. I am fine, thank you.
-3. She is a good techer."""
+    print(f"API Key: {'*** ' + api_key[:10] + ' ...'}", file=out)
+    print(f"Base URL: {base_url}", file=out)
+    print(f"Model: {model}", file=out)
 
-    # 构造消息
-    messages = [
-        {"role": "system", "content": "你是字幕校对专家。请检查并返回JSON格式的修正建议。"},
-        {"role": "user", "content": f"""请返回以下JSON格式：
-{{
-  "corrections": [
-    {{
-      "cue_id": 1,
-      "original_text": "原文",
-      "corrected_text": "修正后",
-      "reason": "修正原因",
-      "confidence": 0.95
-    }}
-  ]
-}}
+    # 获取 OpenAI 兼容客户端（按 provider 和调用方式复用）
+    client = _get_client(base_url, api_key, batch)
 
-测试字幕：
-{test_cues}"""}
-    ]
+    # 使用 response_format 强制 JSON 输出
+    request_body = {
+        "model": model,
+        "messages": _MESSAGES,
+        "response_format": {"type": "json_object"},
+        "temperature": 0.7,
+    }
 
-    print("\n正在调用 Zhipu API...")
+    print(f"\n正在调用 {name} API...", file=out)
+    response_content = None
     try:
-        # 使用 response_format 强制 JSON 输出
-        response = client.chat.completions.create(
-            model=ZHIPU_MODEL,
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-
-        response_content = response.choices[0].message.content
-        print(f"响应内容类型: {type(response_content)}")
-        print(f"响应内容长度: {len(response_content)} 字符")
-        print(f"响应内容预览: {response_content[:200]}...")
-
-        # 解析 JSON
-        response_json = json.loads(response_content)
-        print(f"\nJSON 解析成功:")
-        print(f"  - corrections 数量: {len(response_json.get('corrections', []))}")
-
-        # Pydantic 验证
-        print("\n正在使用 Pydantic 验证...")
-        validated_response = ProofreadingResponse.model_validate_json(response_content)
-        print(f"Pydantic 验证成功!")
-        print(f"  - 验证后的 corrections 数量: {len(validated_response.corrections)}")
-
-        for i, correction in enumerate(validated_response.corrections, 1):
-            print(f"\n  修正建议 {i}:")
-            print(f"    - cue_id: {correction.cue_id}")
-            print(f"    - 原文: {correction.original_text}")
-            print(f"    - 修正: {correction.corrected_text}")
-            print(f"    - 原因: {correction.reason}")
-            print(f"    - 置信度: {correction.confidence}")
-
-        print("\nZhipu JSON Mode 测试通过!")
+        if batch:
+            response_text = _run_batch_request(
+                client,
+                custom_id=f"provider-{index}",
+                base_url=base_url,
+                body=request_body,
+                out=out,
+                timeout=batch_timeout
+            )
+            response_content = response_text.encode("utf-8")
+        else:
+            response_content, first_token_latency, chunk_count = _stream_chat_completion(client, request_body)
+            print(f"首个 token 耗时: {first_token_latency:.2f} 秒，共 {chunk_count} 个分片", file=out)
+
+        print(f"响应内容长度: {len(response_content)} 字节", file=out)
+        print(f"响应内容预览: {response_content[:200].decode('utf-8', errors='ignore')}...", file=out)
+
+        # JSON 解析与 Pydantic 验证在 validate_json 中一次完成
+        print("\n正在使用 Pydantic 解析并验证...", file=out)
+        validated_response = _PROOFREADING_ADAPTER.validate_json(response_content)
+        print(f"Pydantic 验证成功!", file=out)
+        print(f"  - corrections 数量: {len(validated_response.corrections)}", file=out)
+
+        # 由 pydantic-core 一次性序列化全部修正建议，代替逐字段 print
+        print(validated_response.model_dump_json(indent=2), file=out)
+
+        print(f"\n{name} JSON Mode 测试通过!", file=out)
         return validated_response
 
-    except json.JSONDecodeError as e:
-        print(f"\n错误: JSON 解析失败: {e}")
-        print(f"原始响应: {response_content}")
-        return None
     except ValidationError as e:
-        print(f"\n错误: Pydantic 验证失败: {e}")
+        if any(err["type"] == "json_invalid" for err in e.errors()):
+            print(f"\n错误: JSON 解析失败: {e}", file=out)
+            print(f"原始响应: {response_content.decode('utf-8', errors='replace')}", file=out)
+        else:
+            print(f"\n错误: Pydantic 验证失败: {e}", file=out)
         return None
     except Exception as e:
-        print(f"\n错误: API 调用失败: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"\n错误: API 调用失败: {e}", file=out)
+        traceback.print_exc(file=out)
         return None
 
 
+# (名称, 待校验 JSON, 是否应通过校验)；JSON 在导入时编码为 bytes，校验时 pydantic-core 直接解析
+EDGE_CASES = [(name, payload.encode("utf-8"), should_pass) for name, payload, should_pass in [
+    ("有效的 JSON",
+     '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 0.95}]}',
+     True),
+    ("缺少必填字段 (confidence)",
+     '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误"}]}',
+     False),
+    ("置信度超出范围 (confidence = 1.5)",
+     '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 1.5}]}',
+     False),
+    ("重复的 cue_id",
+     '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 0.95}, {"cue_id": 1, "original_text": "Good techer", "corrected_text": "Good teacher", "reason": "拼写错误", "confidence": 0.9}]}',
+     False),
+]]
+
+
 def test_pydantic_validation_edge_cases():
     """测试 Pydantic 验证的边界情况"""
     print("\n" + "="*60)
-    print("测试 3: Pydantic 验证边界情况")
+    print(f"测试 {len(PROVIDER_KEY_ENV_VARS) + 1}: Pydantic 验证边界情况")
     print("="*60)
 
-    # 测试用例 1: 有效的 JSON
-    print("\n测试用例 1: 有效的 JSON")
-    valid_json = '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 0.95}]}'
-    try:
-        validated = ProofreadingResponse.model_validate_json(valid_json)
-        print(f"  验证通过: {len(validated.corrections)} 条修正建议")
-    except ValidationError as e:
-        print(f"  验证失败: {e}")
-
-    # 测试用例 2: 缺少必填字段
-    print("\n测试用例 2: 缺少必填字段 (confidence)")
-    missing_field_json = '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误"}]}'
-    try:
-        validated = ProofreadingResponse.model_validate_json(missing_field_json)
-        print(f"  验证通过: {len(validated.corrections)} 条修正建议")
-    except ValidationError as e:
-        print(f"  验证失败 (预期): 缺少必填字段")
-
-    # 测试用例 3: 置信度超出范围
-    print("\n测试用例 3: 置信度超出范围 (confidence = 1.5)")
-    out_of_range_json = '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 1.5}]}'
-    try:
-        validated = ProofreadingResponse.model_validate_json(out_of_range_json)
-        print(f"  验证通过: {len(validated.corrections)} 条修正建议")
-    except ValidationError as e:
-        print(f"  验证失败 (预期): 置信度超出范围")
-
-    # 测试用例 4: 重复的 cue_id
-    print("\n测试用例 4: 重复的 cue_id")
-    duplicate_id_json = '{"corrections": [{"cue_id": 1, "original_text": "Hello warld", "corrected_text": "Hello world", "reason": "拼写错误", "confidence": 0.95}, {"cue_id": 1, "original_text": "Good techer", "corrected_text": "Good teacher", "reason": "拼写错误", "confidence": 0.9}]}'
-    try:
-        validated = ProofreadingResponse.model_validate_json(duplicate_id_json)
-        print(f"  验证通过: {len(validated.corrections)} 条修正建议")
-    except ValidationError as e:
-        print(f"  验证失败 (预期): 存在重复的cue_id")
+    for i, (name, payload, should_pass) in enumerate(EDGE_CASES, 1):
+        print(f"\n测试用例 {i}: {name}")
+        try:
+            validated = _PROOFREADING_ADAPTER.validate_json(payload)
+            passed = True
+            print(f"  验证通过: {len(validated.corrections)} 条修正建议")
+        except ValidationError as e:
+            passed = False
+            print(f"  验证失败: {e.errors()[0]['msg']}")
+        if passed != should_pass:
+            print(f"  结果不符合预期: 应{'通过' if should_pass else '失败'}")
 
     print("\nPydantic 边界测试完成!")
 
@@ -316,17 +344,51 @@ def main():
     print("开始测试: Provider JSON Mode 结构化输出")
     print("="*60)
 
-    # 运行测试
-    kimi_result = test_kimi_json_mode()
-    zhipu_result = test_zhipu_json_mode()
+    parser = argparse.ArgumentParser(description="Provider JSON Mode 结构化输出测试")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="通过 Batch API 提交请求并轮询结果（CI/离线运行，更便宜但不实时）"
+    )
+    parser.add_argument(
+        "--batch-timeout",
+        type=float,
+        default=3600.0,
+        help="Batch 模式下每个 provider 等待结果的最长秒数（默认: 3600）"
+    )
+    args = parser.parse_args()
+
+    # 所有 provider 都没有 API Key 时（如 CI），只跑本地的 Pydantic 边界测试，不加载 app.config 和 openai SDK
+    if not any(os.environ.get(key) for key in PROVIDER_KEY_ENV_VARS):
+        print("未设置任何 provider 的 API Key，跳过 provider 测试")
+        test_pydantic_validation_edge_cases()
+        return
+
+    providers = load_providers()
+
+    # 各 provider 的 API 调用是 I/O 密集型，并发运行；输出按 provider 顺序打印
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        futures = [
+            executor.submit(
+                run_provider_test, i, *provider,
+                batch=args.batch, batch_timeout=args.batch_timeout
+            )
+            for i, provider in enumerate(providers, 1)
+        ]
+        results = []
+        for future in futures:
+            result, output = future.result()
+            print(output, end="")
+            results.append(result)
+
     test_pydantic_validation_edge_cases()
 
     # 总结
     print("\n" + "="*60)
     print("测试总结")
     print("="*60)
-    print(f"Kimi 测试: {'通过' if kimi_result else '失败/跳过'}")
-    print(f"Zhipu 测试: {'通过' if zhipu_result else '失败/跳过'}")
+    for (name, *_), result in zip(providers, results):
+        print(f"{name} 测试: {'通过' if result else '失败/跳过'}")
     print("="*60 + "\n")
 
 
@@ -12,6 +12,12 @@ Usage:
     # With local audio file
     python scripts/test_real_ai_integration.py --file "path/to/audio.mp3"
 
+    # Several local audio files in one run (WhisperX model is loaded once and reused)
+    python scripts/test_real_ai_integration.py --file "a.mp3" "b.mp3"
+
+    # Re-run on the same audio: completed steps are skipped; redo from step 5 on
+    python scripts/test_real_ai_integration.py --file "path/to/audio.mp3" --force-from 5
+
     # Interactive mode (will prompt for input)
     python scripts/test_real_ai_integration.py
 
@@ -27,6 +33,10 @@ Workflow:
 import os
 import sys
 import argparse
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -39,29 +49,80 @@ if sys.platform == "win32":
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import requests
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, event, func, select, update
 from sqlalchemy.orm import Session, sessionmaker
 
-from app.services.download_service import DownloadService
-from app.services.whisper.whisper_service import WhisperService
-from app.services.transcription_service import TranscriptionService
-from app.services.subtitle_proofreading_service import SubtitleProofreadingService
-from app.services.segmentation_service import SegmentationService
-from app.services.translation_service import TranslationService
-from app.services.marketing_service import MarketingService
-from app.services.obsidian_service import ObsidianService
-from app.services.ai.ai_service import AIService
+# Service modules (WhisperX/torch, LangChain, ...) are imported in the steps
+# that use them, so --help and the API key check do not pay their import cost
+from app.database import SQLITE_BUSY_TIMEOUT_MS
 from app.models import (
     Base, Episode, AudioSegment, TranscriptCue, Translation,
     Chapter, MarketingPost
 )
 from app.enums.workflow_status import WorkflowStatus
-from app.utils.file_utils import calculate_md5_sync, get_audio_duration
+from app.utils.file_utils import probe_audio_file
 from rich.console import Console
+from rich.logging import RichHandler
 from rich.panel import Panel
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
 
+# Provider for the proofreading, segmentation and translation steps
+# (marketing uses its own configured provider). Services built for the same
+# provider share langchain-openai's cached HTTP client, so connections to the
+# API are reused across steps.
+AI_PROVIDER = "moonshot"
+
+# Speaker diarization is the slowest part of transcription; shorter clips skip it
+DIARIZATION_MIN_DURATION = 60
+
+
+logger = logging.getLogger("workflow")
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records as-is so the listener thread formats them, tracebacks included."""
+
+    def prepare(self, record):
+        return record
+
+
+def start_workflow_logging(console: Console) -> QueueListener:
+    """
+    Route workflow errors through a queue to a background listener.
+
+    Step failures only enqueue the record; rendering the traceback and writing
+    it to the console happens on the listener thread, one record at a time.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue,
+        RichHandler(console=console, rich_tracebacks=True, show_path=False)
+    )
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
+def _set_sqlite_pragma(dbapi_conn, connection_record):
+    """
+    Tune SQLite for the workflow's many small commits.
+
+    WAL with synchronous=NORMAL only syncs at checkpoints instead of on every
+    commit; busy_timeout lets the concurrent step sessions wait for each other.
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA journal_size_limit=67108864")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
 
 def create_test_session(db_path: str = None) -> Session:
     """Create a SQLite database session for testing."""
@@ -75,6 +136,7 @@ def create_test_session(db_path: str = None) -> Session:
             "sqlite:///:memory:",
             connect_args={"check_same_thread": False},
         )
+    event.listen(engine, "connect", _set_sqlite_pragma)
     Base.metadata.create_all(engine)
     SessionFactory = sessionmaker(bind=engine)
     return SessionFactory()
@@ -99,32 +161,125 @@ def get_url_title(url: str) -> str:
         return "Unknown Audio"
 
 
+# Status an episode has reached once each resumable step has completed.
+# Step 1 always runs (it looks up the episode); steps 7 & 8 always re-render.
+STEP_DONE_STATUS = {
+    2: WorkflowStatus.TRANSCRIBED,
+    3: WorkflowStatus.PROOFREAD,
+    4: WorkflowStatus.SEGMENTED,
+    5: WorkflowStatus.TRANSLATED,
+}
+
+
+def should_skip_step(episode: Episode, step: int, force_from: int = None) -> bool:
+    """
+    Check whether a step's output already exists for the episode.
+
+    Steps at or after force_from always run again.
+    """
+    if force_from is not None and step >= force_from:
+        return False
+    return episode.workflow_status >= STEP_DONE_STATUS[step]
+
+
+def reset_forced_steps(db: Session, episode: Episode, force_from: int = None) -> None:
+    """
+    Roll the episode back to the state the step before force_from leaves it in.
+
+    Segmentation refuses episodes past PROOFREAD, and forced steps would
+    otherwise write an older status over a later one. The output of forced
+    steps is dropped as well: step 4's chapters and cue links, so it does not
+    add a second set, and step 5's translations, which it would otherwise
+    treat as done (step 6 replaces its posts itself).
+    """
+    if force_from is None:
+        return
+
+    reset_status = STEP_DONE_STATUS.get(force_from - 1)
+    if reset_status is not None and episode.workflow_status > reset_status:
+        episode.workflow_status = reset_status
+
+    episode_cues = select(TranscriptCue.id).join(
+        AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+    ).where(AudioSegment.episode_id == episode.id)
+    if force_from <= 4:
+        db.execute(
+            update(TranscriptCue).where(
+                TranscriptCue.id.in_(episode_cues)
+            ).values(chapter_id=None)
+        )
+        db.execute(delete(Chapter).where(Chapter.episode_id == episode.id))
+    if force_from <= 5:
+        db.execute(
+            delete(Translation).where(
+                Translation.cue_id.in_(episode_cues),
+                Translation.language_code == "zh"
+            )
+        )
+    db.flush()
+
+
+def finish_step(progress: Progress, task_id, passed: bool):
+    """Mark a step's progress task as done, flagging failures in its description."""
+    if not passed:
+        description = next(task.description for task in progress.tasks if task.id == task_id)
+        progress.update(task_id, description=f"[red]{description} (FAILED)[/red]")
+    progress.update(task_id, completed=1, total=1)
+
+
 def test_workflow_with_url(
     db: Session,
     url: str,
     console: Console,
     skip_download: bool = False,
-    audio_file: str = None
+    audio_file: str = None,
+    force_from: int = None
 ) -> bool:
     """
     Run the complete workflow with a real URL or audio file.
 
+    All steps share one live progress display: each step gets a spinner task
+    that completes when the step does, and step output prints above it.
+
     Args:
         db: Database session
         url: Source URL (or None if using local file)
         console: Rich console instance
         skip_download: Skip download step, use existing file
         audio_file: Path to local audio file
+        force_from: Re-run steps from this number on even if the episode
+            already completed them (default: skip completed steps)
 
     Returns:
         bool: True if all tests passed
     """
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("{task.description}"),
+        BarColumn(),
+        TimeRemainingColumn(),
+        console=console,
+        transient=False
+    ) as progress:
+        return run_workflow_steps(db, url, console, progress, skip_download, audio_file, force_from)
+
+
+def run_workflow_steps(
+    db: Session,
+    url: str,
+    console: Console,
+    progress: Progress,
+    skip_download: bool = False,
+    audio_file: str = None,
+    force_from: int = None
+) -> bool:
+    """Run the workflow steps, reporting each one as a task on progress."""
     results = {}
 
     # ========================================================================
     # Step 1: Download / Load Audio
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 1: Audio Source[/bold cyan]"))
+    step_task = progress.add_task("Step 1: Audio Source", total=None)
 
     try:
         local_audio_path = None
@@ -150,12 +305,11 @@ def test_workflow_with_url(
             console.print(f"[red]Invalid URL or file not found: {url}[/red]")
             return False
 
-        # Get audio info
-        file_hash = calculate_md5_sync(str(local_audio_path))
-        duration = get_audio_duration(str(local_audio_path))
+        # Get audio info (single read of the file; ffprobe runs alongside the hash)
+        file_hash, duration, file_size = probe_audio_file(str(local_audio_path))
 
         console.print(f"  File: {local_audio_path.name}")
-        console.print(f"  Size: {local_audio_path.stat().st_size / 1024 / 1024:.2f} MB")
+        console.print(f"  Size: {file_size / (1 << 20):.2f} MB")
         console.print(f"  Duration: {duration:.1f} seconds ({duration/60:.1f} minutes)")
         console.print(f"  Hash: {file_hash[:16]}...")
 
@@ -176,196 +330,316 @@ def test_workflow_with_url(
             db.flush()
             console.print(f"[green]Created new episode: {episode.title} (ID: {episode.id})[/green]")
 
+        reset_forced_steps(db, episode, force_from)
+
         results["audio_source"] = True
+        finish_step(progress, step_task, True)
 
     except Exception as e:
-        console.print(f"[red]Step 1 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 1 FAILED: {e}")
+        finish_step(progress, step_task, False)
         return False
 
     # ========================================================================
     # Step 2: Transcribe (WhisperX)
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 2: Transcription (WhisperX)[/bold cyan]"))
+    step_task = progress.add_task("Step 2: Transcription (WhisperX)", total=None)
 
     try:
-        # Update episode with audio path (required for transcription)
-        episode.audio_path = str(local_audio_path)
-        db.commit()
+        if should_skip_step(episode, 2, force_from):
+            console.print("[yellow]Already transcribed, skipping (use a fresh --db to redo)[/yellow]")
+        else:
+            # Update episode with audio path (required for transcription)
+            episode.audio_path = str(local_audio_path)
+            db.flush()
 
-        console.print("[cyan]Loading WhisperX model...[/cyan]")
-        WhisperService.load_models()
-        whisper_service = WhisperService.get_instance()
+            from app.services.whisper.whisper_service import WhisperService
+            from app.services.transcription_service import TranscriptionService
 
-        transcription_service = TranscriptionService(db, whisper_service)
+            # The ASR model is process-wide; later files in the same run reuse it
+            if WhisperService.get_device_info()["asr_model_loaded"]:
+                console.print("[cyan]Reusing loaded WhisperX model[/cyan]")
+            else:
+                console.print("[cyan]Loading WhisperX model...[/cyan]")
+                WhisperService.load_models()
+            whisper_service = WhisperService.get_instance()
 
-        console.print(f"[cyan]Transcribing: {local_audio_path}[/cyan]")
-        transcription_service.segment_and_transcribe(
-            episode_id=episode.id,
-            enable_diarization=True
-        )
+            transcription_service = TranscriptionService(db, whisper_service)
+
+            enable_diarization = duration >= DIARIZATION_MIN_DURATION
+            if not enable_diarization:
+                console.print(f"[yellow]Audio shorter than {DIARIZATION_MIN_DURATION}s, skipping diarization[/yellow]")
 
-        # Get the created cues
-        cues = db.query(TranscriptCue).join(
+            console.print(f"[cyan]Transcribing: {local_audio_path}[/cyan]")
+            transcription_service.segment_and_transcribe(
+                episode_id=episode.id,
+                enable_diarization=enable_diarization
+            )
+
+            episode.workflow_status = WorkflowStatus.TRANSCRIBED
+            db.flush()
+
+        # Count the created cues and fetch only the preview columns of the first 3
+        episode_cues = select(TranscriptCue).join(
             AudioSegment, TranscriptCue.segment_id == AudioSegment.id
-        ).filter(
+        ).where(
             AudioSegment.episode_id == episode.id
-        ).order_by(TranscriptCue.start_time).all()
+        )
+        cue_count = db.scalar(
+            episode_cues.with_only_columns(func.count(TranscriptCue.id))
+        )
 
-        console.print(f"[green]Transcription complete: {len(cues)} cues[/green]")
+        console.print(f"[green]Transcription complete: {cue_count} cues[/green]")
 
         # Show preview
         console.print("\n[bold]Transcript preview (first 3):[/bold]")
-        for cue in cues[:3]:
-            console.print(f"  [{cue.start_time:.1f}s] {cue.speaker}: {cue.text}")
-
-        # Update episode status
-        episode.workflow_status = WorkflowStatus.TRANSCRIBED
-        db.commit()
+        preview = db.execute(
+            episode_cues.with_only_columns(
+                TranscriptCue.start_time, TranscriptCue.speaker, TranscriptCue.text
+            ).order_by(TranscriptCue.start_time).limit(3)
+        )
+        for start_time, speaker, text in preview:
+            console.print(f"  [{start_time:.1f}s] {speaker}: {text}")
 
         results["transcription"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 2 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 2 FAILED: {e}")
         results["transcription"] = False
+    finish_step(progress, step_task, results["transcription"])
 
     # ========================================================================
-    # Step 3: Proofread Subtitles (Moonshot API)
+    # Steps 3 & 4: Proofreading and Segmentation, run concurrently
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 3: Subtitle Proofreading (Moonshot API)[/bold cyan]"))
+    # Segmentation reads the original cue text, so it does not wait for
+    # proofreading. Each step runs in its own session (sessions are not
+    # thread-safe) and results are printed in step order once both finish.
+    # Imported here rather than in the workers, which would contend for the import lock
+    from app.services.subtitle_proofreading_service import SubtitleProofreadingService
+    from app.services.segmentation_service import SegmentationService
+
+    session_factory = sessionmaker(bind=db.get_bind())
+    # Read in this thread: episode attributes expire on commit and must not be
+    # reloaded through the main session from a worker thread
+    episode_id = episode.id
+
+    def run_in_session(step):
+        # Proofreading commits its corrections itself, but segmentation only
+        # flushes its chapters; commit here so every step's writes outlive the session
+        session = session_factory()
+        try:
+            result = step(session)
+            session.commit()
+            return result
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def proofread(session):
+        # All batches go to Moonshot as one Batch API job instead of one request each;
+        # if the job fails or times out, proofread in real time instead of skipping it
+        service = SubtitleProofreadingService(session, provider=AI_PROVIDER)
+        try:
+            return service.scan_and_correct_batch(episode_id=episode_id, batch_size=20, apply=True)
+        except (TimeoutError, RuntimeError) as e:
+            logger.warning(f"Batch proofreading did not complete ({e}), falling back to real-time requests")
+            return service.scan_and_correct(episode_id=episode_id, batch_size=20, apply=True)
+
+    def segment(session):
+        segmentation_service = SegmentationService(session, provider=AI_PROVIDER)
+        chapters = segmentation_service.analyze_and_segment(episode_id)
+        # Read the fields before the session closes
+        return [(ch.start_time, ch.end_time, ch.title) for ch in chapters]
+
+    # Both tasks spin while the worker threads run; completed steps are not
+    # submitted and leave their future as None
+    proofread_task = progress.add_task("Step 3: Subtitle Proofreading (Moonshot API)", total=None)
+    segment_task = progress.add_task("Step 4: Semantic Segmentation (Moonshot API)", total=None)
+    proofread_future = segment_future = None
+    # The step sessions write, so release SQLite's write lock before they start
+    # (with --ai-cache the LLM cache writes through its own connection, too)
+    db.commit()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        if not should_skip_step(episode, 3, force_from):
+            proofread_future = executor.submit(run_in_session, proofread)
+        if not should_skip_step(episode, 4, force_from):
+            segment_future = executor.submit(run_in_session, segment)
+
+    # Pick up rows written by the step sessions
+    db.expire_all()
 
+    # ========================================================================
+    # Step 3: Proofread Subtitles (Moonshot API)
+    # ========================================================================
     try:
-        proofreading_service = SubtitleProofreadingService(db)
-
-        console.print("[cyan]Scanning for subtitle corrections...[/cyan]")
-        proofread_result = proofreading_service.scan_and_correct(
-            episode_id=episode.id,
-            batch_size=20,
-            apply=True
-        )
-
-        table = Table(title="Proofreading Results")
-        table.add_column("Metric", style="cyan")
-        table.add_column("Value", style="green")
-        table.add_row("Total Cues", str(proofread_result.total_cues))
-        table.add_row("Corrections", str(proofread_result.corrected_count))
-        table.add_row("Skipped", str(proofread_result.skipped_count))
-        console.print(table)
-
-        if proofread_result.corrections:
-            console.print("\n[yellow]Sample corrections:[/yellow]")
-            for corr in proofread_result.corrections[:2]:
-                console.print(f"  Cue {corr.cue_id}: {corr.original_text[:40]}...")
-                console.print(f"  -> {corr.corrected_text[:40]}...")
-                console.print(f"  Reason: {corr.reason}")
-
-        episode.workflow_status = WorkflowStatus.PROOFREAD
-        db.commit()
+        if proofread_future is None:
+            console.print("[yellow]Already proofread, skipping (use --force-from 3 to redo)[/yellow]")
+        else:
+            proofread_result = proofread_future.result()
+
+            table = Table(title="Proofreading Results")
+            table.add_column("Metric", style="cyan")
+            table.add_column("Value", style="green")
+            table.add_row("Total Cues", str(proofread_result.total_cues))
+            table.add_row("Corrections", str(proofread_result.corrected_count))
+            table.add_row("Skipped", str(proofread_result.skipped_count))
+            console.print(table)
+
+            if proofread_result.corrections:
+                console.print("\n[yellow]Sample corrections:[/yellow]")
+                for corr in proofread_result.corrections[:2]:
+                    console.print(f"  Cue {corr['cue_id']}: {corr['original_text'][:40]}...")
+                    console.print(f"  -> {corr['corrected_text'][:40]}...")
+                    console.print(f"  Reason: {corr['reason']}")
+
+            episode.workflow_status = WorkflowStatus.PROOFREAD
+            db.flush()
         results["proofreading"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 3 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 3 FAILED: {e}")
         results["proofreading"] = False
+    finish_step(progress, proofread_task, results["proofreading"])
 
     # ========================================================================
     # Step 4: Semantic Segmentation (Moonshot API)
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 4: Semantic Segmentation (Moonshot API)[/bold cyan]"))
-
     try:
-        ai_service = AIService(provider="moonshot")
-        segmentation_service = SegmentationService(db, ai_service)
-
-        console.print("[cyan]Analyzing and segmenting content...[/cyan]")
-        chapters = segmentation_service.analyze_and_segment(episode.id)
+        if segment_future is None:
+            console.print("[yellow]Already segmented, skipping (use --force-from 4 to redo)[/yellow]")
+            chapters = db.execute(
+                select(Chapter.start_time, Chapter.end_time, Chapter.title).where(
+                    Chapter.episode_id == episode_id
+                ).order_by(Chapter.chapter_index)
+            ).all()
+        else:
+            chapters = segment_future.result()
 
         table = Table(title="Chapters")
         table.add_column("#", style="cyan")
         table.add_column("Time Range", style="yellow")
         table.add_column("Title", style="green")
-        for i, ch in enumerate(chapters, 1):
-            time_range = f"{ch.start_time:.0f}s - {ch.end_time:.0f}s"
-            table.add_row(str(i), time_range, ch.title[:40])
+        for i, (start, end, title) in enumerate(chapters, 1):
+            time_range = f"{start:.0f}s - {end:.0f}s"
+            table.add_row(str(i), time_range, title[:40])
         console.print(table)
-        console.print(f"[green]Generated {len(chapters)} chapters[/green]")
+        console.print(f"[green]{len(chapters)} chapters[/green]")
 
-        episode.workflow_status = WorkflowStatus.SEGMENTED
-        db.commit()
+        if segment_future is not None:
+            episode.workflow_status = WorkflowStatus.SEGMENTED
+            db.flush()
         results["segmentation"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 4 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 4 FAILED: {e}")
         results["segmentation"] = False
+    finish_step(progress, segment_task, results["segmentation"])
 
     # ========================================================================
     # Step 5: Translation (Moonshot API)
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 5: Translation (Moonshot API)[/bold cyan]"))
+    step_task = progress.add_task("Step 5: Translation (Moonshot API)", total=None)
 
     try:
-        ai_service = AIService(provider="moonshot")
-        translation_service = TranslationService(db, ai_service)
+        # Commit the step 3 & 4 status updates before any LLM call: an open write
+        # transaction here would block the --ai-cache writes until the busy timeout
+        db.commit()
 
-        console.print("[cyan]Translating to Chinese...[/cyan]")
-        count = translation_service.batch_translate(
-            episode_id=episode.id,
-            language_code="zh"
-        )
+        skip_translation = should_skip_step(episode, 5, force_from)
+        if skip_translation:
+            console.print("[yellow]Already translated, skipping (use --force-from 5 to redo)[/yellow]")
+        else:
+            from app.services.translation_service import TranslationService
 
-        console.print(f"[green]Translated {count} cues[/green]")
+            translation_service = TranslationService(db, provider=AI_PROVIDER)
 
-        # Show sample
-        translations = db.query(Translation).join(TranscriptCue).join(
-            AudioSegment
-        ).filter(
-            AudioSegment.episode_id == episode.id,
-            Translation.language_code == "zh"
-        ).limit(3).all()
+            console.print("[cyan]Translating to Chinese...[/cyan]")
+            count = translation_service.batch_translate(
+                episode_id=episode.id,
+                language_code="zh"
+            )
 
-        for t in translations:
-            console.print(f"  [{t.cue.text[:30]}...]")
-            console.print(f"  -> {t.translation[:40]}...")
+            console.print(f"[green]Translated {count} cues[/green]")
+
+        # Show sample (only the two printed columns, no ORM objects)
+        samples = db.execute(
+            select(TranscriptCue.text, Translation.translation).join(
+                TranscriptCue, Translation.cue_id == TranscriptCue.id
+            ).join(
+                AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+            ).where(
+                AudioSegment.episode_id == episode.id,
+                Translation.language_code == "zh"
+            ).limit(3)
+        )
 
-        episode.workflow_status = WorkflowStatus.TRANSLATED
-        db.commit()
+        for cue_text, translation in samples:
+            console.print(f"  [{cue_text[:30]}...]")
+            console.print(f"  -> {translation[:40]}...")
+
+        if not skip_translation:
+            episode.workflow_status = WorkflowStatus.TRANSLATED
+            db.flush()
         results["translation"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 5 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 5 FAILED: {e}")
         results["translation"] = False
+    finish_step(progress, step_task, results["translation"])
 
     # ========================================================================
     # Step 6: Marketing Content (Moonshot API)
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 6: Marketing Content (Moonshot API)[/bold cyan]"))
+    step_task = progress.add_task("Step 6: Marketing Content (Moonshot API)", total=None)
 
     try:
-        marketing_service = MarketingService(db)
-
-        console.print("[cyan]Generating marketing posts...[/cyan]")
+        # Same as step 5: release the write lock before the marketing LLM calls
+        db.commit()
 
-        # Generate different angle tags
-        angles = ["干货硬核向", "职场焦虑向", "情感共鸣向"]
+        # Marketing has no workflow status of its own; existing posts mark it done
         posts = []
+        if force_from is None or force_from > 6:
+            posts = db.scalars(
+                select(MarketingPost).where(MarketingPost.episode_id == episode_id)
+            ).all()
 
-        for angle in angles:
-            copy = marketing_service.generate_xiaohongshu_copy(episode.id)
-            post = marketing_service.save_marketing_copy(
-                episode_id=episode.id,
-                copy=copy,
-                platform="xhs",
-                angle_tag=angle
-            )
-            posts.append(post)
+        if posts:
+            console.print("[yellow]Marketing posts already exist, skipping (use --force-from 6 to redo)[/yellow]")
+        else:
+            from app.services.marketing_service import MarketingService
+
+            console.print("[cyan]Generating marketing posts...[/cyan]")
+
+            # Generate different angle tags; the angles are independent API calls,
+            # so they run in parallel, each worker with its own session
+            angles = ["干货硬核向", "职场焦虑向", "情感共鸣向"]
+
+            def generate_copy(angle):
+                return run_in_session(
+                    lambda session: MarketingService(session).generate_xiaohongshu_copy(episode_id, angle=angle)
+                )
+
+            with ThreadPoolExecutor(max_workers=len(angles)) as executor:
+                copies = list(executor.map(generate_copy, angles))
+
+            # Persist once all copies exist, so no write transaction spans an API call;
+            # the posts are added together and written in a single flush
+            marketing_service = MarketingService(db)
+            posts = [
+                marketing_service.build_marketing_post(
+                    episode_id=episode_id,
+                    copy=copy,
+                    platform="xhs",
+                    angle_tag=angle
+                )
+                for angle, copy in zip(angles, copies)
+            ]
+            # A forced rerun replaces the episode's posts instead of adding duplicates
+            db.execute(delete(MarketingPost).where(MarketingPost.episode_id == episode_id))
+            db.add_all(posts)
+            db.flush()
 
         table = Table(title="Marketing Posts")
         table.add_column("Angle", style="cyan")
@@ -375,47 +649,34 @@ def test_workflow_with_url(
             preview = p.content[:60] + "..." if len(p.content) > 60 else p.content
             table.add_row(p.angle_tag, p.title[:30], preview)
         console.print(table)
-        console.print(f"[green]Generated {len(posts)} posts[/green]")
+        console.print(f"[green]{len(posts)} posts[/green]")
 
         results["marketing"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 6 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 6 FAILED: {e}")
         results["marketing"] = False
+    finish_step(progress, step_task, results["marketing"])
 
     # ========================================================================
-    # Step 7: Obsidian Document (Episode)
+    # Steps 7 & 8: Obsidian Documents (Episode + Marketing)
     # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 7: Obsidian Document Generation (Episode)[/bold cyan]"))
+    # Both documents are rendered from one load of the episode and chapters
+    step_task = progress.add_task("Step 7 & 8: Obsidian Document Generation (Episode + Marketing)", total=None)
 
     try:
+        from app.services.obsidian_service import ObsidianService
+
         obsidian_service = ObsidianService(db, vault_path=None)
-        file_path = obsidian_service.save_episode(episode.id, language_code="zh")
+        file_path, marketing_file_path = obsidian_service.save_episode_bundle(episode.id, language_code="zh")
 
         console.print(f"[green]Episode document created: {file_path}[/green]")
         console.print(f"  File size: {file_path.stat().st_size / 1024:.1f} KB")
 
         episode.workflow_status = WorkflowStatus.READY_FOR_REVIEW
-        db.commit()
+        db.flush()
         results["obsidian"] = True
 
-    except Exception as e:
-        console.print(f"[red]Step 7 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
-        results["obsidian"] = False
-
-    # ========================================================================
-    # Step 8: Obsidian Document (Marketing)
-    # ========================================================================
-    console.print(Panel.fit("[bold cyan]Step 8: Obsidian Document Generation (Marketing)[/bold cyan]"))
-
-    try:
-        obsidian_service = ObsidianService(db, vault_path=None)
-        marketing_file_path = obsidian_service.save_marketing_posts(episode.id)
-
         if marketing_file_path:
             console.print(f"[green]Marketing document created: {marketing_file_path}[/green]")
             console.print(f"  File size: {marketing_file_path.stat().st_size / 1024:.1f} KB")
@@ -425,10 +686,19 @@ def test_workflow_with_url(
         results["marketing_obsidian"] = True
 
     except Exception as e:
-        console.print(f"[red]Step 8 FAILED: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Step 7 & 8 FAILED: {e}")
+        results.setdefault("obsidian", False)
         results["marketing_obsidian"] = False
+    finish_step(progress, step_task, results["obsidian"] and results["marketing_obsidian"])
+
+    # No LLM call follows step 6, so its posts and the final status update are
+    # only flushed above and written together in this last transaction
+    try:
+        db.commit()
+    except Exception as e:
+        console.print(f"[red]Saving workflow results FAILED: {e}[/red]")
+        db.rollback()
+        return False
 
     return all(results.values())
 
@@ -484,14 +754,31 @@ Examples:
   # With local audio file
   python scripts/test_real_ai_integration.py --file "path/to/audio.mp3"
 
+  # Several local audio files, sharing one loaded WhisperX model
+  python scripts/test_real_ai_integration.py --file "a.mp3" "b.mp3"
+
   # Interactive mode
   python scripts/test_real_ai_integration.py
         """
     )
 
     parser.add_argument("--url", help="YouTube URL or audio source URL")
-    parser.add_argument("--file", help="Path to local audio file")
+    parser.add_argument("--file", nargs="+", help="Path(s) to local audio file(s)")
     parser.add_argument("--db", help="Path to database file (default: in-memory)")
+    parser.add_argument(
+        "--force-from",
+        type=int,
+        choices=range(3, 9),
+        metavar="{3..8}",
+        help="Re-run steps from this number on even if the episode already completed them "
+             "(default: skip completed steps). Transcription is never redone: "
+             "completed segments are kept, so use a fresh --db to re-transcribe"
+    )
+    parser.add_argument(
+        "--ai-cache",
+        action="store_true",
+        help="Cache LLM responses in the database so re-runs on the same audio skip repeated API calls"
+    )
 
     args = parser.parse_args()
 
@@ -514,9 +801,9 @@ Examples:
 
     # Determine input source
     url = args.url
-    audio_file = args.file
+    audio_files = args.file or []
 
-    if not url and not audio_file:
+    if not url and not audio_files:
         # Interactive mode
         console.print("[yellow]No URL or file specified. Enter input source:[/yellow]")
         console.print("  1. YouTube URL")
@@ -527,7 +814,7 @@ Examples:
         if choice == "1":
             url = input("Enter YouTube URL: ").strip()
         elif choice == "2":
-            audio_file = input("Enter path to audio file: ").strip()
+            audio_files = [input("Enter path to audio file: ").strip()]
         else:
             console.print("[red]Invalid choice[/red]")
             return
@@ -540,11 +827,12 @@ Examples:
         confirm = input("\nContinue with YouTube? (y/n): ").strip().lower()
         if confirm != 'y':
             return
-    elif audio_file:
-        if not Path(audio_file).exists():
-            console.print(f"[red]File not found: {audio_file}[/red]")
-            return
-        console.print(f"\n[cyan]Audio file: {audio_file}[/cyan]")
+    elif audio_files:
+        for audio_file in audio_files:
+            if not Path(audio_file).exists():
+                console.print(f"[red]File not found: {audio_file}[/red]")
+                return
+            console.print(f"\n[cyan]Audio file: {audio_file}[/cyan]")
     else:
         console.print("[red]Please provide a valid YouTube URL or audio file path[/red]")
         return
@@ -555,15 +843,25 @@ Examples:
 
     console.print(f"\n[bold]Database: {db_path}[/bold]")
     db = create_test_session(db_path)
+    log_listener = start_workflow_logging(console)
+
+    if args.ai_cache:
+        from app.services.ai.cache import enable_llm_cache
+
+        enable_llm_cache(db.get_bind())
+        console.print("[yellow]LLM response cache enabled (cached responses are reused)[/yellow]")
 
     try:
-        # Run workflow
-        success = test_workflow_with_url(
-            db=db,
-            url=url,
-            audio_file=audio_file,
-            console=console
-        )
+        # Run workflow; multiple files run in this process so the WhisperX model stays loaded
+        success = True
+        for audio_file in audio_files or [None]:
+            success = test_workflow_with_url(
+                db=db,
+                url=url,
+                audio_file=audio_file,
+                console=console,
+                force_from=args.force_from
+            ) and success
 
         if success:
             console.print("\n[green bold]Workflow completed successfully![/green bold]")
@@ -573,11 +871,10 @@ Examples:
     except KeyboardInterrupt:
         console.print("\n[yellow]Test interrupted by user[/yellow]")
     except Exception as e:
-        console.print(f"\n[red]FATAL ERROR: {e}[/red]")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"FATAL ERROR: {e}")
     finally:
         db.close()
+        log_listener.stop()
         console.print("\n[bold]Test session closed[/bold]")
 
 
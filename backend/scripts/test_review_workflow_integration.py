@@ -20,12 +20,16 @@ APPROVED 审核工作流集成测试
 2. 运行脚本:
    python scripts/test_review_workflow_integration.py --episode-id 19
 
+   失败时需要完整 traceback 可加 --debug
+
 环境变量要求（可选）:
    - MOONSHOT_API_KEY: 如果需要生成新文档
 """
 import os
+import re
 import sys
 import tempfile
+import traceback
 from pathlib import Path
 
 # Fix encoding for Windows console
@@ -36,6 +40,7 @@ if sys.platform == "win32":
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.orm import Session
 from rich.console import Console
 from rich.panel import Panel
@@ -47,27 +52,73 @@ from app.services.obsidian_service import ObsidianService
 from app.services.review_service import ReviewService
 from app.workflows.publisher import WorkflowPublisher
 
+# 状态比较直接使用整数值（workflow_status 列存储的即是整数）
+APPROVED_VALUE = WorkflowStatus.APPROVED.value
+READY_FOR_REVIEW_VALUE = WorkflowStatus.READY_FOR_REVIEW.value
+
+EDIT_MARKER = "[用户修改] "
+# 连续的一个或多个前缀，一次匹配全部去掉
+EDIT_MARKER_RE = re.compile(f"^(?:{re.escape(EDIT_MARKER)})+")
+
+# frontmatter 位于文档开头，查找 status 行时只扫描这么多行
+FRONTMATTER_SCAN_LINES = 20
+
+# Obsidian 文档中的字幕锚点: [时间](cue://ID)
+CUE_ANCHOR_RE = re.compile(r"cue://(\d+)\)")
+
+# Episode 某语言的翻译；语句只构建一次，编译结果由 SQLAlchemy 语句缓存复用
+EPISODE_TRANSLATIONS = select(Translation).join(TranscriptCue).join(AudioSegment).where(
+    AudioSegment.episode_id == bindparam("episode_id"),
+    Translation.language_code == bindparam("language_code")
+)
+
+
+def strip_edit_markers(text: str) -> str:
+    """移除所有 [用户修改] 前缀，恢复原始翻译"""
+    return EDIT_MARKER_RE.sub("", text, count=1)
+
 
 class ReviewWorkflowIntegrationTester:
     """审核工作流集成测试器"""
 
-    def __init__(self, db: Session, episode_id: int, temp_dir: Path = None):
-        """初始化测试器"""
+    def __init__(self, db: Session, episode_id: int, temp_dir: Path = None, debug: bool = False):
+        """初始化测试器（debug=True 时失败会打印完整 traceback）"""
         self.db = db
         self.episode_id = episode_id
+        self.debug = debug
         self.temp_dir = temp_dir or Path(tempfile.gettempdir()) / "review_workflow_test"
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.console = Console()
         self.obsidian_file_path = None
+        self.document_content = None  # 文档的内存副本，后续步骤直接复用，不再从磁盘读回
         self.edited_translations = []  # 存储编辑的翻译用于后续验证
 
+        # 各步骤共用的服务实例（ReviewService 使用临时目录）
+        self.obsidian_service = ObsidianService(db)
+        self.review_service = ReviewService(db)
+        self.review_service.notes_dir = self.temp_dir
+        self.publisher = WorkflowPublisher(db)
+
+        # 循环中的逐条输出先缓存，步骤结束时一次打印
+        self._log_buf = []
+
+    def _log(self, message: str):
+        """缓存一行输出"""
+        self._log_buf.append(message)
+
+    def _flush_log(self):
+        """一次性打印缓存的输出"""
+        if self._log_buf:
+            self.console.print("\n".join(self._log_buf))
+            self._log_buf.clear()
+
     def prepare_episode(self) -> Episode:
         """Step 1: 准备测试 Episode"""
         self.console.print()
         self.console.print("[bold cyan]Step 1: 准备 Episode[/bold cyan]")
         self.console.print("-" * 60)
 
-        episode = self.db.query(Episode).filter(Episode.id == self.episode_id).first()
+        episode = self.db.get(Episode, self.episode_id)
         if not episode:
             raise ValueError(f"Episode {self.episode_id} 不存在")
 
@@ -75,22 +126,21 @@ class ReviewWorkflowIntegrationTester:
         self.console.print(f"标题: {episode.title}")
         self.console.print(f"当前状态: {WorkflowStatus(episode.workflow_status).label}")
 
-        # 确保有字幕和翻译
-        cue_count = self.db.query(TranscriptCue).join(AudioSegment).filter(
-            AudioSegment.episode_id == episode.id
-        ).count()
-
-        translation_count = self.db.query(Translation).join(TranscriptCue).join(
-            AudioSegment
-        ).filter(
-            AudioSegment.episode_id == episode.id,
-            Translation.language_code == "zh"
-        ).count()
+        # 确保有字幕和翻译（只需判断是否存在，EXISTS 命中第一行即返回，不做全量计数）
+        has_cues = self.db.scalar(select(
+            select(TranscriptCue.id).join(AudioSegment).where(
+                AudioSegment.episode_id == episode.id
+            ).exists()
+        ))
+        has_translations = self.db.scalar(
+            select(EPISODE_TRANSLATIONS.exists()),
+            {"episode_id": episode.id, "language_code": "zh"}
+        )
 
-        self.console.print(f"字幕数量: {cue_count}")
-        self.console.print(f"翻译数量: {translation_count}")
+        self.console.print(f"有字幕: {'是' if has_cues else '否'}")
+        self.console.print(f"有翻译: {'是' if has_translations else '否'}")
 
-        if cue_count == 0 or translation_count == 0:
+        if not has_cues or not has_translations:
             raise ValueError(f"Episode {episode.id} 缺少字幕或翻译数据")
 
         return episode
@@ -101,27 +151,23 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("[bold cyan]Step 2: 生成 Obsidian 文档[/bold cyan]")
         self.console.print("-" * 60)
 
-        # 创建 Obsidian 服务
-        obsidian_service = ObsidianService(self.db)
-
         # 生成文档内容
         self.console.print(f"生成文档: Episode {self.episode_id}")
-        markdown_content = obsidian_service.render_episode(
+        markdown_content = self.obsidian_service.render_episode(
             self.episode_id, language_code="zh"
         )
 
-        # 设置为 pending_review 状态
-        markdown_content = markdown_content.replace(
-            "status: published",
-            "status: pending_review"
-        )
+        # 设置为 pending_review 状态（status 只出现在 frontmatter，只替换其结束分隔符之前的部分）
+        head, sep, tail = markdown_content.partition("\n---\n")
+        head = head.replace("status: published", "status: pending_review", 1)
+        markdown_content = head + sep + tail
 
         # 保存到临时目录
         filename = f"{self.episode_id}-test-review.md"
         self.obsidian_file_path = self.temp_dir / filename
 
-        with open(self.obsidian_file_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        self.obsidian_file_path.write_text(markdown_content, encoding='utf-8')
+        self.document_content = markdown_content
 
         self.console.print(f"[green]文档已生成: {self.obsidian_file_path}[/green]")
         self.console.print(f"  文件大小: {self.obsidian_file_path.stat().st_size / 1024:.1f} KB")
@@ -134,89 +180,88 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("[bold cyan]Step 3: 模拟用户修改翻译[/bold cyan]")
         self.console.print("-" * 60)
 
-        # 读取文档
-        with open(self.obsidian_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # 使用 Step 2 生成的文档内容
+        content = self.document_content
 
         # 获取前 3 个翻译作为测试
-        translations = self.db.query(Translation).join(TranscriptCue).join(
-            AudioSegment
-        ).filter(
-            AudioSegment.episode_id == self.episode_id,
-            Translation.language_code == "zh"
-        ).limit(3).all()
+        translations = self.db.scalars(
+            EPISODE_TRANSLATIONS.limit(3),
+            {"episode_id": self.episode_id, "language_code": "zh"}
+        ).all()
 
         edited_translations = []
         lines = content.split('\n')
-        modified_lines = lines.copy()
 
-        for t in translations:
+        # 单次扫描文档：按 cue 锚点中的 ID 查表，而不是为每条翻译重扫全文
+        translations_by_cue = {t.cue_id: t for t in translations}
+        for i, line in enumerate(lines):
+            match = CUE_ANCHOR_RE.search(line)
+            if not match:
+                continue
+            t = translations_by_cue.get(int(match.group(1)))
+            # 找到了 cue 锚点行，翻译在后面 2-3 行
+            # 格式: [时间](cue://ID) English text
+            #       (空行)
+            #       中文翻译
+            if t is None or i + 2 >= len(lines):
+                continue
+
+            translation_line_idx = i + 2
+            # 检查这行是否是翻译（不是空行，不是 cue 锚点）
+            translation_line = lines[translation_line_idx].strip()
+            if not translation_line or "cue://" in translation_line or translation_line.startswith("**"):
+                continue
+
             # 获取干净的原始翻译（移除所有 [用户修改] 前缀）
-            original = t.translation
-            while original.startswith("[用户修改] "):
-                original = original[len("[用户修改] "):]
+            original = strip_edit_markers(t.translation)
 
             # 模拟用户修改：添加 "[用户修改]" 前缀
-            edited = f"[用户修改] {original}"
-
-            # 在文档中查找对应 cue_id 的翻译并替换
-            cue_anchor = f"cue://{t.cue_id})"
-            for i, line in enumerate(lines):
-                if cue_anchor in line:
-                    # 找到了 cue 锚点行，翻译在后面 2-3 行
-                    # 格式: [时间](cue://ID) English text
-                    #       (空行)
-                    #       中文翻译
-                    if i + 2 < len(lines):
-                        translation_line_idx = i + 2
-                        # 检查这行是否是翻译（不是空行，不是 cue 锚点）
-                        translation_line = lines[translation_line_idx].strip()
-                        if translation_line and "cue://" not in translation_line and not translation_line.startswith("**"):
-                            # 找到了翻译行，替换它
-                            # 需要保持原有的缩进和格式
-                            original_line = lines[translation_line_idx]
-                            # 找到翻译文本在行中的起始位置（去除前导空格）
-                            leading_spaces = len(original_line) - len(original_line.lstrip())
-                            indent = original_line[:leading_spaces]
-                            # 替换翻译行
-                            modified_lines[translation_line_idx] = indent + edited
-
-                            edited_translations.append({
-                                'cue_id': t.cue_id,
-                                'original': original,
-                                'edited': edited
-                            })
-                            break
-
-        # 修改状态为 approved
-        modified_lines = [line.replace("status: pending_review", "status: approved") for line in modified_lines]
+            edited = f"{EDIT_MARKER}{original}"
+
+            # 找到了翻译行，替换它，保持原有的缩进
+            original_line = lines[translation_line_idx]
+            leading_spaces = len(original_line) - len(original_line.lstrip())
+            indent = original_line[:leading_spaces]
+            lines[translation_line_idx] = indent + edited
+
+            edited_translations.append({
+                'cue_id': t.cue_id,
+                'original': original,
+                'edited': edited
+            })
+            del translations_by_cue[t.cue_id]
+            if not translations_by_cue:
+                break
+
+        # 修改状态为 approved（status 在文件头的 frontmatter 中，只检查前几行）
+        for i in range(min(FRONTMATTER_SCAN_LINES, len(lines))):
+            if lines[i] == "status: pending_review":
+                lines[i] = "status: approved"
+                break
 
         # 保存修改后的文档
-        content = '\n'.join(modified_lines)
-        with open(self.obsidian_file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        content = '\n'.join(lines)
+        self.obsidian_file_path.write_text(content, encoding='utf-8')
+        self.document_content = content
 
         self.console.print(f"[green]已修改 {len(edited_translations)} 条翻译[/green]")
         for i, edit in enumerate(edited_translations, 1):
-            self.console.print(f"  {i}. Cue {edit['cue_id']}")
-            self.console.print(f"     原文: {edit['original'][:40]}...")
-            self.console.print(f"     修改: {edit['edited'][:40]}...")
+            self._log(f"  {i}. Cue {edit['cue_id']}")
+            self._log(f"     原文: {edit['original'][:40]}...")
+            self._log(f"     修改: {edit['edited'][:40]}...")
+        self._flush_log()
 
         self.console.print(f"[green]状态已修改为: approved[/green]")
 
         # 验证文档中的修改
         self.console.print("\n[debug] 验证文档内容:")
-        with open(self.obsidian_file_path, 'r', encoding='utf-8') as f:
-            doc_content = f.read()
-            for edit in edited_translations[:1]:  # 只检查第一个
-                cue_id = edit['cue_id']
-                # 查找这个 cue 在文档中的位置
-                cue_marker = f"cue://{cue_id}"
-                if cue_marker in doc_content:
-                    idx = doc_content.find(cue_marker)
-                    snippet = doc_content[idx:idx+300]
-                    self.console.print(f"  Cue {cue_id} 在文档中的内容:")
-                    self.console.print(f"    {snippet[:150]}...")
+        for edit in edited_translations[:1]:  # 只检查第一个
+            cue_id = edit['cue_id']
+            # 查找这个 cue 在文档中的位置（即刚写入的内容）
+            idx = content.find(f"cue://{cue_id}")
+            if idx != -1:
+                self.console.print(f"  Cue {cue_id} 在文档中的内容:")
+                self.console.print(f"    {content[idx:idx+150]}...")
 
         self.edited_translations = edited_translations
         return edited_translations
@@ -228,48 +273,58 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("-" * 60)
 
         # 重置待测试的翻译状态（确保测试的幂等性）
+        # 只查询 (id, translation) 两列，去前缀后按主键一次批量 UPDATE
         test_cue_ids = [t['cue_id'] for t in self.edited_translations]
-        translations = self.db.query(Translation).filter(
-            Translation.cue_id.in_(test_cue_ids),
-            Translation.language_code == "zh"
+        rows = self.db.execute(
+            select(Translation.id, Translation.translation).where(
+                Translation.cue_id.in_(test_cue_ids),
+                Translation.language_code == "zh"
+            )
         ).all()
 
-        for t in translations:
-            # 移除所有 [用户修改] 前缀，恢复到真正的原始状态
-            current = t.translation
-            # 移除所有 "[用户修改] " 前缀
-            while current.startswith("[用户修改] "):
-                current = current[len("[用户修改] "):]
-            # 重置状态
-            t.translation = current
-            t.original_translation = None
-            t.is_edited = False
+        if rows:
+            self.db.execute(update(Translation), [
+                {
+                    "id": translation_id,
+                    "translation": strip_edit_markers(translation),
+                    "original_translation": None,
+                    "is_edited": False,
+                }
+                for translation_id, translation in rows
+            ])
         self.db.commit()
+        # 确保会话中已加载的翻译对象反映批量 UPDATE 的结果（会话 expire_on_commit=False）
+        translation_ids = [translation_id for translation_id, _ in rows]
+        self._expire_translations(translation_ids)
 
-        self.console.print(f"[yellow]已重置 {len(translations)} 条翻译状态[/yellow]")
+        self.console.print(f"[yellow]已重置 {len(rows)} 条翻译状态[/yellow]")
 
         # 确保 Episode 状态为 READY_FOR_REVIEW
-        episode = self.db.query(Episode).filter(Episode.id == self.episode_id).first()
-        episode.workflow_status = WorkflowStatus.READY_FOR_REVIEW.value
+        episode = self.db.get(Episode, self.episode_id)
+        episode.workflow_status = READY_FOR_REVIEW_VALUE
         self.db.commit()
 
         self.console.print(f"Episode 状态已设置为: {WorkflowStatus.READY_FOR_REVIEW.label}")
 
-        # 创建 ReviewService（使用临时目录）
-        review_service = ReviewService(self.db)
-        review_service.notes_dir = self.temp_dir
-
         # 执行同步
         self.console.print("执行 sync_approved_episodes()...")
-        count = review_service.sync_approved_episodes()
+        count = self.review_service.sync_approved_episodes()
 
         self.console.print(f"[green]同步完成: {count} 个 Episode[/green]")
 
-        # 刷新数据库会话以获取最新数据
-        self.db.expire_all()
+        # 只让同步改动的 Episode 和翻译失效，下次访问时重新加载
+        self.db.expire(episode)
+        self._expire_translations(translation_ids)
 
         return count
 
+    def _expire_translations(self, translation_ids: list):
+        """让会话中已加载的指定翻译失效（未加载的无需处理）"""
+        for translation_id in translation_ids:
+            translation = self.db.identity_map.get(self.db.identity_key(Translation, translation_id))
+            if translation is not None:
+                self.db.expire(translation)
+
     def verify_selective_writeback(self, edited_translations: list) -> bool:
         """Step 5: 验证选择性回填"""
         self.console.print()
@@ -278,54 +333,55 @@ class ReviewWorkflowIntegrationTester:
 
         all_passed = True
 
+        # 一次 IN 查询取回全部被编辑的翻译，按 cue_id 索引
+        translations_by_cue = {
+            t.cue_id: t
+            for t in self.db.scalars(
+                select(Translation).where(
+                    Translation.cue_id.in_([edit['cue_id'] for edit in edited_translations]),
+                    Translation.language_code == "zh"
+                )
+            )
+        }
+
         for edit in edited_translations:
             cue_id = edit['cue_id']
 
-            # 查询翻译
-            translation = self.db.query(Translation).filter(
-                Translation.cue_id == cue_id,
-                Translation.language_code == "zh"
-            ).first()
+            translation = translations_by_cue.get(cue_id)
 
             if not translation:
-                self.console.print(f"[red]Cue {cue_id}: 翻译不存在[/red]")
+                self._log(f"[red]Cue {cue_id}: 翻译不存在[/red]")
                 all_passed = False
                 continue
 
             # 验证原始翻译已保存
             if translation.original_translation != edit['original']:
-                self.console.print(
-                    f"[red]Cue {cue_id}: 原始翻译未正确保存[/red]"
-                )
-                self.console.print(f"  预期: {edit['original'][:40]}...")
-                self.console.print(f"  实际: {translation.original_translation[:40] if translation.original_translation else 'None'}...")
+                self._log(f"[red]Cue {cue_id}: 原始翻译未正确保存[/red]")
+                self._log(f"  预期: {edit['original'][:40]}...")
+                self._log(f"  实际: {translation.original_translation[:40] if translation.original_translation else 'None'}...")
                 all_passed = False
                 continue
 
             # 验证当前翻译已更新
             if translation.translation != edit['edited']:
-                self.console.print(
-                    f"[red]Cue {cue_id}: 翻译未正确更新[/red]"
-                )
-                self.console.print(f"  预期: {edit['edited'][:40]}...")
-                self.console.print(f"  实际: {translation.translation[:40]}...")
+                self._log(f"[red]Cue {cue_id}: 翻译未正确更新[/red]")
+                self._log(f"  预期: {edit['edited'][:40]}...")
+                self._log(f"  实际: {translation.translation[:40]}...")
                 all_passed = False
                 continue
 
             # 验证 is_edited 标志
             if not translation.is_edited:
-                self.console.print(
-                    f"[red]Cue {cue_id}: is_edited 标志未设置[/red]"
-                )
+                self._log(f"[red]Cue {cue_id}: is_edited 标志未设置[/red]")
                 all_passed = False
                 continue
 
-            self.console.print(
-                f"[green]Cue {cue_id}: 验证通过[/green]"
-            )
-            self.console.print(f"  原始翻译: {translation.original_translation[:40]}...")
-            self.console.print(f"  当前翻译: {translation.translation[:40]}...")
-            self.console.print(f"  is_edited: {translation.is_edited}")
+            self._log(f"[green]Cue {cue_id}: 验证通过[/green]")
+            self._log(f"  原始翻译: {translation.original_translation[:40]}...")
+            self._log(f"  当前翻译: {translation.translation[:40]}...")
+            self._log(f"  is_edited: {translation.is_edited}")
+
+        self._flush_log()
 
         return all_passed
 
@@ -335,7 +391,7 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("[bold cyan]Step 6: 验证状态变更[/bold cyan]")
         self.console.print("-" * 60)
 
-        episode = self.db.query(Episode).filter(Episode.id == self.episode_id).first()
+        episode = self.db.get(Episode, self.episode_id)
         current_status = WorkflowStatus(episode.workflow_status)
 
         self.console.print(f"Episode 状态: {current_status.label} ({current_status.value})")
@@ -356,15 +412,13 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("-" * 60)
 
         try:
-            publisher = WorkflowPublisher(self.db)
-
             # 测试从 APPROVED 发布（应该成功）
             self.console.print("测试从 APPROVED 状态发布...")
             self.console.print("注意: 这是模拟测试，不会实际发布到平台")
 
             # 验证 Episode 状态
-            episode = self.db.query(Episode).filter(Episode.id == self.episode_id).first()
-            if episode.workflow_status != WorkflowStatus.APPROVED.value:
+            episode = self.db.get(Episode, self.episode_id)
+            if episode.workflow_status != APPROVED_VALUE:
                 self.console.print("[yellow]Episode 状态不是 APPROVED，跳过发布测试[/yellow]")
                 return False
 
@@ -396,19 +450,17 @@ class ReviewWorkflowIntegrationTester:
         self.console.print("-" * 60)
 
         # 临时将状态改为 READY_FOR_REVIEW
-        episode = self.db.query(Episode).filter(Episode.id == self.episode_id).first()
+        episode = self.db.get(Episode, self.episode_id)
         original_status = episode.workflow_status
-        episode.workflow_status = WorkflowStatus.READY_FOR_REVIEW.value
+        episode.workflow_status = READY_FOR_REVIEW_VALUE
         self.db.commit()
 
         self.console.print(f"临时状态: {WorkflowStatus.READY_FOR_REVIEW.label}")
 
         try:
-            publisher = WorkflowPublisher(self.db)
-
             self.console.print("尝试从 READY_FOR_REVIEW 状态发布...")
             # 这应该抛出 ValueError
-            publisher.publish_workflow(self.episode_id)
+            self.publisher.publish_workflow(self.episode_id)
 
             self.console.print("[red]测试失败: 应该抛出异常但没有[/red]")
             episode.workflow_status = original_status  # 恢复原状态
@@ -494,8 +546,8 @@ class ReviewWorkflowIntegrationTester:
         except Exception as e:
             self.console.print()
             self.console.print(f"[red]测试失败: {e}[/red]")
-            import traceback
-            self.console.print(traceback.format_exc())
+            if self.debug:
+                self.console.print(traceback.format_exc())
             return False
 
     def display_results(self, all_passed: bool):
@@ -520,6 +572,8 @@ def main():
                        help="Episode ID")
     parser.add_argument("--temp-dir", type=str,
                        help="临时目录路径（默认使用系统临时目录）")
+    parser.add_argument("--debug", action="store_true",
+                       help="失败时打印完整 traceback")
 
     args = parser.parse_args()
 
@@ -532,7 +586,7 @@ def main():
     try:
         with get_session() as db:
             tester = ReviewWorkflowIntegrationTester(
-                db, args.episode_id, temp_dir
+                db, args.episode_id, temp_dir, debug=args.debug
             )
             success = tester.run_complete_test()
             return 0 if success else 1
@@ -545,8 +599,8 @@ def main():
     except Exception as e:
         console.print()
         console.print(f"[red]错误: {e}[/red]")
-        import traceback
-        console.print(traceback.format_exc())
+        if args.debug:
+            console.print(traceback.format_exc())
         return 1
 
 
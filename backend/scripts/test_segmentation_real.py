@@ -12,12 +12,15 @@ r"""
 - 可以使用提供的示例英文文本，也可以修改为自己的文本
 """
 import os
+import re
 import sys
 from pathlib import Path
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sqlalchemy import insert
+
 from app.database import get_session
 from app.services.segmentation_service import SegmentationService
 from app.services.ai.ai_service import AIService
@@ -25,6 +28,9 @@ from app.models import Episode, AudioSegment, TranscriptCue
 from app.enums.workflow_status import WorkflowStatus
 
 
+# 转录行格式: [MM:SS] SPEAKER_XX: text
+CUE_LINE_RE = re.compile(r"^\[(\d{2}):(\d{2})\]\s+([^:\s]+):\s+(.*)$")
+
 # 示例英文播客转录文本（10分钟内容模拟）
 SAMPLE_TRANSCRIPT = """
 [00:00] SPEAKER_00: Hello everyone, and welcome back to another episode of our English learning podcast. I'm your host, and today we have an exciting topic to discuss.
@@ -94,33 +100,27 @@ def create_test_episode_with_transcript(db, transcript_text: str = None):
     db.flush()
 
     # 解析转录文本并创建 TranscriptCue
-    lines = transcript_text.strip().split('\n')
-    for line in lines:
-        if line.strip():
-            # 解析格式: [MM:SS] SPEAKER_XX: text
-            if line.startswith('['):
-                time_end = line.index(']')
-                time_str = line[1:time_end]
-                speaker_end = line.index(':', time_end)
-                speaker = line[time_end + 2:speaker_end].strip()
-                text = line[speaker_end + 2:].strip()
-
-                # 解析时间
-                minutes, seconds = map(int, time_str.split(':'))
-                start_time = minutes * 60 + seconds
-
-                cue = TranscriptCue(
-                    segment_id=segment.id,
-                    start_time=float(start_time),
-                    end_time=float(start_time + 45),  # 假设每句约45秒
-                    speaker=speaker,
-                    text=text
-                )
-                db.add(cue)
-
-    db.flush()
+    # 先收集行数据，再一次 executemany 批量插入（不创建 ORM 对象）
+    cue_rows = []
+    for line in transcript_text.strip().split('\n'):
+        match = CUE_LINE_RE.match(line)
+        if not match:
+            continue
+        minutes, seconds, speaker, text = match.groups()
+        start_time = int(minutes) * 60 + int(seconds)
+
+        cue_rows.append({
+            "segment_id": segment.id,
+            "start_time": float(start_time),
+            "end_time": float(start_time + 45),  # 假设每句约45秒
+            "speaker": speaker,
+            "text": text.strip()
+        })
+
+    if cue_rows:
+        db.execute(insert(TranscriptCue), cue_rows)
     print(f"创建测试 Episode: ID={episode.id}")
-    print(f"创建 {len([l for l in lines if l.strip() and l.startswith('[')])} 条 TranscriptCue")
+    print(f"创建 {len(cue_rows)} 条 TranscriptCue")
 
     return episode
 
@@ -5,24 +5,34 @@
 
 用法:
     python scripts/test_segmentation_structured_output_real_ai.py
+
+LLM 响应缓存在 .cache/segmentation/ 下，重复运行相同的测试数据时直接复用；
+设置环境变量 SEG_TEST_NO_CACHE=1 可跳过缓存，强制重新请求。
 """
+import hashlib
+import sqlite3
 import sys
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import io
-# Windows 控制台 UTF-8 编码处理
+# Windows 控制台 UTF-8 编码处理（原地切换编码，保留原有的缓冲设置）
 if sys.platform == "win32":
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
 
 from loguru import logger
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.models.base import Base
 from app.models import Episode, TranscriptCue, AudioSegment, Chapter
+from app.services.ai.cache import enable_llm_cache
 from app.services.segmentation_service import SegmentationService
 from app.config import (
     DATABASE_PATH,
@@ -36,23 +46,57 @@ from app.config import (
 from app.enums.workflow_status import WorkflowStatus
 
 
+# 跨运行复用的 LLM 响应缓存（key 为模型参数 + prompt 的哈希）
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "segmentation"
+
+
+def setup_llm_cache():
+    """启用磁盘 LLM 响应缓存；设置 SEG_TEST_NO_CACHE 时跳过"""
+    if os.environ.get("SEG_TEST_NO_CACHE"):
+        logger.info("SEG_TEST_NO_CACHE 已设置，不使用 LLM 响应缓存")
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    enable_llm_cache(create_engine(f"sqlite:///{(CACHE_DIR / 'llm_cache.db').as_posix()}"))
+
+
+def _set_sqlite_pragma(dbapi_conn, connection_record):
+    """内存测试库无需持久化：关闭日志落盘和同步"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+# 建好 schema 的模板内存数据库：create_all 只执行一次，各测试数据库从它复制
+_TEMPLATE_DB = sqlite3.connect(":memory:", check_same_thread=False)
+Base.metadata.create_all(create_engine("sqlite://", creator=lambda: _TEMPLATE_DB, poolclass=StaticPool))
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def _clone_template_db() -> sqlite3.Connection:
+    """用 SQLite backup API 把模板 schema 复制到新的内存数据库"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    with _TEMPLATE_LOCK:
+        _TEMPLATE_DB.backup(conn)
+    return conn
+
+
 def setup_in_memory_db():
-    """创建内存数据库用于测试"""
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False}
-    )
-    Base.metadata.create_all(engine)
+    """
+    创建内存数据库会话用于测试
 
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+    每次调用都创建独立的内存数据库（StaticPool 保持其唯一连接），
+    使并发运行的各个测试互不共享连接与事务。
+    """
+    engine = create_engine("sqlite://", creator=_clone_template_db, poolclass=StaticPool)
+    event.listen(engine, "connect", _set_sqlite_pragma)
+    return sessionmaker(bind=engine)()
 
 
 def create_test_episode_with_cues(db_session, duration_minutes: int = 10):
     """创建测试 Episode 及其关联的 Cues"""
-    import hashlib
     title = f"测试Episode_{duration_minutes}分钟"
-    file_hash = hashlib.md5(title.encode()).hexdigest()
+    file_hash = hashlib.blake2b(title.encode(), digest_size=16).hexdigest()
 
     duration_seconds = duration_minutes * 60
 
@@ -87,7 +131,6 @@ def create_test_episode_with_cues(db_session, duration_minutes: int = 10):
     # 根据时长生成不同数量的 cues
     num_cues = min(int(duration_seconds / 10), 100)  # 每10秒一个cue，最多100个
 
-    test_cues = []
     transcript_content = [
         "Hello everyone and welcome back to our English learning podcast",
         "Today we're going to talk about vocabulary building strategies",
@@ -111,23 +154,49 @@ def create_test_episode_with_cues(db_session, duration_minutes: int = 10):
         "Speaking with others helps reinforce what you've learned",
     ]
 
-    for i in range(num_cues):
-        # 循环使用内容
-        content_idx = i % len(transcript_content)
-        cue = TranscriptCue(
-            segment_id=segment.id,
-            start_time=float(i * 10),
-            end_time=float((i + 1) * 10),
-            speaker="Speaker" if i % 2 == 0 else "Host",
-            text=transcript_content[content_idx]
-        )
-        test_cues.append(cue)
-        db_session.add(cue)
+    # 一次多行 INSERT 写入全部 cues（循环使用内容）
+    cue_rows = [
+        {
+            "segment_id": segment.id,
+            "start_time": float(i * 10),
+            "end_time": float((i + 1) * 10),
+            "speaker": "Speaker" if i % 2 == 0 else "Host",
+            "text": transcript_content[i % len(transcript_content)],
+        }
+        for i in range(num_cues)
+    ]
+    db_session.execute(insert(TranscriptCue), cue_rows)
 
-    db_session.flush()
     return episode
 
 
+def run_segmentation(provider: str, api_key: str, base_url: str, model: str, duration_minutes: int):
+    """
+    在独立的内存数据库中创建测试 Episode 并执行章节切分
+
+    多个测试在线程池中并发运行，因此这里只做 I/O，不输出日志，
+    结果由调用方在各测试完成时打印和验证。
+
+    Returns:
+        tuple: (Episode 时长, 章节列表；StructuredLLM 未初始化时为 None)
+    """
+    db = setup_in_memory_db()
+    try:
+        episode = create_test_episode_with_cues(db, duration_minutes=duration_minutes)
+        service = SegmentationService(
+            db,
+            provider=provider,
+            api_key=api_key,
+            base_url=base_url,
+            model=model
+        )
+        if not service.structured_llm:
+            return episode.duration, None
+        return episode.duration, service.analyze_and_segment(episode_id=episode.id)
+    finally:
+        db.close()
+
+
 def test_segmentation_service_structured_output():
     """测试 SegmentationService 结构化输出"""
     logger.info("=" * 60)
@@ -139,32 +208,39 @@ def test_segmentation_service_structured_output():
     logger.info(f"  Moonshot API Key: {'*** 已配置 ***' if MOONSHOT_API_KEY else 'NOT SET'}")
     logger.info(f"  Zhipu API Key: {'*** 已配置 ***' if ZHIPU_API_KEY else 'NOT SET'}")
 
-    # 测试短内容（< 8分钟）
-    logger.info(f"\n[测试数据设置] 短内容（5分钟）")
-    logger.info("-" * 60)
-
-    db = setup_in_memory_db()
-    short_episode = create_test_episode_with_cues(db, duration_minutes=5)
+    setup_llm_cache()
 
-    # 测试 Moonshot Provider - 短内容
+    # (编号, 名称, provider 参数, 时长(分钟), 最多章节数, 是否验证时间范围)
+    cases = []
     if MOONSHOT_API_KEY:
-        logger.info(f"\n[测试1] Moonshot Kimi - 短内容章节切分")
-        logger.info("-" * 60)
-
-        try:
-            service = SegmentationService(
-                db,
-                provider="moonshot",
-                api_key=MOONSHOT_API_KEY,
-                base_url=MOONSHOT_BASE_URL,
-                model=MOONSHOT_MODEL
-            )
-            logger.info(f"  StructuredLLM: {'已初始化' if service.structured_llm else '未初始化'}")
-
-            if service.structured_llm:
-                chapters = service.analyze_and_segment(
-                    episode_id=short_episode.id
-                )
+        moonshot = ("moonshot", MOONSHOT_API_KEY, MOONSHOT_BASE_URL, MOONSHOT_MODEL)
+        cases.append((1, "Moonshot Kimi - 短内容章节切分", moonshot, 5, 2, True))
+        cases.append((2, "Moonshot Kimi - 中等内容章节切分", moonshot, 12, 4, False))
+    else:
+        logger.warning("Moonshot API Key 未配置，跳过 Moonshot 测试")
+    if ZHIPU_API_KEY:
+        zhipu = ("zhipu", ZHIPU_API_KEY, ZHIPU_BASE_URL, ZHIPU_MODEL)
+        cases.append((3, "Zhipu GLM - 章节切分", zhipu, 8, None, False))
+    else:
+        logger.warning("Zhipu API Key 未配置，跳过 Zhipu 测试")
+
+    # 各测试的 LLM 调用是 I/O 密集型，并发运行；哪个先完成就先打印和验证，不等待较慢的测试
+    with ThreadPoolExecutor(max_workers=max(len(cases), 1)) as executor:
+        futures = {
+            executor.submit(run_segmentation, *case[2], case[3]): case
+            for case in cases
+        }
+
+        for future in as_completed(futures):
+            index, name, _, duration_minutes, max_chapters, check_timeline = futures[future]
+            logger.info(f"\n[测试{index}] {name}（{duration_minutes}分钟）")
+            logger.info("-" * 60)
+
+            try:
+                duration, chapters = future.result()
+                if chapters is None:
+                    logger.error("StructuredLLM 未初始化，跳过测试")
+                    continue
 
                 logger.success(f"章节切分完成，共生成 {len(chapters)} 个章节")
 
@@ -176,107 +252,20 @@ def test_segmentation_service_structured_output():
 
                 # 验证数据
                 assert len(chapters) >= 1, "至少应该有1个章节"
-                assert len(chapters) <= 2, "5分钟内容最多2个章节"
+                if max_chapters is not None:
+                    assert len(chapters) <= max_chapters, f"{duration_minutes}分钟内容最多{max_chapters}个章节"
 
                 # 验证时间范围
-                assert chapters[0].start_time == 0, "第一章应该从0开始"
-                assert chapters[-1].end_time <= short_episode.duration * 1.1, "最后章节不应超出总时长"
-
-                logger.success(f"\n测试1通过: 短内容章节切分验证成功")
+                if check_timeline:
+                    assert chapters[0].start_time == 0, "第一章应该从0开始"
+                    assert chapters[-1].end_time <= duration * 1.1, "最后章节不应超出总时长"
 
-                # 清理数据库状态，为下一个测试准备
-                db.rollback()
-            else:
-                logger.error("StructuredLLM 未初始化，跳过测试")
+                logger.success(f"\n测试{index}通过: {name}验证成功")
 
-        except Exception as e:
-            logger.error(f"测试1失败: {e}")
-            import traceback
-            traceback.print_exc()
-    else:
-        logger.warning("Moonshot API Key 未配置，跳过 Moonshot 测试")
-
-    # 创建新的测试数据库用于中等内容测试
-    db = setup_in_memory_db()
-    medium_episode = create_test_episode_with_cues(db, duration_minutes=12)
-
-    # 测试中等内容（8-20分钟）
-    if MOONSHOT_API_KEY:
-        logger.info(f"\n[测试2] Moonshot Kimi - 中等内容章节切分")
-        logger.info("-" * 60)
-
-        try:
-            service = SegmentationService(
-                db,
-                provider="moonshot",
-                api_key=MOONSHOT_API_KEY,
-                base_url=MOONSHOT_BASE_URL,
-                model=MOONSHOT_MODEL
-            )
-
-            chapters = service.analyze_and_segment(
-                episode_id=medium_episode.id
-            )
-
-            logger.success(f"章节切分完成，共生成 {len(chapters)} 个章节")
-
-            for i, chapter in enumerate(chapters, 1):
-                logger.info(f"\n  [章节 {i}]")
-                logger.info(f"    标题: {chapter.title}")
-                logger.info(f"    摘要: {chapter.summary[:80]}...")
-                logger.info(f"    时间: {chapter.start_time:.0f}s - {chapter.end_time:.0f}s")
-
-            # 验证数据
-            assert len(chapters) >= 1, "至少应该有1个章节"
-            assert len(chapters) <= 4, "12分钟内容最多4个章节"
-
-            logger.success(f"\n测试2通过: 中等内容章节切分验证成功")
-
-        except Exception as e:
-            logger.error(f"测试2失败: {e}")
-            import traceback
-            traceback.print_exc()
-
-    # 测试 Zhipu Provider
-    if ZHIPU_API_KEY:
-        db = setup_in_memory_db()
-        test_episode = create_test_episode_with_cues(db, duration_minutes=8)
-
-        logger.info(f"\n[测试3] Zhipu GLM - 章节切分")
-        logger.info("-" * 60)
-
-        try:
-            service = SegmentationService(
-                db,
-                provider="zhipu",
-                api_key=ZHIPU_API_KEY,
-                base_url=ZHIPU_BASE_URL,
-                model=ZHIPU_MODEL
-            )
-            logger.info(f"  StructuredLLM: {'已初始化' if service.structured_llm else '未初始化'}")
-
-            if service.structured_llm:
-                chapters = service.analyze_and_segment(
-                    episode_id=test_episode.id
-                )
-
-                logger.success(f"章节切分完成，共生成 {len(chapters)} 个章节")
-
-                for i, chapter in enumerate(chapters, 1):
-                    logger.info(f"\n  [章节 {i}]")
-                    logger.info(f"    标题: {chapter.title}")
-                    logger.info(f"    时间: {chapter.start_time:.0f}s - {chapter.end_time:.0f}s")
-
-                logger.success(f"\n测试3通过: Zhipu GLM 结构化输出验证成功")
-            else:
-                logger.error("StructuredLLM 未初始化，跳过测试")
-
-        except Exception as e:
-            logger.error(f"测试3失败: {e}")
-            import traceback
-            traceback.print_exc()
-    else:
-        logger.warning("Zhipu API Key 未配置，跳过 Zhipu 测试")
+            except Exception as e:
+                logger.error(f"测试{index}失败: {e}")
+                import traceback
+                traceback.print_exc()
 
     logger.info(f"\n{'=' * 60}")
     logger.success(f"所有测试完成！")
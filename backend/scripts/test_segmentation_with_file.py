@@ -13,9 +13,12 @@ r"""
 import os
 import sys
 import re
+from functools import lru_cache
 from pathlib import Path
 from unittest.mock import Mock
 
+from sqlalchemy import func, insert
+
 # 设置临时环境变量（用于测试章节切分，不需要 WhisperX 和 AI API）
 os.environ.setdefault("HF_TOKEN", "dummy_token_for_segmentation_test")
 os.environ.setdefault("MOONSHOT_API_KEY", "dummy_key")
@@ -29,10 +32,38 @@ from app.database import get_session
 from app.services.segmentation_service import SegmentationService
 from app.services.obsidian_service import ObsidianService
 from app.services.ai.ai_service import AIService
-from app.models import Episode, AudioSegment, TranscriptCue, Chapter
+from app.models import Episode, AudioSegment, TranscriptCue
 from app.enums.workflow_status import WorkflowStatus
 from app.config import OBSIDIAN_VAULT_PATH
 
+# 句子边界：. ! ? 后接大写字母开头的句子，或换行
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])|\n+')
+# Mock 模式从提示词中提取总时长
+_DURATION_RE = re.compile(r'总时长：\**\s*([\d.]+)\s*分钟')
+_MOCK_CHAPTER_TITLES = ("开场介绍", "核心概念解析", "实践案例分析", "深度讨论", "总结与展望")
+
+
+@lru_cache(maxsize=None)
+def _mock_segmentation_response(total_seconds: int) -> dict:
+    """按总时长生成 3-5 个模拟章节；同一时长只构建一次"""
+    num_chapters = min(5, max(3, total_seconds // 180))
+
+    chapter_duration = total_seconds / num_chapters
+
+    # 章节边界只计算一次：相邻两个边界即一章的起止，最后一章结束于总时长
+    bounds = [int(i * chapter_duration) for i in range(num_chapters)] + [total_seconds]
+    chapters = [
+        {
+            "title": _MOCK_CHAPTER_TITLES[i] if i < len(_MOCK_CHAPTER_TITLES) else f"第{i+1}部分",
+            "summary": f"这是第{i+1}章节的中文摘要，涵盖了从{start}秒到{end}秒的内容要点。",
+            "start_time": float(start),
+            "end_time": float(end)
+        }
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+    return {"chapters": chapters}
+
 
 def create_mock_ai_service():
     """创建返回模拟章节数据的 Mock AI 服务"""
@@ -40,38 +71,10 @@ def create_mock_ai_service():
     mock_ai.provider = "mock"
 
     def mock_query_side_effect(prompt):
-        """根据提示词长度返回模拟章节"""
-        # 分析提示词获取时长信息
-        import re
-        duration_match = re.search(r'总时长：([\d.]+)分钟', prompt)
-        if duration_match:
-            duration_minutes = float(duration_match.group(1))
-            total_seconds = int(duration_minutes * 60)
-        else:
-            total_seconds = 600
-
-        # 生成 3-5 个章节
-        num_chapters = min(5, max(3, total_seconds // 180))
-
-        chapters = []
-        chapter_duration = total_seconds / num_chapters
-
-        chapter_titles = [
-            "开场介绍", "核心概念解析", "实践案例分析", "深度讨论", "总结与展望"
-        ]
-
-        for i in range(num_chapters):
-            start = int(i * chapter_duration)
-            end = int((i + 1) * chapter_duration) if i < num_chapters - 1 else total_seconds
-
-            chapters.append({
-                "title": chapter_titles[i] if i < len(chapter_titles) else f"第{i+1}部分",
-                "summary": f"这是第{i+1}章节的中文摘要，涵盖了从{start}秒到{end}秒的内容要点。",
-                "start_time": float(start),
-                "end_time": float(end)
-            })
-
-        return {"chapters": chapters}
+        """根据提示词中的总时长返回模拟章节"""
+        duration_match = _DURATION_RE.search(prompt)
+        total_seconds = int(float(duration_match.group(1)) * 60) if duration_match else 600
+        return _mock_segmentation_response(total_seconds)
 
     mock_ai.query = Mock(side_effect=mock_query_side_effect)
     return mock_ai
@@ -87,11 +90,8 @@ def split_text_into_sentences(text: str) -> list:
     Returns:
         list: 句子列表
     """
-    # 按句子边界分割：. ! ? 以及换行
-    sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])|[\n]+', text)
-    # 过滤空句子
-    sentences = [s.strip() for s in sentences if s.strip()]
-    return sentences
+    # 按句子边界分割，过滤空句子
+    return [s for s in map(str.strip, _SENTENCE_SPLIT_RE.split(text)) if s]
 
 
 def parse_srt_file(file_path: str) -> list:
@@ -181,27 +181,24 @@ def create_episode_from_text(db, text: str, title: str = "AI Product Transcript"
     db.add(segment)
     db.flush()
 
-    # 创建 TranscriptCue
+    # 创建 TranscriptCue：先累加出时间轴，再一次多行 INSERT 写入
+    cue_rows = []
     current_time = 0.0
     for i, sentence in enumerate(sentences):
-        # 估算句子时长：每字符约 0.05 秒
-        sentence_duration = max(3.0, len(sentence) * 0.05)
-
-        # 每句话不超过 15 秒
-        if sentence_duration > 15:
-            sentence_duration = 15.0
-
-        cue = TranscriptCue(
-            segment_id=segment.id,
-            start_time=current_time,
-            end_time=current_time + sentence_duration,
-            speaker="SPEAKER_00" if i % 2 == 0 else "SPEAKER_01",
-            text=sentence[:500]  # 限制长度
-        )
-        db.add(cue)
+        # 估算句子时长：每字符约 0.05 秒，每句话不超过 15 秒
+        sentence_duration = min(15.0, max(3.0, len(sentence) * 0.05))
+
+        cue_rows.append({
+            "segment_id": segment.id,
+            "start_time": current_time,
+            "end_time": current_time + sentence_duration,
+            "speaker": "SPEAKER_00" if i % 2 == 0 else "SPEAKER_01",
+            "text": sentence[:500],  # 限制长度
+        })
         current_time += sentence_duration
 
-    db.flush()
+    if cue_rows:
+        db.execute(insert(TranscriptCue), cue_rows)
 
     # 更新 Episode 时长
     episode.duration = current_time
@@ -336,13 +333,13 @@ def main():
             else:
                 # 纯文本文件
                 print("读取文件内容...")
-                with open(text_file, 'r', encoding='utf-8') as f:
-                    text_content = f.read()
 
-                # 限制内容长度（避免太长）
+                # 限制内容长度（避免太长）；只读取并解码需要的前缀，多读 1 个字符用于判断是否截断
                 max_chars = 15000  # 约 15 分钟的播客内容
+                with open(text_file, 'r', encoding='utf-8') as f:
+                    text_content = f.read(max_chars + 1)
                 if len(text_content) > max_chars:
-                    print(f"文件过长 ({len(text_content)} 字符)，截取前 {max_chars} 字符")
+                    print(f"文件过长，截取前 {max_chars} 字符")
                     text_content = text_content[:max_chars]
 
                 episode = create_episode_from_text(
@@ -367,40 +364,40 @@ def main():
             print(f"章节数量: {len(chapters)}")
             print()
 
+            # 先拼好整段报告再一次性输出
+            report = []
             for i, chapter in enumerate(chapters, 1):
                 minutes = int(chapter.start_time // 60)
                 seconds = int(chapter.start_time % 60)
                 end_minutes = int(chapter.end_time // 60)
                 end_seconds = int(chapter.end_time % 60)
 
-                print(f"章节 {i}: {chapter.title}")
-                print(f"  时间: [{minutes:02d}:{seconds:02d}] - [{end_minutes:02d}:{end_seconds:02d}]")
-                print(f"  摘要: {chapter.summary}")
-                print()
+                report += [
+                    f"章节 {i}: {chapter.title}",
+                    f"  时间: [{minutes:02d}:{seconds:02d}] - [{end_minutes:02d}:{end_seconds:02d}]",
+                    f"  摘要: {chapter.summary}",
+                    "",
+                ]
+            print("\n".join(report))
 
             # 验证 Episode 状态更新
             db.refresh(episode)
             print(f"Episode 工作流状态: {WorkflowStatus(episode.workflow_status).label}")
 
-            # 显示关联的 TranscriptCue 数量
-            from sqlalchemy import func
-            cue_counts = db.query(
-                Chapter.id,
-                Chapter.title,
-                func.count(TranscriptCue.id).label('cue_count')
-            ).outerjoin(
-                TranscriptCue, TranscriptCue.chapter_id == Chapter.id
+            # 显示关联的 TranscriptCue 数量：章节标题已在内存中，只按 chapter_id 聚合 cue（走 idx_cue_chapter）
+            cue_counts = dict(db.query(
+                TranscriptCue.chapter_id,
+                func.count(TranscriptCue.id)
             ).filter(
-                Chapter.episode_id == episode.id
-            ).group_by(Chapter.id).all()
+                TranscriptCue.chapter_id.in_([chapter.id for chapter in chapters])
+            ).group_by(TranscriptCue.chapter_id).all())
 
             print("\n章节关联统计:")
             print("-" * 70)
-            total_cues = 0
-            for chapter_id, title, cue_count in cue_counts:
-                print(f"  {title}: {cue_count} 条")
-                total_cues += cue_count
-            print(f"  总计: {total_cues} 条 TranscriptCue")
+            print("\n".join(
+                f"  {chapter.title}: {cue_counts.get(chapter.id, 0)} 条" for chapter in chapters
+            ))
+            print(f"  总计: {sum(cue_counts.values())} 条 TranscriptCue")
 
             # 输出到 Obsidian
             print("\n" + "=" * 70)
@@ -0,0 +1,105 @@
+"""
+Unit Tests for AI Batch Job Helper
+
+This module tests the OpenAI-compatible Batch API submit/poll/download loop.
+Tests follow BDD naming convention and avoid conditional logic.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.ai.batch import batch_endpoint, run_batch_job
+
+
+def _output_line(custom_id, content):
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"body": {"choices": [{"message": {"content": content}}]}}
+    })
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    client.files.create.return_value = Mock(id="file-in")
+    return client
+
+
+class TestBatchEndpoint:
+    """测试 batch_endpoint"""
+
+    def test_uses_version_segment_of_base_url(self):
+        """
+        Given: 带版本段的 base_url（末尾可能有斜杠）
+        When: 推导 Batch 请求行的 url
+        Then: 返回对应版本的 chat/completions 路径
+        """
+        assert batch_endpoint("https://api.moonshot.cn/v1") == "/v1/chat/completions"
+        assert batch_endpoint("https://open.bigmodel.cn/api/paas/v4/") == "/v4/chat/completions"
+
+
+class TestRunBatchJob:
+    """测试 run_batch_job"""
+
+    @patch("app.services.ai.batch.time.sleep")
+    def test_polls_until_completed_and_maps_contents_by_custom_id(self, mock_sleep, client):
+        """
+        Given: 两条请求，Batch 第一次轮询仍在运行，第二次完成；其中一条请求在 Batch 内失败
+        When: 调用 run_batch_job
+        Then: 上传一个 JSONL 文件，按 custom_id 返回成功请求的内容
+        """
+        client.batches.create.return_value = Mock(id="batch-1", status="in_progress")
+        client.batches.retrieve.return_value = Mock(id="batch-1", status="completed", output_file_id="file-out")
+        client.files.content.return_value = Mock(text="\n".join([
+            _output_line("req-0", '{"ok": true}'),
+            json.dumps({"custom_id": "req-1", "response": {"body": {}}}),
+        ]))
+
+        contents = run_batch_job(
+            client,
+            [("req-0", {"model": "m"}), ("req-1", {"model": "m"})],
+            "/v1/chat/completions",
+            poll_interval=1.0,
+            timeout=60.0
+        )
+
+        lines = client.files.create.call_args.kwargs["file"][1].decode("utf-8").splitlines()
+        assert [json.loads(line)["custom_id"] for line in lines] == ["req-0", "req-1"]
+        assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+        mock_sleep.assert_called_once_with(1.0)
+        assert contents == {"req-0": '{"ok": true}'}
+
+    def test_raises_when_job_does_not_complete(self, client):
+        """
+        Given: Batch 以 failed 状态结束
+        When: 调用 run_batch_job
+        Then: 抛出 RuntimeError，而不是返回空结果
+        """
+        client.batches.create.return_value = Mock(id="batch-1", status="failed", output_file_id=None)
+
+        with pytest.raises(RuntimeError, match="did not complete"):
+            run_batch_job(client, [("req-0", {})], "/v1/chat/completions", poll_interval=1.0, timeout=60.0)
+
+    def test_raises_timeout_when_deadline_passes(self, client):
+        """
+        Given: Batch 一直处于运行中，超时时间已过
+        When: 调用 run_batch_job
+        Then: 抛出 TimeoutError
+        """
+        client.batches.create.return_value = Mock(id="batch-1", status="in_progress")
+
+        with pytest.raises(TimeoutError, match="batch-1"):
+            run_batch_job(client, [("req-0", {})], "/v1/chat/completions", poll_interval=1.0, timeout=-1.0)
+
+    def test_reports_unparsable_output_line(self, client):
+        """
+        Given: Batch 输出文件中有一行不是合法 JSON
+        When: 调用 run_batch_job
+        Then: 抛出 RuntimeError，消息中带有原始行
+        """
+        client.batches.create.return_value = Mock(id="batch-1", status="completed", output_file_id="file-out")
+        client.files.content.return_value = Mock(text="not-json\n")
+
+        with pytest.raises(RuntimeError, match="not-json"):
+            run_batch_job(client, [("req-0", {})], "/v1/chat/completions", poll_interval=1.0, timeout=60.0)
@@ -0,0 +1,82 @@
+"""
+Unit Tests for AI Response Cache
+
+This module tests the SQLite-backed LangChain LLM cache.
+Tests follow BDD naming convention and avoid conditional logic.
+"""
+import pytest
+from langchain_core.globals import set_llm_cache
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.services.ai.cache import SQLiteLLMCache, enable_llm_cache
+
+
+@pytest.fixture
+def engine():
+    return create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+@pytest.fixture
+def installed_cache(engine):
+    cache = enable_llm_cache(engine)
+    yield cache
+    set_llm_cache(None)
+
+
+class TestSQLiteLLMCache:
+    """测试 SQLiteLLMCache"""
+
+    def test_get_returns_none_for_missing_key(self, engine):
+        """
+        Given: 空缓存
+        When: 查询不存在的 key
+        Then: 返回 None
+        """
+        cache = SQLiteLLMCache(engine)
+
+        assert cache.get("missing") is None
+
+    def test_put_overwrites_existing_value(self, engine):
+        """
+        Given: 已写入的 key
+        When: 用新值再次写入
+        Then: 读取到新值
+        """
+        cache = SQLiteLLMCache(engine)
+        cache.put("k", "old")
+        cache.put("k", "new")
+
+        assert cache.get("k") == "new"
+
+    def test_repeated_chat_call_is_served_from_cache(self, installed_cache):
+        """
+        Given: 已启用缓存，模型只能产生一条响应
+        When: 用相同消息调用两次
+        Then: 第二次从缓存返回相同内容，不再调用模型
+        """
+        model = GenericFakeChatModel(messages=iter([AIMessage(content="first")]))
+
+        first = model.invoke("hello")
+        second = model.invoke("hello")
+
+        assert first.content == "first"
+        assert second.content == "first"
+
+    def test_clear_removes_all_entries(self, engine):
+        """
+        Given: 含有条目的缓存
+        When: 调用 clear()
+        Then: 条目被删除
+        """
+        cache = SQLiteLLMCache(engine)
+        cache.put("k", "v")
+        cache.clear()
+
+        assert cache.get("k") is None
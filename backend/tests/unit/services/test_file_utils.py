@@ -8,6 +8,7 @@ import asyncio
 import os
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
@@ -15,6 +16,7 @@ from app.utils.file_utils import (
     calculate_md5_sync,
     calculate_md5_async,
     get_audio_duration,
+    probe_audio_file,
     is_valid_audio_header,
     validate_audio_file,
     get_file_extension,
@@ -109,6 +111,49 @@ class TestGetAudioDuration:
             os.remove(temp_path)
 
 
+class TestProbeAudioFile:
+    """Test probe_audio_file function."""
+
+    def test_probe_audio_file_returns_hash_duration_and_size(self):
+        """Given: A test file and a stubbed ffprobe duration
+        When: Calling probe_audio_file
+        Then: Returns the MD5, the duration and the file size
+        """
+        # Arrange
+        test_content = b"Hello, World!"
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(test_content)
+            temp_path = f.name
+
+        try:
+            with patch("app.utils.file_utils.get_audio_duration", return_value=12.5):
+                # Act
+                file_hash, duration, size = probe_audio_file(temp_path)
+
+            # Assert
+            assert file_hash == "65a8e27d8879283831b664bd8b7f0ad4"
+            assert duration == 12.5
+            assert size == len(test_content)
+        finally:
+            os.remove(temp_path)
+
+    def test_probe_audio_file_raises_duration_error(self):
+        """Given: A file whose duration cannot be read
+        When: Calling probe_audio_file
+        Then: Raises the RuntimeError from get_audio_duration
+        """
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"not audio")
+            temp_path = f.name
+
+        try:
+            with patch("app.utils.file_utils.get_audio_duration", side_effect=RuntimeError("bad")):
+                with pytest.raises(RuntimeError):
+                    probe_audio_file(temp_path)
+        finally:
+            os.remove(temp_path)
+
+
 class TestIsValidAudioHeader:
     """Test audio header validation."""
 
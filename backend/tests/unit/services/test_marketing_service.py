@@ -241,6 +241,34 @@ class TestGenerateHashtags:
 class TestGenerateXiaohongshuCopy:
     """测试小红书文案生成"""
 
+    @patch('app.services.marketing_service.MarketingService._call_llm_for_xiaohongshu_content')
+    @patch('app.services.marketing_service.MarketingService.generate_titles')
+    @patch('app.services.marketing_service.MarketingService.generate_hashtags')
+    @patch('app.services.marketing_service.MarketingService.extract_key_quotes')
+    def test_generate_xiaohongshu_copy_passes_angle_to_llm(
+        self, mock_quotes, mock_hashtags, mock_titles, mock_content, test_session
+    ):
+        """
+        Given: Episode 数据和文案角度
+        When: 调用 generate_xiaohongshu_copy(angle=...)
+        Then: 角度传给正文生成，并记录在 metadata 中
+        """
+        episode = Episode(title="AI Episode", file_hash="angle123", duration=100.0)
+        test_session.add(episode)
+        test_session.flush()
+
+        mock_quotes.return_value = ["金句1"]
+        mock_hashtags.return_value = ["#AI"]
+        mock_titles.return_value = ["标题1"]
+        mock_content.return_value = "正文"
+
+        marketing_service = MarketingService(test_session)
+
+        result = marketing_service.generate_xiaohongshu_copy(episode.id, angle="职场焦虑向")
+
+        assert mock_content.call_args.kwargs["angle"] == "职场焦虑向"
+        assert result.metadata["angle_tag"] == "职场焦虑向"
+
     @patch('app.services.marketing_service.MarketingService._call_llm_for_xiaohongshu_content')
     @patch('app.services.marketing_service.MarketingService.generate_titles')
     @patch('app.services.marketing_service.MarketingService.generate_hashtags')
@@ -420,6 +448,52 @@ class TestMarketingCopyDataPersistence:
         assert post.platform == "xhs"
         assert post.angle_tag == "测试角度"
 
+    def test_build_marketing_post_does_not_add_to_session(self, test_session):
+        """
+        Given: 生成的营销文案
+        When: 调用 build_marketing_post()
+        Then: 返回未加入会话的 MarketingPost，字段与文案一致
+        """
+        # Arrange
+        episode = Episode(
+            title="Test Episode",
+            file_hash="test123",
+            duration=100.0,
+        )
+        test_session.add(episode)
+        test_session.flush()
+
+        marketing_service = MarketingService(
+            test_session,
+            provider="moonshot",
+            api_key="test_key"
+        )
+
+        from app.services.marketing_service import MarketingCopy
+
+        copy = MarketingCopy(
+            title="测试标题",
+            content="测试内容",
+            hashtags=["#测试1"],
+            key_quotes=[]
+        )
+
+        # Act
+        post = marketing_service.build_marketing_post(
+            episode_id=episode.id,
+            copy=copy,
+            platform="xhs",
+            angle_tag="测试角度"
+        )
+
+        # Assert
+        assert post.id is None
+        assert post not in test_session
+        assert post.episode_id == episode.id
+        assert post.title == "测试标题"
+        assert post.angle_tag == "测试角度"
+        assert post.status == "pending"
+
     def test_load_marketing_copy_from_database(self, test_session):
         """
         Given: 数据库中的营销文案
@@ -15,7 +15,7 @@ from unittest.mock import Mock, patch
 import pytest
 
 from app.services.obsidian_service import ObsidianService
-from app.models import Episode, AudioSegment, TranscriptCue, Translation, Chapter
+from app.models import Episode, AudioSegment, TranscriptCue, Translation, Chapter, MarketingPost
 from app.enums.workflow_status import WorkflowStatus
 from app.enums.translation_status import TranslationStatus
 
@@ -107,6 +107,13 @@ def episode_with_data(test_session):
     return episode
 
 
+def _episode_cues(session, episode_id):
+    """查询 Episode 的全部 cue"""
+    return session.query(TranscriptCue).join(
+        AudioSegment, TranscriptCue.segment_id == AudioSegment.id
+    ).filter(AudioSegment.episode_id == episode_id).all()
+
+
 # ========================================================================
 # Init 测试组
 # ========================================================================
@@ -353,6 +360,71 @@ class TestRenderEpisode:
         # 不应该包含章节导航
         assert "## 📑 章节导航" not in markdown or markdown.count("## 📑 章节导航") == 0
 
+    def test_render_episode_records_translation_offsets_with_chapters(
+        self, obsidian_service, episode_with_data, test_session
+    ):
+        """
+        Given: 带 Chapter 和翻译的 Episode
+        When: 调用 render_episode(record_offsets={})
+        Then: 每个 cue_id 的区间恰好覆盖 Markdown 中对应的翻译文本
+        """
+        # Arrange
+        cues = _episode_cues(test_session, episode_with_data.id)
+        offsets = {}
+
+        # Act
+        markdown = obsidian_service.render_episode(
+            episode_with_data.id, language_code="zh", record_offsets=offsets
+        )
+
+        # Assert
+        assert set(offsets) == {c.id for c in cues}
+        assert [markdown[slice(*offsets[c.id])] for c in cues] == [
+            c.get_translation("zh") or "[未翻译]" for c in cues
+        ]
+        assert {markdown[end:end + 1] for _, end in offsets.values()} <= {"", "\n"}
+
+    def test_render_episode_records_translation_offsets_without_chapters(
+        self, obsidian_service, test_session
+    ):
+        """
+        Given: 不带 Chapter、cue 未翻译的 Episode
+        When: 调用 render_episode(record_offsets={})
+        Then: cue 的区间覆盖 "[未翻译]" 占位文本
+        """
+        # Arrange
+        episode = Episode(
+            title="No Chapter Episode",
+            file_hash="test_hash_offsets",
+            duration=60.0,
+            workflow_status=WorkflowStatus.TRANSLATED.value
+        )
+        test_session.add(episode)
+        test_session.flush()
+        segment = AudioSegment(
+            episode_id=episode.id,
+            segment_index=0,
+            segment_id="segment_001",
+            start_time=0.0,
+            end_time=60.0,
+            status="completed"
+        )
+        test_session.add(segment)
+        test_session.flush()
+        cue = TranscriptCue(segment_id=segment.id, start_time=0.0, end_time=5.0, text="Hello world")
+        test_session.add(cue)
+        test_session.flush()
+        offsets = {}
+
+        # Act
+        markdown = obsidian_service.render_episode(episode.id, language_code="zh", record_offsets=offsets)
+
+        # Assert
+        assert set(offsets) == {cue.id}
+        start, end = offsets[cue.id]
+        assert markdown[start:end] == "[未翻译]"
+        assert markdown[end:end + 1] in ("", "\n")
+
     def test_render_episode_episode_not_found(self, obsidian_service):
         """
         Given: 不存在的 episode_id
@@ -427,6 +499,50 @@ class TestSaveEpisode:
         assert "?" not in result_path.name
         assert "/" not in result_path.name
 
+    def test_save_episode_bundle_writes_both_documents(self, test_session, episode_with_data, tmp_path):
+        """
+        Given: 带 Chapter 的 Episode，以及一条关联到 Chapter 的营销文案
+        When: 调用 save_episode_bundle()
+        Then: 写出与 save_episode()/save_marketing_posts() 相同的两份文档
+        """
+        # Arrange
+        chapter = test_session.query(Chapter).filter(
+            Chapter.episode_id == episode_with_data.id
+        ).order_by(Chapter.start_time).first()
+        test_session.add(MarketingPost(
+            episode_id=episode_with_data.id,
+            chapter_id=chapter.id,
+            platform="xhs",
+            angle_tag="干货硬核向",
+            title="Post title",
+            content="Post content",
+        ))
+        test_session.flush()
+        service = ObsidianService(test_session, vault_path=str(tmp_path))
+
+        # Act
+        episode_path, marketing_path = service.save_episode_bundle(episode_with_data.id, language_code="zh")
+
+        # Assert
+        episode_markdown = episode_path.read_text(encoding="utf-8")
+        marketing_markdown = marketing_path.read_text(encoding="utf-8")
+        assert episode_markdown == service.render_episode(episode_with_data.id, language_code="zh")
+        assert marketing_markdown == service.render_marketing_posts(episode_with_data.id)
+        assert f"> **章节**: {chapter.display_title(episode_with_data)}" in marketing_markdown
+
+    def test_save_episode_bundle_without_marketing_posts(self, obsidian_service, episode_with_data, tmp_path):
+        """
+        Given: 没有营销文案的 Episode
+        When: 调用 save_episode_bundle()
+        Then: 只写出 Episode 文档，营销文案路径为 None
+        """
+        obsidian_service.vault_path = str(tmp_path)
+
+        episode_path, marketing_path = obsidian_service.save_episode_bundle(episode_with_data.id)
+
+        assert episode_path.exists()
+        assert marketing_path is None
+
     def test_save_episode_uses_config_vault(self, test_session):
         """
         Given: vault_path=None
@@ -222,6 +222,115 @@ class TestScanAndCorrect:
         assert len(corrections) == 1
         assert corrections[0].applied is True
 
+    @patch('app.services.subtitle_proofreading_service.SubtitleProofreadingService._scan_batch')
+    @patch("app.services.subtitle_proofreading_service.MOONSHOT_API_KEY", None)
+    def test_scan_and_correct_concurrent_batches(self, mock_scan_batch, sample_episode_with_cues):
+        """
+        Given: Episode with 4 cues, batch_size=3 and max_concurrency=2
+        When: Calling scan_and_correct(apply=False)
+        Then: Scans 2 batches and returns their corrections in cue order
+        """
+        episode, cues = sample_episode_with_cues
+        test_session = object_session(cues[0])
+
+        def fake_scan(batch):
+            return [{"cue_id": cue.id} for cue in batch]
+
+        mock_scan_batch.side_effect = fake_scan
+
+        service = SubtitleProofreadingService(test_session, provider="moonshot", api_key=None)
+        result = service.scan_and_correct(episode.id, batch_size=3, apply=False, max_concurrency=2)
+
+        assert mock_scan_batch.call_count == 2
+        assert sorted(len(call.args[0]) for call in mock_scan_batch.call_args_list) == [1, 3]
+        assert [c["cue_id"] for c in result.corrections] == [cue.id for cue in cues]
+
+
+class TestScanAndCorrectBatch:
+    """Test scan_and_correct_batch method"""
+
+    @patch("openai.OpenAI")
+    @patch("app.services.subtitle_proofreading_service.StructuredLLM")
+    def test_scan_and_correct_batch_submits_one_job(
+        self, mock_structured_llm_class, mock_openai_class, sample_episode_with_cues
+    ):
+        """
+        Given: Episode with 4 cues and batch_size=3
+        When: Calling scan_and_correct_batch(apply=False)
+        Then: Uploads one JSONL file with 2 request lines and joins results by custom_id
+        """
+        episode, cues = sample_episode_with_cues
+        test_session = object_session(cues[0])
+
+        output_line = json.dumps({
+            "custom_id": "batch-1",
+            "response": {"body": {"choices": [{"message": {"content": json.dumps({
+                "corrections": [{
+                    "cue_id": cues[3].id,
+                    "original_text": "This is a grat day.",
+                    "corrected_text": "This is a great day.",
+                    "reason": "拼写错误",
+                    "confidence": 0.9
+                }]
+            })}}]}}
+        })
+        client = mock_openai_class.return_value
+        client.files.create.return_value = Mock(id="file-in")
+        client.batches.create.return_value = Mock(id="batch-1", status="completed", output_file_id="file-out")
+        client.files.content.return_value = Mock(text=output_line + "\n")
+
+        service = SubtitleProofreadingService(
+            test_session, provider="moonshot", api_key="test_key",
+            base_url="https://api.moonshot.cn/v1", model="kimi"
+        )
+        result = service.scan_and_correct_batch(episode.id, batch_size=3, apply=False)
+
+        upload = client.files.create.call_args.kwargs
+        assert upload["purpose"] == "batch"
+        lines = upload["file"][1].decode("utf-8").splitlines()
+        assert [json.loads(line)["custom_id"] for line in lines] == ["batch-0", "batch-1"]
+        assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+        client.batches.create.assert_called_once()
+
+        assert [c["cue_id"] for c in result.corrections] == [cues[3].id]
+        assert result.total_cues == 4
+        assert result.corrected_count == 0
+
+    @patch("openai.OpenAI")
+    @patch("app.services.subtitle_proofreading_service.StructuredLLM")
+    def test_scan_and_correct_batch_raises_when_job_fails(
+        self, mock_structured_llm_class, mock_openai_class, sample_episode_with_cues
+    ):
+        """
+        Given: Batch job that finishes with status "failed"
+        When: Calling scan_and_correct_batch
+        Then: Raises RuntimeError instead of reporting zero corrections
+        """
+        episode, cues = sample_episode_with_cues
+        client = mock_openai_class.return_value
+        client.files.create.return_value = Mock(id="file-in")
+        client.batches.create.return_value = Mock(id="batch-1", status="failed", output_file_id=None)
+
+        service = SubtitleProofreadingService(
+            object_session(cues[0]), provider="moonshot", api_key="test_key",
+            base_url="https://api.moonshot.cn/v1", model="kimi"
+        )
+
+        with pytest.raises(RuntimeError, match="did not complete"):
+            service.scan_and_correct_batch(episode.id, batch_size=3, apply=False)
+
+    @patch("app.services.subtitle_proofreading_service.StructuredLLM")
+    def test_scan_and_correct_batch_requires_base_url(self, mock_structured_llm_class, test_session):
+        """
+        Given: Service built with an api_key but no base_url
+        When: Calling scan_and_correct_batch
+        Then: Raises ValueError before submitting anything
+        """
+        service = SubtitleProofreadingService(test_session, provider="moonshot", api_key="test_key")
+
+        with pytest.raises(ValueError, match="base_url"):
+            service.scan_and_correct_batch(1)
+
 
 class TestScanBatch:
     """Test _scan_batch method"""
@@ -379,3 +488,32 @@ class TestGetCorrectionSummary:
         service = SubtitleProofreadingService(test_session, provider="moonshot", api_key=None)
         with pytest.raises(ValueError, match="Episode not found"):
             service.get_correction_summary(999)
+
+
+class TestExportCorrectedSrt:
+    """Test export_corrected_srt method"""
+
+    @patch("app.services.subtitle_proofreading_service.MOONSHOT_API_KEY", None)
+    def test_export_corrected_srt_writes_effective_text(self, sample_episode_with_cues, tmp_path):
+        """
+        Given: Episode with one corrected cue
+        When: Calling export_corrected_srt()
+        Then: Writes every cue in SRT format, using corrected text where applied
+        """
+        episode, cues = sample_episode_with_cues
+        test_session = object_session(cues[0])
+
+        cues[0].corrected_text = "Hello world, this is a test."
+        cues[0].is_corrected = True
+        test_session.commit()
+
+        output_path = tmp_path / "corrected.srt"
+        service = SubtitleProofreadingService(test_session, provider="moonshot", api_key=None)
+        count = service.export_corrected_srt(episode.id, str(output_path))
+
+        assert count == len(cues)
+        content = output_path.read_text(encoding="utf-8")
+        assert content.startswith(
+            "1\n00:00:00,000 --> 00:00:05,000\n[SPEAKER_1] Hello world, this is a test.\n\n"
+        )
+        assert "4\n00:00:15,000 --> 00:00:20,000\n[SPEAKER_1] This is a grat day.\n\n" in content
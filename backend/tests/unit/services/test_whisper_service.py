@@ -10,7 +10,8 @@ from unittest.mock import Mock, MagicMock, patch
 
 import pytest
 
-from app.services.whisper.whisper_service import WhisperService
+from app.config import WHISPER_COMPUTE_TYPE
+from app.services.whisper.whisper_service import DIARIZATION_SEGMENTATION_BATCH_SIZE, WhisperService
 
 
 class TestWhisperServiceLoadModels:
@@ -21,7 +22,7 @@ class TestWhisperServiceLoadModels:
     def test_load_models_sets_cuda_device_when_available(self, mock_torch, mock_whisperx):
         """Given: CUDA is available
         When: Calling load_models
-        Then: Sets _device to "cuda" and _compute_type to "float16"
+        Then: Sets _device to "cuda" and _compute_type to the configured GPU compute type
         """
         # Arrange
         mock_torch.cuda.is_available.return_value = True
@@ -36,7 +37,7 @@ class TestWhisperServiceLoadModels:
 
         # Assert
         assert WhisperService._device == "cuda"
-        assert WhisperService._compute_type == "float16"
+        assert WhisperService._compute_type == WHISPER_COMPUTE_TYPE
         assert WhisperService._models_loaded is True
 
     @patch('app.services.whisper.whisper_service.whisperx')
@@ -76,6 +77,33 @@ class TestWhisperServiceLoadModels:
         mock_whisperx.load_model.assert_not_called()
 
 
+class TestWhisperServiceLoadDiarizationModel:
+    """Test WhisperService diarization model loading."""
+
+    @patch('app.services.whisper.whisper_service.DiarizationPipeline')
+    def test_load_diarization_model_batches_segmentation_on_cuda(self, mock_pipeline_cls):
+        """Given: Device is CUDA
+        When: Calling load_diarization_model
+        Then: Sets the pyannote segmentation batch size for GPU batching
+        """
+        # Arrange
+        mock_pipeline_cls.return_value.model.segmentation_batch_size = 1
+        WhisperService._models_loaded = True
+        WhisperService._device = "cuda"
+        WhisperService._diarize_model = None
+        service = WhisperService()
+
+        # Act
+        with patch.object(WhisperService, 'check_memory_before_load', return_value=True), \
+                patch.object(WhisperService, 'get_memory_info', return_value={}):
+            service.load_diarization_model()
+
+        # Assert
+        assert service._diarize_model.model.segmentation_batch_size == DIARIZATION_SEGMENTATION_BATCH_SIZE
+
+        WhisperService._diarize_model = None
+
+
 class TestWhisperServiceGetInstance:
     """Test WhisperService singleton pattern."""
 